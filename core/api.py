@@ -0,0 +1,180 @@
+"""Async JSON endpoints for the small, frequent interactions on the course pages.
+
+Served by the ASGI application (rate_my_course/asgi.py), a request waiting on
+the database holds no worker thread. Each response carries only the state that
+changed, for the page to patch in place.
+"""
+
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpRequest, HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from . import live, reactions, stats
+from .models import Course, CourseStats, Favorite, Rating
+from .sampling import random_snippet, random_snippets
+
+# most course cards a listing page shows at once
+MAX_BATCH = 100
+# seconds between keep-alive comments on an idle event stream, under common proxy read timeouts
+HEARTBEAT_SECONDS = 15
+# milliseconds the browser waits before reconnecting a dropped stream
+RETRY_MS = 5000
+# seconds an event stream stays open before the server ends it and the browser reconnects
+STREAM_SECONDS = 300
+
+
+def _error(message, status):
+    return JsonResponse({"status": "error", "message": message}, status=status)
+
+
+@sync_to_async
+def _user_id(request):
+    # request.user is a lazy object that hits the session and user tables
+    return request.user.id if request.user.is_authenticated else None
+
+
+@sync_to_async
+def _is_staff(request):
+    return request.user.is_authenticated and request.user.is_staff
+
+
+async def _visible(request, course_qs):
+    """Whether the one course in course_qs exists and this user may see it.
+
+    Pending courses are hidden from everyone but staff, as on the course page.
+    """
+    status = await course_qs.values_list("status", flat=True).afirst()
+    return status is not None and (status == "approved" or await _is_staff(request))
+
+
+async def toggle_favorite(request: HttpRequest, course_id: int):
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    user_id = await _user_id(request)
+    if user_id is None:
+        return _error("请先登录", 401)
+    if not await _visible(request, Course.objects.filter(pk=course_id)):
+        return _error("课程不存在", 404)
+    # delete-or-insert needs no read first; the unique (user, course) constraint settles races
+    deleted, _ = await Favorite.objects.filter(user_id=user_id, course_id=course_id).adelete()
+    if not deleted:
+        await Favorite.objects.aget_or_create(user_id=user_id, course_id=course_id, defaults={"created_at": timezone.now()})
+    return JsonResponse({"status": "success", "course_id": course_id, "favorited": not deleted})
+
+
+async def react(request: HttpRequest, rating_id: int):
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    user_id = await _user_id(request)
+    if user_id is None:
+        return _error("请先登录", 401)
+    reaction_type = request.POST.get("reaction_type")
+    if reaction_type not in reactions.COUNTER_FIELDS:
+        return _error("无效的操作", 400)
+    if not await _visible(request, Course.objects.filter(rating__pk=rating_id)):
+        return _error("评价不存在", 404)
+    result = await sync_to_async(reactions.set_reaction)(user_id, rating_id, reaction_type)
+    counts = await Rating.objects.filter(pk=rating_id).values("helpful_count", "not_helpful_count").afirst()
+    return JsonResponse({
+        "status": "success",
+        "rating_id": rating_id,
+        "reaction": reaction_type,
+        "result": result,
+        **(counts or {"helpful_count": 0, "not_helpful_count": 0}),
+    })
+
+
+async def random_comment(request: HttpRequest, course_id: int):
+    exclude_kind = request.GET.get("exclude_kind")
+    try:
+        exclude_id = int(request.GET["exclude_id"]) if "exclude_id" in request.GET else None
+    except ValueError:
+        exclude_id = None
+    if not await _visible(request, Course.objects.filter(pk=course_id)):
+        return JsonResponse({"text": None}, status=404)
+    snippet = await sync_to_async(random_snippet)(course_id, exclude_kind, exclude_id)
+    if snippet is None:
+        return JsonResponse({"text": None}, status=404)
+    return JsonResponse(snippet)
+
+
+def _batch_entry(raw):
+    """"12" or "12:rating:345" -> (12, (exclude_kind, exclude_id)); ValueError if malformed."""
+    course_id, _, exclude = raw.partition(":")
+    exclude_kind, _, exclude_id = exclude.partition(":")
+    return int(course_id), (exclude_kind or None, int(exclude_id) if exclude_id else None)
+
+
+async def random_comments(request: HttpRequest):
+    """One snippet per course for ?courses=12,13:rating:345,... (course id, optionally the shown entry to skip)."""
+    wanted = {}
+    for raw in request.GET.get("courses", "").split(","):
+        try:
+            course_id, exclude = _batch_entry(raw.strip())
+        except ValueError:
+            continue
+        wanted[course_id] = exclude
+    if not wanted:
+        return _error("缺少课程", 400)
+    if len(wanted) > MAX_BATCH:
+        return _error(f"一次最多 {MAX_BATCH} 门课程", 400)
+    snippets = await sync_to_async(random_snippets)(wanted)
+    return JsonResponse({"snippets": {str(course_id): snippet for course_id, snippet in snippets.items()}})
+
+
+async def course_distribution(request: HttpRequest, course_id: int):
+    """Score histograms (counts of 1..5), mean, median and standard deviation of one course."""
+    # the course row comes along for its status: pending courses are for staff only
+    course = await Course.objects.select_related("stats").filter(pk=course_id).afirst()
+    if course is None or (course.status != "approved" and not await _is_staff(request)):
+        return _error("课程不存在", 404)
+    try:
+        course_stats = course.stats
+    except CourseStats.DoesNotExist:
+        course_stats = CourseStats(course_id=course_id)
+    return JsonResponse({
+        "course_id": course_id,
+        "rating_count": course_stats.rating_count,
+        "distributions": stats.distributions(course_stats),
+    })
+
+
+async def _event_stream(course_id):
+    """Frames for one subscriber, for at most STREAM_SECONDS.
+
+    Django 4.2 does not cancel a streaming response when its client goes
+    away, so a stream that never ended would keep its queue subscribed
+    forever. Ending every stream after a fixed lifetime bounds what a
+    vanished client costs; a connected EventSource reconnects after
+    RETRY_MS, and events published in that gap are not replayed.
+    """
+    queue = live.subscribe(course_id)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + STREAM_SECONDS
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                event, data = await asyncio.wait_for(queue.get(), min(HEARTBEAT_SECONDS, remaining))
+            except asyncio.TimeoutError:
+                yield live.sse(None)
+            else:
+                yield live.sse(event, data)
+    finally:
+        live.unsubscribe(course_id, queue)
+
+
+async def course_events(request: HttpRequest, course_id: int):
+    """Server-Sent Events stream of new ratings, comments, reactions and stats for one course."""
+    if not isinstance(request, ASGIRequest):
+        # a WSGI worker would be held for the life of the stream; 204 tells EventSource not to reconnect
+        return HttpResponse(status=204)
+    if not await _visible(request, Course.objects.filter(pk=course_id)):
+        return _error("课程不存在", 404)
+    response = StreamingHttpResponse(_event_stream(course_id), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,164 @@
+"""Seeding and load driving for `manage.py benchmark`.
+
+Views are driven in-process through the Django test client, one client and one
+database connection per worker thread, so the numbers measure the application
+and database without a network hop, like the ab runs in ab_*.txt did over
+loopback.
+"""
+
+import itertools
+import math
+import statistics
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+from . import synthetic
+from .models import Course, CourseStats, Rating
+
+WRITER_PREFIX = "bench_writer_"
+
+
+def seed(courses=500, ratings=5000, comments=2000, reactions=5000, users=200, writers=16):
+    """Generate a benchmark data set with core.synthetic; returns a dict of the row counts written.
+
+    Courses are spread evenly over schools of up to 50; favorites and tags are left out, as
+    the scenarios do not read them. The writers are extra accounts without ratings.
+    """
+    schools = max(1, math.ceil(courses / 50))
+    per_school = max(1, math.ceil(courses / schools))
+    counts = synthetic.generate(
+        schools=schools,
+        courses_per_school=per_school,
+        instructors_per_school=max(1, per_school // 2),
+        users=users,
+        ratings=ratings,
+        comments=comments,
+        reactions=reactions,
+        favorites=0,
+        tags_per_course=0,
+        prefix="bench",
+    )
+    User = get_user_model()
+    password = make_password("bench")
+    User.objects.bulk_create([User(username=f"{WRITER_PREFIX}{i}", password=password) for i in range(writers)])
+    return counts
+
+
+def scenarios():
+    """name -> (method, build(worker, i) -> (url, data)); data is None for GET, a dict for POST."""
+    popular = CourseStats.objects.order_by("-rating_count").values_list("course_id", flat=True).first()
+    course_ids = list(Course.objects.filter(status="approved").order_by("course_id").values_list("course_id", flat=True))
+    rating_id = Rating.objects.filter(course_id=popular).values_list("rating_id", flat=True).first()
+
+    sequence = itertools.count()
+
+    def rate(worker, i):
+        # writers start without ratings; a shared sequence keeps (writer, course) pairs
+        # new across concurrency levels until the course list wraps around
+        return reverse("rate_course", args=[course_ids[next(sequence) % len(course_ids)]]), {
+            "overall_score": "4", "difficulty": "3", "usefulness": "4", "workload": "2", "comment_text": "benchmark",
+        }
+
+    def mixed(worker, i):
+        # every other request writes (a new rating or a reaction); the rest read course pages
+        if i % 4 == 0:
+            return rate(worker, i)
+        if i % 4 == 2:
+            return reverse("add_reaction", args=[rating_id]), {"reaction_type": "helpful" if i % 8 == 2 else "not_helpful"}
+        return reverse("course_detail", args=[course_ids[i % len(course_ids)]]), None
+
+    return {
+        "index": ("GET", lambda w, i: (reverse("index"), None)),
+        "courses": ("GET", lambda w, i: (reverse("courses"), None)),
+        "courses_search": ("GET", lambda w, i: (reverse("courses") + "?search=" + synthetic.WORDS[i % len(synthetic.WORDS)], None)),
+        "rankings": ("GET", lambda w, i: (reverse("rankings"), None)),
+        "course_detail": ("GET", lambda w, i: (reverse("course_detail", args=[popular]), None)),
+        "random_course_comment": ("GET", lambda w, i: (reverse("random_course_comment", args=[popular]), None)),
+        "rate_course": ("POST", rate),
+        "add_comment": ("POST", lambda w, i: (reverse("add_comment", args=[rating_id]), {"text": f"benchmark {i}"})),
+        "add_reaction": ("POST", lambda w, i: (
+            reverse("add_reaction", args=[rating_id]),
+            {"reaction_type": "helpful" if i % 2 else "not_helpful"},
+        )),
+        "toggle_favorite": ("POST", lambda w, i: (reverse("toggle_favorite", args=[popular]), {})),
+        "mixed": ("MIXED", mixed),
+    }
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def run_scenario(build, requests, concurrency, writers):
+    """Send `requests` requests from `concurrency` threads; returns the measured stats."""
+    latencies = []
+    query_counts = []
+    errors = []
+    lock = threading.Lock()
+    per_worker = [requests // concurrency + (1 if w < requests % concurrency else 0) for w in range(concurrency)]
+
+    def worker(w):
+        client = Client()
+        client.force_login(writers[w % len(writers)])
+        queries = [0]
+
+        def count(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        mine, my_queries, my_errors = [], [], 0
+        try:
+            with connections["default"].execute_wrapper(count):
+                for i in range(per_worker[w]):
+                    url, data = build(w, i * concurrency + w)
+                    queries[0] = 0
+                    start = time.perf_counter()
+                    try:
+                        response = client.get(url) if data is None else client.post(url, data)
+                        failed = response.status_code >= 400
+                    except Exception:
+                        failed = True
+                    mine.append(time.perf_counter() - start)
+                    my_queries.append(queries[0])
+                    my_errors += failed
+        finally:
+            connections.close_all()
+        with lock:
+            latencies.extend(mine)
+            query_counts.extend(my_queries)
+            errors.append(my_errors)
+
+    threads = [threading.Thread(target=worker, args=(w,)) for w in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = lambda v: round(v * 1000, 2) if v is not None else None  # noqa: E731
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": sum(errors),
+        "req_per_sec": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "mean_ms": ms(statistics.fmean(latencies)) if latencies else None,
+        "p50_ms": ms(_percentile(latencies, 50)),
+        "p95_ms": ms(_percentile(latencies, 95)),
+        "p99_ms": ms(_percentile(latencies, 99)),
+        "queries_per_request": round(statistics.fmean(query_counts), 2) if query_counts else None,
+    }
+
+
+def writer_users():
+    return list(get_user_model().objects.filter(username__startswith=WRITER_PREFIX).order_by("id"))
@@ -0,0 +1,117 @@
+"""Cache of computed page context for the read-heavy views.
+
+Keys are invalidated by the write signals in core.signals: once when the write
+happens and again when its transaction commits, so a reader that raced the
+write cannot leave pre-commit data behind. Use a shared backend (file, redis,
+...) when running several worker processes: locmem invalidation only reaches
+the process that handled the write.
+
+Every entry is stored per source database (db_router.read_source): a page
+built from a lagging replica is only ever served to readers of that replica,
+and a client kept on the primary after a write reads pages built from the
+primary. Invalidation drops the entry of every source.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from . import db_router
+from .models import Course
+
+TIMEOUT = getattr(settings, "PAGE_CACHE_TIMEOUT", 600)
+
+
+def _cache():
+    return caches[getattr(settings, "PAGE_CACHE_ALIAS", "default")]
+
+
+def index_key():
+    return "page:index"
+
+
+def rankings_key(school_id=None, category_id=None):
+    # "7" from the query string and 7 from a Course row must give the same key
+    school_id = int(school_id) if school_id else ""
+    category_id = int(category_id) if category_id else ""
+    return f"page:rankings:{school_id}:{category_id}"
+
+
+def course_detail_key(course_id):
+    return f"page:course_detail:{course_id}"
+
+
+def comment_pool_key(course_id):
+    return f"pool:comments:{course_id}"
+
+
+def _sourced(key, source=None):
+    return f"{key}@{source or db_router.read_source()}"
+
+
+def get_or_build(key, build):
+    key = _sourced(key)
+    value = _cache().get(key)
+    if value is None:
+        value = build()
+        _cache().set(key, value, TIMEOUT)
+    return value
+
+
+def get_many_or_build(keys, build_missing):
+    """{key: value} for `keys` ({key: arg}); build_missing([args]) -> {arg: value} fills the misses in one call."""
+    sourced = {_sourced(key): key for key in keys}
+    found = {sourced[key]: value for key, value in _cache().get_many(list(sourced)).items()}
+    missing = {arg: key for key, arg in keys.items() if key not in found}
+    if missing:
+        built = {missing[arg]: value for arg, value in build_missing(list(missing)).items()}
+        _cache().set_many({_sourced(key): value for key, value in built.items()}, TIMEOUT)
+        found.update(built)
+    return found
+
+
+def _delete_now_and_on_commit(keys):
+    sources = ["default", *db_router.replicas()]
+    keys = [_sourced(key, source) for key in keys for source in sources]
+    _cache().delete_many(keys)
+    transaction.on_commit(lambda: _cache().delete_many(keys))
+
+
+def course_keys(course_id, school_id=None, category_id=None):
+    """Every cached key a change to this course (or its ratings, comments, reactions, tags) can affect."""
+    keys = {index_key(), course_detail_key(course_id), comment_pool_key(course_id)}
+    for s in {None, school_id}:
+        for c in {None, category_id}:
+            keys.add(rankings_key(s, c))
+    return keys
+
+
+def invalidate_courses(courses):
+    """Drop the cached pages of the given courses; accepts Course instances or (course_id, school_id, category_id) tuples."""
+    keys = set()
+    for course in courses:
+        if isinstance(course, tuple):
+            keys |= course_keys(*course)
+        else:
+            keys |= course_keys(course.course_id, course.school_id, course.category_id)
+    if keys:
+        _delete_now_and_on_commit(keys)
+
+
+def invalidate_course_ids(course_ids):
+    course_ids = {cid for cid in course_ids if cid is not None}
+    if not course_ids:
+        return
+    found = {row[0]: row for row in Course.objects.filter(course_id__in=course_ids).values_list("course_id", "school_id", "category_id")}
+    invalidate_courses(found.get(cid, (cid, None, None)) for cid in course_ids)
+
+
+def invalidate_rankings(scopes):
+    """Drop the cached rankings pages of the given (school_id, category_id) filters."""
+    _delete_now_and_on_commit(rankings_key(school_id, category_id) for school_id, category_id in scopes)
+
+
+def invalidate_all():
+    """Drop every cached page, e.g. after a bulk import that bypassed the signals."""
+    _cache().clear()
+    transaction.on_commit(lambda: _cache().clear())
@@ -0,0 +1,126 @@
+"""Primary / read-replica routing (settings.DATABASE_ROUTERS).
+
+Writes always go to `default`. Reads of the site's own tables go to a
+replica only inside a request to one of settings.READ_ONLY_VIEWS, picked
+once per request by ReplicaRoutingMiddleware; everything else (sessions and
+users, management commands, other views) stays on the primary.
+
+Read-your-writes: once a request writes, its remaining reads use the
+primary, and the response sets a cookie that keeps the client on the primary
+for REPLICA_STICKY_SECONDS, longer than the replicas are expected to lag.
+The page cache (core.caching) keys its entries by read_source(), so a client
+on the primary never gets a page another client built from a lagging replica.
+"""
+
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.urls import Resolver404, resolve
+
+STICKY_COOKIE = "db_primary_until"
+# sessions and accounts are read on every request and must never be stale: a
+# session missing from a replica would log the user out
+PRIMARY_APPS = {"auth", "sessions", "contenttypes", "admin"}
+
+_state = ContextVar("db_routing", default=None)
+
+
+class _RoutingState:
+    __slots__ = ("read_db", "wrote")
+
+    def __init__(self, read_db):
+        self.read_db = read_db
+        self.wrote = False
+
+
+def replicas():
+    return list(getattr(settings, "DATABASE_REPLICAS", []))
+
+
+def read_source():
+    """The database the current request reads the site's tables from: a replica, or "default"."""
+    state = _state.get()
+    if state is None or state.wrote:
+        return "default"
+    return state.read_db
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.wrote or model._meta.app_label in PRIMARY_APPS:
+            return "default"
+        return state.read_db
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        pool = {"default", *replicas()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas are copies of the primary; they are never migrated themselves
+        return db not in replicas()
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _read_db(self, request):
+        pool = replicas()
+        if not pool or request.method not in ("GET", "HEAD"):
+            return "default"
+        try:
+            if float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time():
+                return "default"
+        except ValueError:
+            pass
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return "default"
+        if match.view_name not in getattr(settings, "READ_ONLY_VIEWS", ()):
+            return "default"
+        return random.choice(pool)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = _RoutingState(self._read_db(request))
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._finish(state, response)
+
+    async def __acall__(self, request):
+        state = _RoutingState(self._read_db(request))
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._finish(state, response)
+
+    def _finish(self, state, response):
+        if state.wrote and replicas():
+            seconds = getattr(settings, "REPLICA_STICKY_SECONDS", 10)
+            response.set_cookie(STICKY_COOKIE, f"{time.time() + seconds:.0f}", max_age=seconds, httponly=True, samesite="Lax")
+        return response
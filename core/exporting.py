@@ -0,0 +1,103 @@
+"""Streaming CSV / JSON Lines export for `manage.py export_data` and the staff export view.
+
+Each data set is a flat values_list() over its table with the joined columns
+(course code, school name, ...) selected in the same query, so no row ever
+becomes a model instance. Rows are read in primary-key keyset chunks: each
+chunk is one short query, so memory stays bounded by the chunk size and, on
+SQLite, no read transaction is held open across the whole export to block
+writers. Output is yielded one chunk at a time as text.
+"""
+
+import csv
+import io
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Course, Rating, RatingReaction
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# name -> (queryset, columns); the first column is the primary key the export pages on
+DATASETS = {
+    "ratings": (
+        lambda: Rating.objects.all(),
+        (
+            "rating_id", "course_id", "course__code", "course__school__name", "instructor__name", "user_id",
+            "overall_score", "difficulty", "usefulness", "workload", "comment_text", "anonymous_flag",
+            "helpful_count", "not_helpful_count", "created_at",
+        ),
+    ),
+    "comments": (
+        lambda: Comment.objects.all(),
+        ("comment_id", "rating_id", "rating__course_id", "parent_comment_id", "user_id", "text", "created_at"),
+    ),
+    "reactions": (
+        lambda: RatingReaction.objects.all(),
+        ("id", "rating_id", "rating__course_id", "user_id", "reaction_type", "created_at"),
+    ),
+    "course_stats": (
+        lambda: Course.objects.all(),
+        (
+            "course_id", "code", "title", "school__name", "category__name", "status",
+            "stats__rating_count", "stats__avg_overall", "stats__avg_difficulty",
+            "stats__avg_usefulness", "stats__avg_workload",
+        ),
+    ),
+}
+FORMATS = ("csv", "jsonl")
+
+
+def _header(name):
+    # "course__school__name" -> "course_school_name"
+    return name.replace("__", "_")
+
+
+def iter_rows(dataset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield lists of value tuples, at most `chunk_size` rows each, in primary-key order."""
+    queryset, columns = DATASETS[dataset]
+    pk = columns[0]
+    last = None
+    while True:
+        qs = queryset()
+        if last is not None:
+            qs = qs.filter(**{f"{pk}__gt": last})
+        rows = list(qs.order_by(pk).values_list(*columns)[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        if len(rows) < chunk_size:
+            return
+        last = rows[-1][0]
+
+
+def export_lines(dataset, fmt="csv", chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield the export as text, one string per chunk; CSV starts with a header row."""
+    columns = [_header(c) for c in DATASETS[dataset][1]]
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for rows in iter_rows(dataset, chunk_size):
+            writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+        return
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for rows in iter_rows(dataset, chunk_size):
+        yield "".join(encoder.encode(dict(zip(columns, row))) + "\n" for row in rows)
+
+
+async def aexport_lines(dataset, fmt="csv", chunk_size=DEFAULT_CHUNK_SIZE):
+    """export_lines for ASGI responses, which buffer synchronous iterators whole.
+
+    Every chunk is produced on the same sync thread (thread_sensitive), where
+    the generator's database connection lives.
+    """
+    lines = export_lines(dataset, fmt, chunk_size)
+    step = sync_to_async(lambda: next(lines, None))
+    while (text := await step()) is not None:
+        yield text
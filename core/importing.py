@@ -0,0 +1,332 @@
+"""Streaming bulk import of catalogue data for `manage.py import_catalog`.
+
+Rows are read lazily from CSV or JSON Lines and written in fixed-size batches,
+one transaction per batch, so memory stays bounded by the batch size whatever
+the file size. References use natural keys (school name, course code within a
+school, instructor name within a school, username) and are resolved for a whole
+batch with one query per table instead of one per row. Re-importing a file
+updates the rows it already created.
+
+Bulk writes bypass the model signals; import_catalog rebuilds the stats, the
+search index and the page cache once at the end.
+"""
+
+import csv
+import json
+from datetime import timezone as dt_timezone
+from itertools import islice
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Category, Course, CourseInstructor, Instructor, Rating, School
+
+KINDS = ("schools", "courses", "instructors", "ratings")
+SCORE_FIELDS = ("overall_score", "difficulty", "usefulness", "workload")
+MAX_REPORTED_ERRORS = 20
+UPDATE_BATCH_SIZE = 200
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_rows(path, fmt=None):
+    """Yield (line number, dict) per input row; `fmt` is "csv" or "jsonl", guessed from the suffix if omitted.
+
+    Line numbers count from 1 and include the CSV header and blank lines; a CSV
+    record with quoted newlines is numbered by the line it ends on.
+    """
+    path = Path(path)
+    fmt = fmt or ("csv" if path.suffix.lower() == ".csv" else "jsonl")
+    with path.open(encoding="utf-8-sig", newline="") as fh:
+        if fmt == "csv":
+            reader = csv.DictReader(fh)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        for number, line in enumerate(fh, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                raise ValueError(f"line {number}: {exc}") from exc
+            yield number, row
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def _text(row, key, required=False):
+    value = row.get(key)
+    value = str(value).strip() if value is not None else ""
+    if required and not value:
+        raise RowError(f"missing {key}")
+    return value or None
+
+
+def _flag(row, key):
+    return str(row.get(key) or "").strip().lower() in ("1", "true", "yes", "y")
+
+
+def _datetime(row, key):
+    raw = _text(row, key)
+    if raw is None:
+        return None
+    try:
+        # None when the format is wrong, ValueError when a field is out of range
+        value = parse_datetime(raw)
+    except ValueError:
+        value = None
+    if value is None:
+        raise RowError(f"bad {key}: {raw!r}")
+    return timezone.make_aware(value, dt_timezone.utc) if timezone.is_naive(value) else value
+
+
+def _score(row, key):
+    try:
+        value = int(str(row.get(key)).strip())
+    except ValueError:
+        raise RowError(f"bad {key}: {row.get(key)!r}")
+    if not 1 <= value <= 5:
+        raise RowError(f"{key} out of range: {value}")
+    return value
+
+
+class Importer:
+    """Holds the small lookup maps (schools, categories) across batches and counts the outcome."""
+
+    def __init__(self, create_users=False):
+        self.create_users = create_users
+        self.schools = dict(School.objects.values_list("name", "school_id"))
+        self.categories = dict(Category.objects.values_list("name", "category_id"))
+        self.counts = {"read": 0, "created": 0, "updated": 0, "skipped": 0, "errors": 0}
+        self.errors = []
+
+    def _error(self, where, message):
+        self.counts["errors"] += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"{where}: {message}")
+
+    def _school_id(self, row):
+        name = _text(row, "school", required=True)
+        if name not in self.schools:
+            raise RowError(f"unknown school {name!r}")
+        return self.schools[name]
+
+    def _category_ids(self, names):
+        missing = {n for n in names if n and n not in self.categories}
+        if missing:
+            Category.objects.bulk_create([Category(name=n) for n in missing], ignore_conflicts=True)
+            self.categories.update(Category.objects.filter(name__in=missing).values_list("name", "category_id"))
+        return self.categories
+
+    def _parse(self, batch, parse):
+        """Parse every (line, row) of a batch, dropping (and reporting) the invalid ones; later rows win on duplicate keys."""
+        parsed = {}
+        for line, row in batch:
+            try:
+                key, values = parse(row)
+            except RowError as exc:
+                self._error(f"line {line}", exc)
+                continue
+            if key in parsed:
+                self.counts["skipped"] += 1
+            parsed[key] = values
+        return parsed
+
+    def _course_rows(self, keys, fields=()):
+        """(school_id, code) -> row dict with course_id and `fields`, for the given keys in one query."""
+        if not keys:
+            return {}
+        rows = Course.objects.filter(
+            school_id__in={s for s, _ in keys}, code__in={c for _, c in keys}
+        ).values("school_id", "code", "course_id", *fields)
+        return {key: row for row in rows if (key := (row["school_id"], row["code"])) in keys}
+
+    def _courses_by_key(self, keys):
+        return {key: row["course_id"] for key, row in self._course_rows(keys).items()}
+
+    def _instructor_rows(self, keys, fields=()):
+        """(school_id, name) -> row dict with instructor_id and `fields`, for the given keys in one query."""
+        if not keys:
+            return {}
+        rows = Instructor.objects.filter(
+            school_id__in={s for s, _ in keys}, name__in={n for _, n in keys}
+        ).values("school_id", "name", "instructor_id", *fields)
+        return {key: row for row in rows if (key := (row["school_id"], row["name"])) in keys}
+
+    def _instructors_by_key(self, keys):
+        return {key: row["instructor_id"] for key, row in self._instructor_rows(keys).items()}
+
+    def import_batch(self, kind, batch):
+        self.counts["read"] += len(batch)
+        with transaction.atomic():
+            getattr(self, f"_import_{kind}")(batch)
+
+    def _import_schools(self, batch):
+        def parse(row):
+            name = _text(row, "name", required=True)
+            school_type = _text(row, "school_type") or "university"
+            if school_type not in dict(School.SCHOOL_TYPE_CHOICES):
+                raise RowError(f"bad school_type {school_type!r}")
+            return name, {"school_type": school_type, "country": _text(row, "country"), "city": _text(row, "city")}
+
+        parsed = self._parse(batch, parse)
+        existing = {s.name: s for s in School.objects.filter(name__in=parsed)}
+        updates, creates = [], []
+        for name, values in parsed.items():
+            school = existing.get(name)
+            if school is None:
+                creates.append(School(name=name, **values))
+            elif any(getattr(school, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(school, field, value)
+                updates.append(school)
+        School.objects.bulk_update(updates, ["school_type", "country", "city"], batch_size=UPDATE_BATCH_SIZE)
+        School.objects.bulk_create(creates)
+        self.schools.update(School.objects.filter(name__in=[s.name for s in creates]).values_list("name", "school_id"))
+        self.counts["created"] += len(creates)
+        self.counts["updated"] += len(updates)
+        self.counts["skipped"] += len(parsed) - len(creates) - len(updates)
+
+    def _import_courses(self, batch):
+        def parse(row):
+            status = _text(row, "status") or "approved"
+            if status not in dict(Course.STATUS_CHOICES):
+                raise RowError(f"bad status {status!r}")
+            return (self._school_id(row), _text(row, "code", required=True)), {
+                "title": _text(row, "title", required=True),
+                "description": _text(row, "description"),
+                "category": _text(row, "category"),
+                "status": status,
+            }
+
+        parsed = self._parse(batch, parse)
+        categories = self._category_ids({v["category"] for v in parsed.values()})
+        fields = ["title", "description", "category_id", "status"]
+        existing = self._course_rows(set(parsed), fields)
+        updates, creates = [], []
+        now = timezone.now()
+        for (school_id, code), values in parsed.items():
+            values["category_id"] = categories.get(values.pop("category"))
+            row = existing.get((school_id, code))
+            if row is None:
+                creates.append(Course(school_id=school_id, code=code, created_at=now, **values))
+            elif any(row[f] != values[f] for f in fields):
+                updates.append(Course(course_id=row["course_id"], school_id=school_id, code=code, **values))
+        # bulk_update builds one CASE per field; small batches keep the statements cheap
+        Course.objects.bulk_update(updates, fields, batch_size=UPDATE_BATCH_SIZE)
+        Course.objects.bulk_create(creates)
+        self.counts["created"] += len(creates)
+        self.counts["updated"] += len(updates)
+        self.counts["skipped"] += len(parsed) - len(creates) - len(updates)
+
+    def _import_instructors(self, batch):
+        def parse(row):
+            year = _text(row, "year")
+            try:
+                year = int(year) if year else None
+            except ValueError:
+                raise RowError(f"bad year {year!r}")
+            school_id = self._school_id(row)
+            return (school_id, _text(row, "name", required=True), _text(row, "course_code")), {
+                "profile": _text(row, "profile"),
+                "semester": _text(row, "semester"),
+                "year": year,
+            }
+
+        parsed = self._parse(batch, parse)
+        keys = {(s, n) for s, n, _ in parsed}
+        existing = self._instructor_rows(keys, ["profile"])
+        updates, creates = {}, {}
+        for (school_id, name, _code), values in parsed.items():
+            key = (school_id, name)
+            row = existing.get(key)
+            if row is None:
+                creates[key] = Instructor(school_id=school_id, name=name, profile=values["profile"])
+            elif values["profile"] is not None and values["profile"] != row["profile"]:
+                updates[key] = Instructor(instructor_id=row["instructor_id"], profile=values["profile"])
+        Instructor.objects.bulk_update(list(updates.values()), ["profile"], batch_size=UPDATE_BATCH_SIZE)
+        Instructor.objects.bulk_create(list(creates.values()))
+        self.counts["created"] += len(creates)
+        self.counts["updated"] += len(updates)
+
+        # optional course assignment; rows naming an unknown course only import the instructor
+        instructors = self._instructors_by_key(keys)
+        courses = self._courses_by_key({(s, c) for s, _, c in parsed if c})
+        wanted = {}
+        for (school_id, name, code), values in parsed.items():
+            course_id = courses.get((school_id, code))
+            if code and course_id is None:
+                self.counts["skipped"] += 1
+                continue
+            if course_id:
+                wanted[(course_id, instructors[(school_id, name)])] = values
+        linked = set(
+            CourseInstructor.objects.filter(
+                course_id__in={c for c, _ in wanted}, instructor_id__in={i for _, i in wanted}
+            ).values_list("course_id", "instructor_id")
+        )
+        CourseInstructor.objects.bulk_create([
+            CourseInstructor(course_id=c, instructor_id=i, semester=v["semester"], year=v["year"])
+            for (c, i), v in wanted.items()
+            if (c, i) not in linked
+        ])
+
+    def _user_ids(self, usernames):
+        User = get_user_model()
+        found = dict(User.objects.filter(username__in=usernames).values_list("username", "id"))
+        missing = set(usernames) - set(found)
+        if missing and self.create_users:
+            password = make_password(None)
+            User.objects.bulk_create([User(username=u, password=password) for u in missing], ignore_conflicts=True)
+            found.update(User.objects.filter(username__in=missing).values_list("username", "id"))
+        return found
+
+    def _import_ratings(self, batch):
+        def parse(row):
+            school_id = self._school_id(row)
+            values = {field: _score(row, field) for field in SCORE_FIELDS}
+            values.update(
+                comment_text=_text(row, "comment_text"),
+                anonymous_flag=_flag(row, "anonymous"),
+                created_at=_datetime(row, "created_at") or timezone.now(),
+                instructor=_text(row, "instructor"),
+            )
+            return (_text(row, "username", required=True), school_id, _text(row, "course_code", required=True)), values
+
+        parsed = self._parse(batch, parse)
+        users = self._user_ids({u for u, _, _ in parsed})
+        courses = self._courses_by_key({(s, c) for _, s, c in parsed})
+        instructors = self._instructors_by_key({(s, v["instructor"]) for (_, s, _), v in parsed.items() if v["instructor"]})
+
+        candidates = {}
+        for (username, school_id, code), values in parsed.items():
+            user_id, course_id = users.get(username), courses.get((school_id, code))
+            if user_id is None or course_id is None:
+                missing = f"user {username!r}" if user_id is None else f"course {code!r}"
+                self._error(f"rating {username}/{code}", f"unknown {missing}")
+                continue
+            values["instructor_id"] = instructors.get((school_id, values.pop("instructor")))
+            candidates[(user_id, course_id)] = values
+        # one rating per user and course, as rate_course enforces; existing ones are kept.
+        # Only the batch's users' ratings are read, through the (user, course) index, so
+        # the lookup stays bounded by the batch however popular its courses are. Adding
+        # the course list makes SQLite probe every user x course combination instead.
+        taken = set(
+            Rating.objects.filter(user_id__in={u for u, _ in candidates}).values_list("user_id", "course_id")
+        )
+        creates = [Rating(user_id=u, course_id=c, **v) for (u, c), v in candidates.items() if (u, c) not in taken]
+        Rating.objects.bulk_create(creates)
+        self.counts["created"] += len(creates)
+        self.counts["skipped"] += len(candidates) - len(creates)
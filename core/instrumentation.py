@@ -0,0 +1,184 @@
+"""Per-request SQL / template / wall-time instrumentation.
+
+Queries are counted by a cursor execute_wrapper installed on every connection,
+so this works with DEBUG=False (connection.queries is only filled in DEBUG) and
+under ASGI, where queries run in other threads than the request. Template time
+is measured by the TimedDjangoTemplates backend, which settings.TEMPLATES
+points at. Totals are kept per URL name in process memory; a multi-process
+deployment reports each worker separately.
+
+Settings:
+    QUERY_BUDGETS         {url_name: max queries per request}
+    QUERY_BUDGET_DEFAULT  budget for views not listed (None: unlimited)
+    QUERY_BUDGET_RAISE    raise QueryBudgetExceeded instead of logging a warning
+"""
+
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger("core.instrumentation")
+
+_current = ContextVar("request_metrics", default=None)
+_totals = {}
+_lock = threading.Lock()
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class RequestMetrics:
+    __slots__ = ("queries", "db_time", "template_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - start
+
+
+class _TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+        self.origin = template.origin
+
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return self.template.render(context, request)
+        start = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The stock Django template backend, timing each top-level render."""
+
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name))
+
+
+def budget_for(view_name):
+    return getattr(settings, "QUERY_BUDGETS", {}).get(view_name, getattr(settings, "QUERY_BUDGET_DEFAULT", None))
+
+
+def _add(view_name, metrics, total, over_budget):
+    with _lock:
+        row = _totals.setdefault(view_name, {
+            "requests": 0, "queries": 0, "db_ms": 0.0, "template_ms": 0.0, "total_ms": 0.0,
+            "max_queries": 0, "max_total_ms": 0.0, "over_budget": 0,
+        })
+        row["requests"] += 1
+        row["queries"] += metrics.queries
+        row["db_ms"] += metrics.db_time * 1000
+        row["template_ms"] += metrics.template_time * 1000
+        row["total_ms"] += total * 1000
+        row["max_queries"] = max(row["max_queries"], metrics.queries)
+        row["max_total_ms"] = max(row["max_total_ms"], total * 1000)
+        row["over_budget"] += over_budget
+
+
+def snapshot():
+    """Cumulative totals and per-request averages, keyed by URL name."""
+    with _lock:
+        rows = {name: dict(row) for name, row in _totals.items()}
+    for name, row in rows.items():
+        n = row["requests"]
+        row["budget"] = budget_for(name)
+        for key in ("queries", "db_ms", "template_ms", "total_ms"):
+            row[f"avg_{key}"] = round(row[key] / n, 2)
+        for key in ("db_ms", "template_ms", "total_ms", "max_total_ms"):
+            row[key] = round(row[key], 2)
+    return rows
+
+
+def reset():
+    with _lock:
+        _totals.clear()
+
+
+def install_query_recorder(connection):
+    """Add the query counter to a connection; core.signals calls this as each one opens."""
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+class QueryInstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            for conn in connections.all(initialized_only=True):
+                install_query_recorder(conn)
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        # ORM calls run in sync_to_async threads; the context variable follows them there
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics, time.perf_counter() - start)
+
+    def _finish(self, request, response, metrics, total):
+        match = getattr(request, "resolver_match", None)
+        view_name = match.view_name if match else "<unresolved>"
+        budget = budget_for(view_name)
+        over_budget = budget is not None and metrics.queries > budget
+        _add(view_name, metrics, total, over_budget)
+
+        response["Server-Timing"] = (
+            f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries", '
+            f"tpl;dur={metrics.template_time * 1000:.1f}, total;dur={total * 1000:.1f}"
+        )
+        logger.debug(
+            "%s %s view=%s queries=%d db=%.1fms tpl=%.1fms total=%.1fms",
+            request.method, request.path, view_name, metrics.queries,
+            metrics.db_time * 1000, metrics.template_time * 1000, total * 1000,
+        )
+        if over_budget:
+            message = f"{view_name} ran {metrics.queries} queries, over its budget of {budget} ({request.method} {request.path})"
+            if getattr(settings, "QUERY_BUDGET_RAISE", False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,149 @@
+"""In-process pub/sub behind the course event stream (api.course_events).
+
+Each open stream is an asyncio.Queue on the ASGI event loop, registered under
+its course. Writers publish from synchronous code (signals, sync_to_async
+threads) once their transaction commits; the event is built only if someone
+watches the course, then handed to each queue with call_soon_threadsafe. An
+idle viewer is one parked coroutine and a queue, with no database work.
+
+Subscribers only see writes made by this process. With several worker
+processes, each stream receives the writes of its own worker; a shared broker
+would be needed to fan out across them.
+"""
+
+import asyncio
+import json
+import threading
+
+from django.db import transaction
+
+from .models import Comment, CourseStats, Rating
+
+QUEUE_SIZE = 100
+
+_subscribers = {}  # course_id -> {queue: loop}
+_lock = threading.Lock()
+
+
+def subscribe(course_id):
+    """A new queue for `course_id`'s events; call from the event loop, pair with unsubscribe()."""
+    queue = asyncio.Queue(QUEUE_SIZE)
+    with _lock:
+        _subscribers.setdefault(course_id, {})[queue] = asyncio.get_running_loop()
+    return queue
+
+
+def unsubscribe(course_id, queue):
+    with _lock:
+        queues = _subscribers.get(course_id, {})
+        queues.pop(queue, None)
+        if not queues:
+            _subscribers.pop(course_id, None)
+
+
+def subscriber_count(course_id=None):
+    with _lock:
+        if course_id is None:
+            return sum(len(q) for q in _subscribers.values())
+        return len(_subscribers.get(course_id, ()))
+
+
+def _offer(queue, event):
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        # a client this far behind reloads anyway; keep the newest events
+        queue.get_nowait()
+        queue.put_nowait(event)
+
+
+def publish(course_id, event, build):
+    """After commit, send (event, build()) to the course's subscribers; build runs only if there are any."""
+
+    def send():
+        with _lock:
+            targets = list(_subscribers.get(course_id, {}).items())
+        if not targets:
+            return
+        message = (event, build())
+        for queue, loop in targets:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, message)
+            except RuntimeError:
+                # the loop is closed; its streams are gone
+                unsubscribe(course_id, queue)
+
+    if subscriber_count(course_id):
+        transaction.on_commit(send)
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def _stats(course_id):
+    stats = CourseStats.objects.filter(course_id=course_id).values(
+        "rating_count", "avg_overall", "avg_difficulty", "avg_usefulness", "avg_workload"
+    ).first()
+    return stats or {"rating_count": 0, "avg_overall": 0, "avg_difficulty": 0, "avg_usefulness": 0, "avg_workload": 0}
+
+
+def rating_saved(rating, created):
+    def build():
+        data = {"stats": _stats(rating.course_id)}
+        if created:
+            row = Rating.objects.filter(pk=rating.pk).values(
+                "rating_id", "anonymous_flag", "user__username", "overall_score", "difficulty",
+                "usefulness", "workload", "comment_text", "created_at",
+            ).first()
+            if row:
+                anonymous, username = row.pop("anonymous_flag"), row.pop("user__username")
+                row["user"] = "匿名" if anonymous else username
+                row["created_at"] = _isoformat(row["created_at"])
+                data["rating"] = row
+        return data
+
+    publish(rating.course_id, "rating" if created else "stats", build)
+
+
+def rating_deleted(rating):
+    publish(rating.course_id, "stats", lambda: {"stats": _stats(rating.course_id)})
+
+
+def comment_created(comment):
+    if not subscriber_count():
+        return
+    course_id = Rating.objects.filter(pk=comment.rating_id).values_list("course_id", flat=True).first()
+    if course_id is None:
+        return
+
+    def build():
+        row = Comment.objects.filter(pk=comment.pk).values(
+            "comment_id", "rating_id", "parent_comment_id", "user__username", "text", "created_at"
+        ).first() or {}
+        if row:
+            row["user"] = row.pop("user__username")
+            row["created_at"] = _isoformat(row["created_at"])
+        row["comment_count"] = Comment.objects.filter(rating_id=comment.rating_id).count()
+        return row
+
+    publish(course_id, "comment", build)
+
+
+def reaction_changed(rating_id):
+    if not subscriber_count():
+        return
+    course_id = Rating.objects.filter(pk=rating_id).values_list("course_id", flat=True).first()
+    if course_id is None:
+        return
+    publish(course_id, "reaction", lambda: {
+        "rating_id": rating_id,
+        **(Rating.objects.filter(pk=rating_id).values("helpful_count", "not_helpful_count").first() or {}),
+    })
+
+
+def sse(event, data=None):
+    """One Server-Sent Events frame; event=None gives a keep-alive comment."""
+    if event is None:
+        return ": ping\n\n"
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
@@ -0,0 +1,99 @@
+import json
+import subprocess
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+
+from core import benchmarking, sqlite_tuning
+
+
+class Command(BaseCommand):
+    help = "Seed a throwaway database, drive each view at set concurrency levels, and report req/s, latency percentiles and SQL counts"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--courses", type=int, default=500)
+        parser.add_argument("--ratings", type=int, default=5000)
+        parser.add_argument("--comments", type=int, default=2000)
+        parser.add_argument("--reactions", type=int, default=5000)
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--requests", type=int, default=200, help="Requests per view and concurrency level")
+        parser.add_argument("--concurrency", default="1,10", help="Comma-separated concurrency levels")
+        parser.add_argument("--views", default="", help="Comma-separated subset of views (default: all)")
+        parser.add_argument("--no-cache", action="store_true", help="Measure with the page cache disabled")
+        parser.add_argument("--db", default=str(Path(settings.BASE_DIR) / "benchmark.sqlite3"), help="Throwaway SQLite file to seed")
+        parser.add_argument("--keep-db", action="store_true", help="Keep (and reuse, skipping the seed) the benchmark database")
+        parser.add_argument("--output", default="", help="Write the results as JSON to this path")
+
+    def _commit(self):
+        try:
+            return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=settings.BASE_DIR).stdout.strip() or None
+        except OSError:
+            return None
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("benchmark seeds a throwaway SQLite database")
+        levels = [int(c) for c in options["concurrency"].split(",") if c.strip()]
+        if not levels or min(levels) < 1:
+            raise CommandError("--concurrency needs positive integers")
+
+        # the benchmark runs on its own database file, never on the configured one
+        db_path = Path(options["db"])
+        reuse = options["keep_db"] and db_path.exists()
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = str(db_path)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=reuse)
+        caches = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}} if options["no_cache"] else settings.CACHES
+        try:
+            pragmas = sqlite_tuning.current_pragmas(connection)
+            # replicas are separate files that the throwaway database does not reach
+            with override_settings(CACHES=caches, DATABASE_REPLICAS=[]):
+                if reuse:
+                    sizes = {"reused": str(db_path)}
+                else:
+                    self.stdout.write("Seeding...")
+                    sizes = benchmarking.seed(
+                        courses=options["courses"],
+                        ratings=options["ratings"],
+                        comments=options["comments"],
+                        reactions=options["reactions"],
+                        users=options["users"],
+                        writers=max(levels),
+                    )
+                writers = benchmarking.writer_users()
+                all_scenarios = benchmarking.scenarios()
+                wanted = [v for v in options["views"].split(",") if v] or list(all_scenarios)
+                unknown = set(wanted) - set(all_scenarios)
+                if unknown:
+                    raise CommandError(f"Unknown views: {', '.join(sorted(unknown))}; choose from {', '.join(all_scenarios)}")
+
+                results = []
+                header = f"{'view':<24}{'conc':>5}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}{'errors':>8}"
+                self.stdout.write(header)
+                for name in wanted:
+                    _method, build = all_scenarios[name]
+                    for level in levels:
+                        row = {"view": name, **benchmarking.run_scenario(build, options["requests"], level, writers)}
+                        results.append(row)
+                        self.stdout.write(
+                            f"{name:<24}{level:>5}{row['req_per_sec']:>10}{row['p50_ms']:>10}{row['p95_ms']:>10}"
+                            f"{row['p99_ms']:>10}{row['queries_per_request']:>9}{row['errors']:>8}"
+                        )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keep_db"])
+
+        report = {
+            "commit": self._commit(),
+            "generated_at": timezone.now().isoformat(),
+            "cache": "disabled" if options["no_cache"] else caches["default"]["BACKEND"],
+            "db_profile": getattr(settings, "DB_PROFILE", "default"),
+            "sqlite": pragmas,
+            "dataset": sizes,
+            "results": results,
+        }
+        if options["output"]:
+            Path(options["output"]).write_text(json.dumps(report, ensure_ascii=False, indent=2))
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
@@ -0,0 +1,108 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import Comment, CourseStats, Rating
+
+
+# Dimension tables that are read whole on purpose (filter dropdowns, tag cloud).
+SMALL_TABLES = {"school", "category", "tag", "sqlite_master"}
+
+
+class Command(BaseCommand):
+    help = "Drive every view, EXPLAIN QUERY PLAN each SQL statement, and fail on full table scans"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--allow-scan", action="append", default=[], help="Table that may be scanned in full (repeatable)")
+        parser.add_argument("--verbose-plans", action="store_true", help="Print the plan of every statement")
+
+    def _requests(self):
+        stats = CourseStats.objects.order_by("-rating_count").first()
+        if stats is None:
+            raise CommandError("No rated course found; seed some data first (e.g. seed_more_demo)")
+        course = stats.course
+        rating = Rating.objects.filter(course_id=course.course_id).first()
+        comment = Comment.objects.filter(rating__course_id=course.course_id).first()
+        yield "GET", reverse("index"), None
+        yield "GET", reverse("courses"), None
+        yield "GET", reverse("courses") + f"?school_id={course.school_id or ''}&category_id={course.category_id or ''}", None
+        yield "GET", reverse("courses") + f"?search={course.title[:2]}", None
+        yield "GET", reverse("rankings"), None
+        yield "GET", reverse("rankings") + f"?school_id={course.school_id or ''}&category_id={course.category_id or ''}", None
+        yield "GET", reverse("course_detail", args=[course.course_id]), None
+        yield "GET", reverse("random_course_comment", args=[course.course_id]), None
+        yield "GET", reverse("rating_comments", args=[rating.rating_id]), None
+        yield "GET", reverse("api_random_comment", args=[course.course_id]), None
+        yield "GET", reverse("api_random_comments") + f"?courses={course.course_id},{course.course_id + 1}", None
+        yield "GET", reverse("api_course_distribution", args=[course.course_id]), None
+        yield "GET", reverse("disclaimer"), None
+        yield "POST", reverse("rate_course", args=[course.course_id]), {
+            "overall_score": "4", "difficulty": "3", "usefulness": "4", "workload": "3", "comment_text": "plan check",
+        }
+        yield "POST", reverse("add_comment", args=[rating.rating_id]), {
+            "text": "plan check", "parent_comment_id": comment.comment_id if comment else "",
+        }
+        yield "POST", reverse("add_reaction", args=[rating.rating_id]), {"reaction_type": "helpful"}
+        yield "POST", reverse("toggle_favorite", args=[course.course_id]), {}
+        yield "POST", reverse("api_react", args=[rating.rating_id]), {"reaction_type": "not_helpful"}
+        yield "POST", reverse("api_toggle_favorite", args=[course.course_id]), {}
+
+    def _full_scans(self, sql, allowed):
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql)
+            plan = [row[-1] for row in cursor.fetchall()]
+        scans = []
+        # An unfiltered ORDER BY ... LIMIT read in index order (no temp b-tree) stops
+        # after LIMIT rows. Any WHERE or inner join may skip rows and keep the scan
+        # going to the end of the table, so those statements are checked like the rest.
+        if (
+            " LIMIT " in sql and " WHERE " not in sql and " INNER JOIN " not in sql
+            and not any("TEMP B-TREE" in detail for detail in plan)
+        ):
+            return plan, scans
+        for detail in plan:
+            if not detail.startswith("SCAN ") or "VIRTUAL TABLE" in detail or "CONSTANT ROW" in detail:
+                continue
+            table = detail.split()[1]
+            if table not in allowed:
+                scans.append(detail)
+        return plan, scans
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("check_query_plans reads SQLite's EXPLAIN QUERY PLAN output")
+        allowed = SMALL_TABLES | set(options["allow_scan"])
+        # a regular account, so the listing runs with the status filter most visitors get
+        user = get_user_model().objects.order_by("is_staff", "id").first()
+        if user is None:
+            raise CommandError("No user found; create one first")
+
+        failures = 0
+        # the page cache would hide the queries; writes are rolled back at the end
+        with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}):
+            with transaction.atomic():
+                client = Client()
+                client.force_login(user)
+                for method, url, data in list(self._requests()):
+                    with CaptureQueriesContext(connection) as captured:
+                        if method == "GET":
+                            client.get(url)
+                        else:
+                            client.post(url, data)
+                    statements = [q["sql"] for q in captured.captured_queries if q["sql"].lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE"))]
+                    self.stdout.write(f"{method} {url}: {len(statements)} statements")
+                    for sql in statements:
+                        plan, scans = self._full_scans(sql, allowed)
+                        if options["verbose_plans"]:
+                            self.stdout.write(f"  {sql}\n    " + "\n    ".join(plan))
+                        if scans:
+                            failures += 1
+                            self.stdout.write(self.style.ERROR(f"  full scan: {'; '.join(scans)}\n    {sql}"))
+                transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f"{failures} statements fall back to a full table scan")
+        self.stdout.write(self.style.SUCCESS("Every statement uses an index."))
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import exporting
+
+
+class Command(BaseCommand):
+    help = "Stream ratings, comments, reactions or per-course statistics out as CSV or JSON Lines"
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", choices=exporting.DATASETS)
+        parser.add_argument("--format", choices=exporting.FORMATS, default="csv")
+        parser.add_argument("--output", "-o", help="File to write (default: stdout)")
+        parser.add_argument("--chunk-size", type=int, default=exporting.DEFAULT_CHUNK_SIZE, help="Rows per query")
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive")
+        lines = exporting.export_lines(options["dataset"], options["format"], options["chunk_size"])
+        started = time.perf_counter()
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8", newline="") as fh:
+                fh.writelines(lines)
+            self.stderr.write(f"{options['dataset']} written to {options['output']} in {time.perf_counter() - started:.1f}s")
+        else:
+            for text in lines:
+                self.stdout.write(text, ending="")
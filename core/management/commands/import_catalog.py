@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import caching, importing, search, stats
+
+
+class Command(BaseCommand):
+    help = "Bulk-import schools, courses, instructors or ratings from a CSV or JSON Lines file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=importing.KINDS)
+        parser.add_argument("path", help="CSV (header row) or JSON Lines file")
+        parser.add_argument("--format", choices=("csv", "jsonl"), help="Input format (default: from the file suffix)")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows per bulk write and transaction")
+        parser.add_argument("--create-users", action="store_true", help="Create unknown rating authors (without a usable password)")
+        parser.add_argument("--no-rebuild", action="store_true", help="Skip rebuilding stats, search index and page cache afterwards")
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+        kind = options["kind"]
+        importer = importing.Importer(create_users=options["create_users"])
+        rows = importing.read_rows(options["path"], options["format"])
+
+        started = time.perf_counter()
+        try:
+            for batch in importing.batched(rows, options["batch_size"]):
+                importer.import_batch(kind, batch)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"{importer.counts['read']} rows, {importer.counts['read'] / elapsed:.0f} rows/s")
+        except (OSError, ValueError) as exc:
+            # unreadable file or broken JSON line (the message names the line); batches before it are committed
+            raise CommandError(f"{options['path']}: {exc}")
+        elapsed = time.perf_counter() - started
+
+        for message in importer.errors:
+            self.stderr.write(message)
+        if importer.counts["errors"] > len(importer.errors):
+            self.stderr.write(f"... {importer.counts['errors'] - len(importer.errors)} more errors")
+
+        if not options["no_rebuild"]:
+            if kind == "ratings":
+                stats.rebuild_stats()
+            if kind in ("schools", "courses"):
+                search.rebuild_index()
+            caching.invalidate_all()
+
+        counts = importer.counts
+        self.stdout.write(self.style.SUCCESS(
+            f"{kind}: {counts['read']} read, {counts['created']} created, {counts['updated']} updated, "
+            f"{counts['skipped']} skipped, {counts['errors']} errors in {elapsed:.1f}s "
+            f"({counts['read'] / elapsed if elapsed else 0:.0f} rows/s)"
+        ))
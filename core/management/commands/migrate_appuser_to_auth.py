@@ -1,61 +1,251 @@
-from django.core.management.base import BaseCommand
+import time
+
 from django.contrib.auth import get_user_model
-from django.db import transaction
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connection, transaction
+
+from core import caching, reactions
+from core.models import Comment, Course, CourseTag, Favorite, Rating, RatingReaction, Report, UserDisclaimer
+
+# The legacy AppUser model was dropped in migration 0002; older databases still
+# carry its `user` table, which is read here with plain SQL.
+LEGACY_TABLE = "user"
+# legacy user_id -> auth_user.id, kept so an interrupted run resumes with the same mapping
+MAP_TABLE = "legacy_user_map"
+# per (table, column): rows with a chunk key up to last_key are relinked; rows with a
+# primary key above max_pk were written after the first run and already use auth ids
+PROGRESS_TABLE = "legacy_user_relink_progress"
+
+# (model, user field, chunk field). Tables unique on (user, X) are chunked by X, so
+# every row that could collide with another during the relink is in the same chunk.
+TARGETS = [
+    (Course, "created_by", None),
+    (Rating, "user", None),
+    (Comment, "user", None),
+    (CourseTag, "user", None),
+    (RatingReaction, "user", "rating"),
+    (Report, "reporter", None),
+    (Favorite, "user", "course"),
+    (UserDisclaimer, "user", None),
+]
+# user_helpful_stats is keyed by author id too, but is derived from rating and
+# rating_reaction; it is recounted after the relink instead of being relinked.
+
+
+def q(name):
+    return connection.ops.quote_name(name)
+
+
+class Target:
+    def __init__(self, model, field_name, chunk_field):
+        meta = model._meta
+        self.table = meta.db_table
+        self.column = meta.get_field(field_name).column
+        self.pk = meta.pk.column
+        self.key = meta.get_field(chunk_field).column if chunk_field else self.pk
 
-from core.models import AppUser, Course, Rating, Comment, CourseTag, RatingReaction, Report, Favorite
+    def __str__(self):
+        return f"{self.table}.{self.column}"
 
 
 class Command(BaseCommand):
-    help = "Migrate legacy AppUser (user table) to auth_user and relink foreign keys"
+    help = "Migrate legacy AppUser (user table) to auth_user and relink foreign keys, in resumable chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=5000, help="Rows relinked per transaction")
+        parser.add_argument("--dry-run", action="store_true", help="Print what would change without writing")
 
     def handle(self, *args, **options):
-        User = get_user_model()
-        created = 0
-        linked = 0
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive")
+        if LEGACY_TABLE not in connection.introspection.table_names():
+            raise CommandError(f"No legacy `{LEGACY_TABLE}` table in this database; nothing to migrate")
+        dry_run = options["dry_run"]
+        self.verbosity = options["verbosity"]
+        if not dry_run:
+            self.create_tables()
 
         self.stdout.write("Building user mapping...")
-        id_map = {}
-        for au in AppUser.objects.all():
-            user = User.objects.filter(username=au.username).first()
-            if not user:
-                # create auth user with unusable password; keep email
-                user = User.objects.create(username=au.username, email=au.email)
-                user.set_unusable_password()
-                user.save()
-                created += 1
-            id_map[au.user_id] = user.id
-
-        self.stdout.write(f"Auth users created: {created}")
-
-        def relink(model, field_name):
-            nonlocal linked
-            qs = model.objects.all()
-            updates = 0
-            for obj in qs.iterator():
-                old_id = getattr(obj, field_name)
-                new_id = id_map.get(old_id)
-                if new_id and new_id != old_id:
-                    setattr(obj, field_name, new_id)
-                    obj.save(update_fields=[field_name])
-                    updates += 1
-            linked += updates
-            self.stdout.write(f"Relinked {updates} rows in {model._meta.db_table}.{field_name}")
-
-        self.stdout.write("Relinking foreign keys...")
+        id_map, created = self.build_map(dry_run)
+        changed = {old: new for old, new in id_map.items() if old != new}
+        verb = "would be created" if dry_run else "created"
+        self.stdout.write(f"Legacy users: {len(id_map)}, auth users {verb}: {created}, ids that change: {len(changed)}")
+
+        targets = [Target(*spec) for spec in TARGETS]
+        progress = self.load_progress()
+        for target in targets:
+            if (target.table, target.column) not in progress:
+                progress[(target.table, target.column)] = (None, self.max_pk(target))
+                if not dry_run:
+                    # fix the range up front: rows written from here on already use auth ids
+                    self.save_checkpoint(target, None, progress[(target.table, target.column)][1])
+
+        total = 0
+        started = time.perf_counter()
+        for target in targets:
+            last_key, max_pk = progress[(target.table, target.column)]
+            if dry_run:
+                count = self.count_pending(target, last_key, max_pk, changed)
+                self.stdout.write(f"{target}: {count} rows would be relinked")
+            else:
+                count = self.relink(target, last_key, max_pk, options["chunk_size"])
+            total += count
+
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS(f"Dry run. Total rows that would be relinked: {total}"))
+            return
+        # always, not only when this run relinked rows: an interrupted run may have moved them
+        self.stdout.write("Recounting helpful counters per author...")
+        reactions.rebuild_reactions()
+        caching.invalidate_all()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Done. Total relinked rows: {total} in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} rows/s)"
+        ))
+
+    def build_map(self, dry_run):
+        """Return ({legacy user_id: auth user id}, number of auth users created).
+
+        Mappings saved by an earlier run are reused as they are; only legacy
+        users without one are matched by username, or created.
+        """
+        User = get_user_model()
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT user_id, username, email FROM {q(LEGACY_TABLE)}")
+            legacy = cursor.fetchall()
+        id_map = self.load_map()
+        pending = [(user_id, username, email) for user_id, username, email in legacy if user_id not in id_map]
+
+        by_name = {}
+        for start in range(0, len(pending), 500):
+            names = [username for _, username, _ in pending[start:start + 500]]
+            by_name.update(User.objects.filter(username__in=names).values_list("username", "id"))
+        missing = [(username, email) for _, username, email in pending if username not in by_name]
+        if dry_run:
+            for user_id, username, _ in pending:
+                id_map[user_id] = by_name.get(username)
+            return id_map, len(missing)
+
         with transaction.atomic():
-            # Course.created_by
-            relink(Course, "created_by_id")
-            # Rating.user_id
-            relink(Rating, "user_id")
-            # Comment.user_id
-            relink(Comment, "user_id")
-            # CourseTag.user_id
-            relink(CourseTag, "user_id")
-            # RatingReaction.user_id
-            relink(RatingReaction, "user_id")
-            # Report.reporter_id
-            relink(Report, "reporter_id")
-            # Favorite.user_id
-            relink(Favorite, "user_id")
-
-        self.stdout.write(self.style.SUCCESS(f"Done. Total relinked rows: {linked}"))
+            password = make_password(None)
+            User.objects.bulk_create(
+                [User(username=username, email=email or "", password=password) for username, email in missing],
+                batch_size=500,
+            )
+            for start in range(0, len(missing), 500):
+                names = [username for username, _ in missing[start:start + 500]]
+                by_name.update(User.objects.filter(username__in=names).values_list("username", "id"))
+            new_rows = [(user_id, by_name[username]) for user_id, username, _ in pending]
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f"INSERT INTO {q(MAP_TABLE)} (old_id, new_id) VALUES (%s, %s) ON CONFLICT (old_id) DO NOTHING",
+                    new_rows,
+                )
+        id_map.update(new_rows)
+        return id_map, len(missing)
+
+    def create_tables(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {q(MAP_TABLE)} (old_id integer PRIMARY KEY, new_id integer NOT NULL)")
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {q(PROGRESS_TABLE)} ("
+                "table_name varchar(100) NOT NULL, column_name varchar(100) NOT NULL, "
+                "last_key integer NULL, max_pk integer NOT NULL, PRIMARY KEY (table_name, column_name))"
+            )
+
+    def load_map(self):
+        if MAP_TABLE not in connection.introspection.table_names():
+            return {}
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT old_id, new_id FROM {q(MAP_TABLE)}")
+            return dict(cursor.fetchall())
+
+    def load_progress(self):
+        if PROGRESS_TABLE not in connection.introspection.table_names():
+            return {}
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT table_name, column_name, last_key, max_pk FROM {q(PROGRESS_TABLE)}")
+            return {(table, column): (last_key, max_pk) for table, column, last_key, max_pk in cursor.fetchall()}
+
+    def save_checkpoint(self, target, last_key, max_pk):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {q(PROGRESS_TABLE)} (table_name, column_name, last_key, max_pk) VALUES (%s, %s, %s, %s) "
+                "ON CONFLICT (table_name, column_name) DO UPDATE SET last_key = excluded.last_key",
+                [target.table, target.column, last_key, max_pk],
+            )
+
+    def max_pk(self, target):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT MAX({q(target.pk)}) FROM {q(target.table)}")
+            return cursor.fetchone()[0] or 0
+
+    def _pending_where(self, target, last_key):
+        """WHERE clause and its params for the rows not relinked yet."""
+        where = f"{q(target.pk)} <= %s AND {q(target.key)} IS NOT NULL"
+        if last_key is not None:
+            return f"{where} AND {q(target.key)} > %s", [last_key]
+        return where, []
+
+    def count_pending(self, target, last_key, max_pk, changed):
+        where, params = self._pending_where(target, last_key)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT {q(target.column)}, COUNT(*) FROM {q(target.table)} WHERE {where} GROUP BY {q(target.column)}",
+                [max_pk, *params],
+            )
+            return sum(n for value, n in cursor.fetchall() if value in changed)
+
+    def relink(self, target, last_key, max_pk, chunk_size):
+        """Relink one column chunk by chunk; each chunk commits together with its checkpoint.
+
+        Ids move in two steps within the chunk, to the negated new id and then
+        back to positive, so a row never takes an id another row of the chunk
+        still holds; the unique (user, X) constraints would reject that even
+        when the end state is valid. Foreign keys are checked at commit.
+        """
+        table, column, key = q(target.table), q(target.column), q(target.key)
+        # a chunk ends at a key value and includes all of its rows, so a key is never split
+        next_sql = f"SELECT {key} FROM {table} WHERE {{where}} ORDER BY {key} LIMIT 1 OFFSET %s"
+        last_sql = f"SELECT MAX({key}) FROM {table} WHERE {{where}}"
+        move_sql = (
+            f"UPDATE {table} SET {column} = -(SELECT m.new_id FROM {q(MAP_TABLE)} m WHERE m.old_id = {table}.{column}) "
+            f"WHERE {{where}} AND {key} <= %s AND {column} IN (SELECT old_id FROM {q(MAP_TABLE)} WHERE old_id <> new_id)"
+        )
+        settle_sql = f"UPDATE {table} SET {column} = -{column} WHERE {{where}} AND {key} <= %s AND {column} < 0"
+
+        updated = 0
+        started = time.perf_counter()
+        while True:
+            where, params = self._pending_where(target, last_key)
+            params = [max_pk, *params]
+            upper = None
+            try:
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.execute(next_sql.format(where=where), [*params, chunk_size - 1])
+                    row = cursor.fetchone()
+                    if row is None:
+                        cursor.execute(last_sql.format(where=where), params)
+                        row = cursor.fetchone()
+                    upper = row[0]
+                    if upper is None:
+                        break
+                    cursor.execute(move_sql.format(where=where), [*params, upper])
+                    updated += cursor.rowcount
+                    cursor.execute(settle_sql.format(where=where), [*params, upper])
+                    self.save_checkpoint(target, upper, max_pk)
+            except IntegrityError as exc:
+                raise CommandError(
+                    f"{target}: relinking {target.key} in ({last_key}, {upper}] failed: {exc}. "
+                    "Earlier chunks are committed; resolve the conflicting rows and run the command again."
+                )
+            last_key = upper
+            if self.verbosity > 1:
+                self.stdout.write(f"  {target}: {target.key} up to {last_key}, {updated} relinked")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{target}: relinked {updated} rows in {elapsed:.1f}s ({updated / elapsed if elapsed else 0:.0f} rows/s)"
+        )
+        return updated
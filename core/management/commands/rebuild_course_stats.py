@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.reactions import check_reactions, rebuild_reactions
+from core.stats import check_stats, rebuild_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the course_stats tables from rating and the reaction counters from rating_reaction, or only report drift with --check"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help="Compare against a recomputation without writing; exit non-zero on drift")
+
+    def handle(self, *args, **options):
+        if options["check"]:
+            problems = check_stats() + check_reactions()
+            for line in problems:
+                self.stdout.write(line)
+            if problems:
+                raise CommandError(f"course stats drift: {len(problems)} mismatches")
+            self.stdout.write(self.style.SUCCESS("Course stats and reaction counters match their source tables."))
+            return
+
+        rebuild_stats()
+        rebuild_reactions()
+        problems = check_stats() + check_reactions()
+        if problems:
+            raise CommandError(f"course stats still differ after rebuild: {len(problems)} mismatches")
+        self.stdout.write(self.style.SUCCESS("Course stats and reaction counters rebuilt."))
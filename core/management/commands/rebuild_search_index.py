@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.search import index_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the course full-text search index (course_search)"
+
+    def handle(self, *args, **options):
+        if not index_available():
+            raise CommandError("course_search does not exist; run migrate on an SQLite build with FTS5")
+        total = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} courses."))
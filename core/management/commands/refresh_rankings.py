@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, close_old_connections
+
+from core.rankings import SNAPSHOT_MAX_AGE, refresh_snapshots
+
+
+class Command(BaseCommand):
+    help = "Materialize the leaderboards of every rankings filter into ranking_snapshot, once or every --interval seconds"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval", type=int, default=0,
+            help=f"Keep running and refresh every this many seconds (snapshots are served for {SNAPSHOT_MAX_AGE}s)",
+        )
+
+    def handle(self, *args, **options):
+        interval = options["interval"]
+        if interval < 0:
+            raise CommandError("--interval must not be negative")
+        if interval >= SNAPSHOT_MAX_AGE:
+            self.stderr.write(f"--interval {interval} is not below RANKING_SNAPSHOT_MAX_AGE ({SNAPSHOT_MAX_AGE}); "
+                              "pages will fall back to computing the boards between refreshes")
+        log = self.stdout.write if options["verbosity"] > 1 else None
+        while True:
+            started = time.perf_counter()
+            try:
+                written = refresh_snapshots(log=log)
+            except DatabaseError as exc:
+                if not interval:
+                    raise CommandError(f"refresh failed: {exc}")
+                self.stderr.write(f"refresh failed, retrying in {interval}s: {exc}")
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Refreshed {len(written)} ranking snapshots in {time.perf_counter() - started:.1f}s"
+                ))
+            if not interval:
+                return
+            # a long-running process must not keep a connection past CONN_MAX_AGE
+            close_old_connections()
+            time.sleep(interval)
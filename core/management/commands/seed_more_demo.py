@@ -86,7 +86,6 @@ class Command(BaseCommand):
         ]
 
         ct_id = 90001
-        next_tag_id = (Tag.objects.order_by('-tag_id').values_list('tag_id', flat=True).first() or 10000) + 1
         ci_id = 51000
         for entry in data:
             cdef = entry["course"]
@@ -136,12 +135,7 @@ class Command(BaseCommand):
                 )
 
             for tname in entry["tags"]:
-                try:
-                    tag = Tag.objects.get(name=tname)
-                except Tag.DoesNotExist:
-                    tag = Tag(tag_id=next_tag_id, name=tname)
-                    tag.save()
-                    next_tag_id += 1
+                tag, _ = Tag.objects.get_or_create(name=tname)
                 ct_id += 1
                 CourseTag.objects.get_or_create(
                     id=ct_id,
@@ -154,10 +148,8 @@ class Command(BaseCommand):
                 )
 
         # attach some comments to ratings
-        com_id = (Comment.objects.order_by('-comment_id').values_list('comment_id', flat=True).first() or 80000) + 1
-        react_id = (RatingReaction.objects.order_by('-id').values_list('id', flat=True).first() or 90000) + 1
         r_all = Rating.objects.filter(rating_id__gte=70011, rating_id__lte=70042)
-        from random import randint, choice
+        from random import randint, choice, random, sample
         commenters = [u1, u2, u3, u4, u5]
         for r in r_all:
             base_comments = [
@@ -170,18 +162,15 @@ class Command(BaseCommand):
             for _ in range(randint(3, 5)):
                 txt = choice(base_comments)
                 c = Comment.objects.create(
-                    comment_id=com_id,
                     rating=r,
                     user=choice(commenters),
                     parent_comment=None,
                     text=txt,
                     created_at=timezone.now(),
                 )
-                com_id += 1
                 # replies 0-2
                 for _r in range(randint(0, 2)):
                     Comment.objects.create(
-                        comment_id=com_id,
                         rating=r,
                         user=choice(commenters),
                         parent_comment=c,
@@ -192,24 +181,14 @@ class Command(BaseCommand):
                         ]),
                         created_at=timezone.now(),
                     )
-                    com_id += 1
-            # reactions: helpful / not_helpful
-            for _ in range(randint(2, 7)):
-                RatingReaction.objects.create(
-                    id=react_id,
+            # reactions: helpful / not_helpful, at most one per user and rating
+            for reactor in sample(commenters, randint(2, len(commenters))):
+                RatingReaction.objects.get_or_create(
                     rating=r,
-                    user=choice(commenters),
-                    reaction_type="helpful",
-                    created_at=timezone.now(),
-                )
-                react_id += 1
-            for _ in range(randint(0, 3)):
-                RatingReaction.objects.create(
-                    id=react_id,
-                    rating=r,
-                    user=choice(commenters),
-                    reaction_type="not_helpful",
-                    created_at=timezone.now(),
+                    user=reactor,
+                    defaults={
+                        "reaction_type": "helpful" if random() < 0.7 else "not_helpful",
+                        "created_at": timezone.now(),
+                    },
                 )
-                react_id += 1
         self.stdout.write(self.style.SUCCESS("Seeded more demo courses, instructors, ratings, comments and tags."))
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import caching, synthetic
+
+
+class Command(BaseCommand):
+    help = "Bulk-generate a reproducible synthetic data set with Zipf-skewed course popularity"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--schools", type=int, default=20)
+        parser.add_argument("--courses-per-school", type=int, default=50)
+        parser.add_argument("--instructors-per-school", type=int, default=30)
+        parser.add_argument("--users", type=int, default=5000)
+        parser.add_argument("--ratings", type=int, default=100_000)
+        parser.add_argument("--comments", type=int, default=20_000)
+        parser.add_argument("--reactions", type=int, default=50_000)
+        parser.add_argument("--favorites", type=int, default=10_000)
+        parser.add_argument("--tags-per-course", type=int, default=3, help="Upper bound of tags per course")
+        parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of course popularity (0: uniform)")
+        parser.add_argument("--days", type=int, default=730, help="Spread created_at over this many past days")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed; equal seeds give equal data")
+        parser.add_argument("--prefix", default="synth", help="Prefix of generated usernames, school and instructor names")
+        parser.add_argument("--batch-size", type=int, default=synthetic.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        sizes = {k: options[k] for k in (
+            "schools", "courses_per_school", "instructors_per_school", "users", "ratings",
+            "comments", "reactions", "favorites", "tags_per_course", "days", "batch_size",
+        )}
+        if min(sizes.values()) < 0 or options["batch_size"] < 1 or options["skew"] < 0:
+            raise CommandError("counts must not be negative")
+        if options["days"] < 1:
+            # created_at is drawn from the last --days days
+            raise CommandError("--days must be at least 1")
+        if options["instructors_per_school"] < 1 and options["courses_per_school"]:
+            raise CommandError("courses need at least one instructor per school")
+
+        started = time.perf_counter()
+
+        def log(step):
+            self.stdout.write(f"[{time.perf_counter() - started:6.1f}s] {step}")
+
+        counts = synthetic.generate(skew=options["skew"], seed=options["seed"], prefix=options["prefix"], log=log, **sizes)
+        caching.invalidate_all()
+        self.stdout.write(self.style.SUCCESS(
+            ", ".join(f"{n} {table}" for table, n in counts.items()) + f" in {time.perf_counter() - started:.1f}s"
+        ))
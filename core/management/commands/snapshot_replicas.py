@@ -0,0 +1,30 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = "Copy the primary SQLite database into every configured read replica (DB_REPLICAS)"
+
+    def handle(self, *args, **options):
+        replicas = getattr(settings, "DATABASE_REPLICAS", [])
+        if not replicas:
+            raise CommandError("No replicas configured; set DB_REPLICAS to a comma-separated list of files")
+        primary = connections["default"]
+        if primary.vendor != "sqlite":
+            raise CommandError("snapshot_replicas copies SQLite files; use the database's own replication otherwise")
+        primary.ensure_connection()
+        for alias in replicas:
+            connections[alias].close()
+            started = time.perf_counter()
+            # the backup API copies a consistent snapshot while the site keeps writing
+            target = sqlite3.connect(settings.DATABASES[alias]["NAME"])
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(f"{alias}: {settings.DATABASES[alias]['NAME']} in {time.perf_counter() - started:.1f}s")
+        self.stdout.write(self.style.SUCCESS(f"Copied the primary into {len(replicas)} replica(s)"))
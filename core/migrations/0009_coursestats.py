@@ -0,0 +1,77 @@
+# Generated by Django 4.2.27 on 2026-10-17 11:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_stats(apps, schema_editor):
+    Rating = apps.get_model("core", "Rating")
+    CourseStats = apps.get_model("core", "CourseStats")
+    CourseInstructorStats = apps.get_model("core", "CourseInstructorStats")
+    fields = {"overall": "overall_score", "difficulty": "difficulty", "usefulness": "usefulness", "workload": "workload"}
+
+    course_rows = []
+    for row in Rating.objects.values("course_id").annotate(
+        rating_count=models.Count("rating_id"),
+        **{f"{prefix}_sum": models.Sum(field) for prefix, field in fields.items()},
+    ):
+        for prefix in fields:
+            row[f"avg_{prefix}"] = row[f"{prefix}_sum"] / row["rating_count"]
+        course_rows.append(CourseStats(**row))
+    CourseStats.objects.bulk_create(course_rows, batch_size=1000)
+
+    instructor_rows = []
+    for row in (
+        Rating.objects.filter(instructor_id__isnull=False)
+        .values("course_id", "instructor_id")
+        .annotate(rating_count=models.Count("rating_id"), overall_sum=models.Sum("overall_score"))
+    ):
+        row["avg_overall"] = row["overall_sum"] / row["rating_count"]
+        instructor_rows.append(CourseInstructorStats(**row))
+    CourseInstructorStats.objects.bulk_create(instructor_rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_rating_instructor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseStats',
+            fields=[
+                ('course', models.OneToOneField(db_column='course_id', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.course')),
+                ('rating_count', models.IntegerField(default=0)),
+                ('overall_sum', models.IntegerField(default=0)),
+                ('difficulty_sum', models.IntegerField(default=0)),
+                ('usefulness_sum', models.IntegerField(default=0)),
+                ('workload_sum', models.IntegerField(default=0)),
+                ('avg_overall', models.FloatField(default=0)),
+                ('avg_difficulty', models.FloatField(default=0)),
+                ('avg_usefulness', models.FloatField(default=0)),
+                ('avg_workload', models.FloatField(default=0)),
+            ],
+            options={
+                'db_table': 'course_stats',
+                'managed': True,
+            },
+        ),
+        migrations.CreateModel(
+            name='CourseInstructorStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating_count', models.IntegerField(default=0)),
+                ('overall_sum', models.IntegerField(default=0)),
+                ('avg_overall', models.FloatField(default=0)),
+                ('course', models.ForeignKey(db_column='course_id', on_delete=django.db.models.deletion.CASCADE, to='core.course')),
+                ('instructor', models.ForeignKey(db_column='instructor_id', on_delete=django.db.models.deletion.CASCADE, to='core.instructor')),
+            ],
+            options={
+                'db_table': 'course_instructor_stats',
+                'managed': True,
+                'unique_together': {('course', 'instructor')},
+            },
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+import re
+
+from django.db import migrations
+
+
+# The index as core.search defined it when this migration was written; copied
+# here so later changes to the search module cannot change what it builds.
+TABLE = "course_search"
+COLUMNS = ("title", "code", "description", "school_name")
+
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_RUN_RE = re.compile(rf"[{_CJK}]+|[^\W_{_CJK}]+")
+_CJK_RE = re.compile(rf"[{_CJK}]")
+
+
+def tokenize(text):
+    tokens = []
+    for run in _RUN_RE.findall((text or "").lower()):
+        tokens.extend([run[i:i + 2] for i in range(len(run) - 1)] + [run[-1]] if _CJK_RE.match(run) else [run])
+    return " ".join(tokens)
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5({', '.join(COLUMNS)}, tokenize='unicode61')"
+            )
+        except Exception:
+            # SQLite built without FTS5: search falls back to LIKE scans
+            return
+        Course = apps.get_model("core", "Course")
+        rows = [
+            (c.course_id, tokenize(c.title), tokenize(c.code), tokenize(c.description), tokenize(c.school.name if c.school else ""))
+            for c in Course.objects.select_related("school")
+        ]
+        cursor.executemany(
+            f"INSERT INTO {TABLE} (rowid, {', '.join(COLUMNS)}) VALUES (%s, %s, %s, %s, %s)",
+            rows,
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_coursestats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
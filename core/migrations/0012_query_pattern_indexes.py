@@ -0,0 +1,57 @@
+# Generated by Django 4.2.27 on 2026-10-17 11:10
+
+from django.db import migrations, models
+
+
+def drop_duplicates(apps, schema_editor):
+    # the unique constraints below would fail on rows written by the old read-then-write views
+    RatingReaction = apps.get_model("core", "RatingReaction")
+    Favorite = apps.get_model("core", "Favorite")
+    # the latest reaction of a user on a rating is the one that counts
+    keep = RatingReaction.objects.values("user_id", "rating_id").annotate(last=models.Max("id")).values("last")
+    RatingReaction.objects.exclude(id__in=keep).delete()
+    keep = Favorite.objects.values("user_id", "course_id").annotate(first=models.Min("id")).values("first")
+    Favorite.objects.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_autofield_primary_keys'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['rating', 'created_at'], name='comment_rating_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['status', 'school', 'category'], name='course_status_school_cat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rating',
+            index=models.Index(fields=['course', 'instructor'], name='rating_course_instructor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rating',
+            index=models.Index(fields=['course', 'created_at'], name='rating_course_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rating',
+            index=models.Index(fields=['user', 'course'], name='rating_user_course_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ratingreaction',
+            index=models.Index(fields=['rating', 'reaction_type'], name='reaction_rating_type_idx'),
+        ),
+        migrations.RunPython(drop_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='favorite',
+            constraint=models.UniqueConstraint(fields=('user', 'course'), name='favorite_user_course_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='ratingreaction',
+            constraint=models.UniqueConstraint(fields=('user', 'rating'), name='rating_reaction_user_rating_uniq'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.27 on 2026-10-17 11:19
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_counters(apps, schema_editor):
+    Rating = apps.get_model("core", "Rating")
+    RatingReaction = apps.get_model("core", "RatingReaction")
+    UserHelpfulStats = apps.get_model("core", "UserHelpfulStats")
+    fields = {"helpful": "helpful_count", "not_helpful": "not_helpful_count"}
+
+    for reaction_type, field in fields.items():
+        for row in (
+            RatingReaction.objects.filter(reaction_type=reaction_type)
+            .values("rating_id")
+            .annotate(n=models.Count("id"))
+        ):
+            Rating.objects.filter(rating_id=row["rating_id"]).update(**{field: row["n"]})
+
+    authors = {}
+    for row in (
+        RatingReaction.objects.filter(reaction_type__in=fields)
+        .values("rating__user_id", "reaction_type")
+        .annotate(n=models.Count("id"))
+    ):
+        authors.setdefault(row["rating__user_id"], {})[fields[row["reaction_type"]]] = row["n"]
+    UserHelpfulStats.objects.bulk_create(
+        [UserHelpfulStats(user_id=user_id, **counts) for user_id, counts in authors.items()], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0012_query_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserHelpfulStats',
+            fields=[
+                ('user', models.OneToOneField(db_column='user_id', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='helpful_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('helpful_count', models.IntegerField(default=0)),
+                ('not_helpful_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'user_helpful_stats',
+                'managed': True,
+            },
+        ),
+        migrations.AddField(
+            model_name='rating',
+            name='helpful_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='rating',
+            name='not_helpful_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
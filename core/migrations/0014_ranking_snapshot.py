@@ -0,0 +1,27 @@
+# Generated by Django 4.2.27 on 2026-10-17 11:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_reaction_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankingSnapshot',
+            fields=[
+                ('scope', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('school_id', models.IntegerField(blank=True, null=True)),
+                ('category_id', models.IntegerField(blank=True, null=True)),
+                ('boards', models.JSONField()),
+                ('generated_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'ranking_snapshot',
+                'managed': True,
+            },
+        ),
+    ]
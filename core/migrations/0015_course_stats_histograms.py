@@ -0,0 +1,129 @@
+# Generated by Django 4.2.27 on 2026-10-17 11:48
+
+from django.db import migrations, models
+
+
+SCORE_FIELDS = {"overall": "overall_score", "difficulty": "difficulty", "usefulness": "usefulness", "workload": "workload"}
+
+
+def backfill_histograms(apps, schema_editor):
+    Rating = apps.get_model("core", "Rating")
+    CourseStats = apps.get_model("core", "CourseStats")
+    rows = Rating.objects.values("course_id").annotate(**{
+        f"{prefix}_{score}": models.Count("rating_id", filter=models.Q(**{field: score}))
+        for prefix, field in SCORE_FIELDS.items()
+        for score in range(1, 6)
+    })
+    for row in rows:
+        CourseStats.objects.filter(course_id=row.pop("course_id")).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_ranking_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coursestats',
+            name='difficulty_1',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='coursestats',
+            name='difficulty_2',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='coursestats',
+            name='difficulty_3',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='coursestats',
+            name='difficulty_4',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='coursestats',
+            name='difficulty_5',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='coursestats',
+            name='overall_1',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='coursestats',
+            name='overall_2',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='coursestats',
+            name='overall_3',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='coursestats',
+            name='overall_4',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='coursestats',
+            name='overall_5',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='coursestats',
+            name='usefulness_1',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='coursestats',
+            name='usefulness_2',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='coursestats',
+            name='usefulness_3',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='coursestats',
+            name='usefulness_4',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='coursestats',
+            name='usefulness_5',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='coursestats',
+            name='workload_1',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='coursestats',
+            name='workload_2',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='coursestats',
+            name='workload_3',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='coursestats',
+            name='workload_4',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='coursestats',
+            name='workload_5',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_histograms, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-17 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_course_stats_histograms'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rankingsnapshot',
+            name='priors',
+            field=models.JSONField(default=dict),
+        ),
+    ]
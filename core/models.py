@@ -6,7 +6,7 @@ from django.conf import settings
 
 
 class School(models.Model):
-    school_id = models.IntegerField(primary_key=True)
+    school_id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=200)
     SCHOOL_TYPE_CHOICES = (
         ("university", "university"),
@@ -25,7 +25,7 @@ class School(models.Model):
 
 
 class Course(models.Model):
-    course_id = models.IntegerField(primary_key=True)
+    course_id = models.AutoField(primary_key=True)
     code = models.CharField(max_length=50, null=True, blank=True)
     title = models.CharField(max_length=200)
     description = models.TextField(null=True, blank=True)
@@ -43,13 +43,16 @@ class Course(models.Model):
     class Meta:
         db_table = "course"
         managed = True
+        indexes = [
+            models.Index(fields=["status", "school", "category"], name="course_status_school_cat_idx"),
+        ]
 
     def __str__(self):
         return f"{self.title}" if not self.code else f"{self.title} ({self.code})"
 
 
 class Instructor(models.Model):
-    instructor_id = models.IntegerField(primary_key=True)
+    instructor_id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=200)
     profile = models.TextField(null=True, blank=True)
     school = models.ForeignKey(School, on_delete=models.SET_NULL, null=True, db_column="school_id", to_field="school_id")
@@ -63,7 +66,7 @@ class Instructor(models.Model):
 
 
 class Category(models.Model):
-    category_id = models.IntegerField(primary_key=True)
+    category_id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=100, unique=True)
 
     class Meta:
@@ -75,7 +78,7 @@ class Category(models.Model):
 
 
 class CourseInstructor(models.Model):
-    id = models.IntegerField(primary_key=True)
+    id = models.AutoField(primary_key=True)
     course = models.ForeignKey(Course, on_delete=models.CASCADE, db_column="course_id", to_field="course_id")
     instructor = models.ForeignKey(Instructor, on_delete=models.CASCADE, db_column="instructor_id", to_field="instructor_id")
     semester = models.CharField(max_length=50, null=True, blank=True)
@@ -87,7 +90,7 @@ class CourseInstructor(models.Model):
 
 
 class Rating(models.Model):
-    rating_id = models.IntegerField(primary_key=True)
+    rating_id = models.AutoField(primary_key=True)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_column="user_id")
     course = models.ForeignKey(Course, on_delete=models.CASCADE, db_column="course_id", to_field="course_id")
     instructor = models.ForeignKey('Instructor', on_delete=models.SET_NULL, null=True, db_column='instructor_id', to_field='instructor_id')
@@ -98,14 +101,22 @@ class Rating(models.Model):
     comment_text = models.TextField(null=True, blank=True)
     anonymous_flag = models.BooleanField(default=False)
     created_at = models.DateTimeField(null=True, blank=True)
+    # reaction totals, maintained by core.reactions
+    helpful_count = models.IntegerField(default=0, editable=False)
+    not_helpful_count = models.IntegerField(default=0, editable=False)
 
     class Meta:
         db_table = "rating"
         managed = True
+        indexes = [
+            models.Index(fields=["course", "instructor"], name="rating_course_instructor_idx"),
+            models.Index(fields=["course", "created_at"], name="rating_course_created_idx"),
+            models.Index(fields=["user", "course"], name="rating_user_course_idx"),
+        ]
 
 
 class Comment(models.Model):
-    comment_id = models.IntegerField(primary_key=True)
+    comment_id = models.AutoField(primary_key=True)
     rating = models.ForeignKey(Rating, on_delete=models.CASCADE, db_column="rating_id", to_field="rating_id")
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_column="user_id")
     parent_comment = models.ForeignKey("self", on_delete=models.SET_NULL, null=True, db_column="parent_comment_id", to_field="comment_id")
@@ -115,10 +126,13 @@ class Comment(models.Model):
     class Meta:
         db_table = "comment"
         managed = True
+        indexes = [
+            models.Index(fields=["rating", "created_at"], name="comment_rating_created_idx"),
+        ]
 
 
 class Tag(models.Model):
-    tag_id = models.IntegerField(primary_key=True)
+    tag_id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=50, unique=True)
 
     class Meta:
@@ -130,7 +144,7 @@ class Tag(models.Model):
 
 
 class CourseTag(models.Model):
-    id = models.IntegerField(primary_key=True)
+    id = models.AutoField(primary_key=True)
     course = models.ForeignKey(Course, on_delete=models.CASCADE, db_column="course_id", to_field="course_id")
     tag = models.ForeignKey(Tag, on_delete=models.CASCADE, db_column="tag_id", to_field="tag_id")
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_column="user_id")
@@ -142,7 +156,7 @@ class CourseTag(models.Model):
 
 
 class RatingReaction(models.Model):
-    id = models.IntegerField(primary_key=True)
+    id = models.AutoField(primary_key=True)
     rating = models.ForeignKey(Rating, on_delete=models.CASCADE, db_column="rating_id", to_field="rating_id")
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_column="user_id")
     reaction_type = models.CharField(max_length=20)
@@ -151,10 +165,16 @@ class RatingReaction(models.Model):
     class Meta:
         db_table = "rating_reaction"
         managed = True
+        constraints = [
+            models.UniqueConstraint(fields=["user", "rating"], name="rating_reaction_user_rating_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["rating", "reaction_type"], name="reaction_rating_type_idx"),
+        ]
 
 
 class Report(models.Model):
-    report_id = models.IntegerField(primary_key=True)
+    report_id = models.AutoField(primary_key=True)
     reporter = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_column="reporter_id")
     reported_entity_type = models.CharField(max_length=20)
     entity_id = models.IntegerField()
@@ -168,7 +188,7 @@ class Report(models.Model):
 
 
 class Favorite(models.Model):
-    id = models.IntegerField(primary_key=True)
+    id = models.AutoField(primary_key=True)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_column="user_id")
     course = models.ForeignKey(Course, on_delete=models.CASCADE, db_column="course_id", to_field="course_id")
     created_at = models.DateTimeField(null=True, blank=True)
@@ -176,6 +196,9 @@ class Favorite(models.Model):
     class Meta:
         db_table = "favorite"
         managed = True
+        constraints = [
+            models.UniqueConstraint(fields=["user", "course"], name="favorite_user_course_uniq"),
+        ]
 
 
 class UserDisclaimer(models.Model):
@@ -185,3 +208,88 @@ class UserDisclaimer(models.Model):
     class Meta:
         db_table = "user_disclaimer"
         managed = True
+
+
+class CourseStats(models.Model):
+    """Denormalized rating aggregates per course, kept in step with `rating` by core.stats."""
+
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, db_column="course_id", to_field="course_id", related_name="stats")
+    rating_count = models.IntegerField(default=0)
+    overall_sum = models.IntegerField(default=0)
+    difficulty_sum = models.IntegerField(default=0)
+    usefulness_sum = models.IntegerField(default=0)
+    workload_sum = models.IntegerField(default=0)
+    avg_overall = models.FloatField(default=0)
+    avg_difficulty = models.FloatField(default=0)
+    avg_usefulness = models.FloatField(default=0)
+    avg_workload = models.FloatField(default=0)
+    # how many ratings gave each score from 1 to 5 (core.stats.SCORES)
+    overall_1 = models.IntegerField(default=0)
+    overall_2 = models.IntegerField(default=0)
+    overall_3 = models.IntegerField(default=0)
+    overall_4 = models.IntegerField(default=0)
+    overall_5 = models.IntegerField(default=0)
+    difficulty_1 = models.IntegerField(default=0)
+    difficulty_2 = models.IntegerField(default=0)
+    difficulty_3 = models.IntegerField(default=0)
+    difficulty_4 = models.IntegerField(default=0)
+    difficulty_5 = models.IntegerField(default=0)
+    usefulness_1 = models.IntegerField(default=0)
+    usefulness_2 = models.IntegerField(default=0)
+    usefulness_3 = models.IntegerField(default=0)
+    usefulness_4 = models.IntegerField(default=0)
+    usefulness_5 = models.IntegerField(default=0)
+    workload_1 = models.IntegerField(default=0)
+    workload_2 = models.IntegerField(default=0)
+    workload_3 = models.IntegerField(default=0)
+    workload_4 = models.IntegerField(default=0)
+    workload_5 = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = "course_stats"
+        managed = True
+
+
+class CourseInstructorStats(models.Model):
+    """Per-instructor breakdown of a course's ratings (ratings without an instructor are not counted here)."""
+
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, db_column="course_id", to_field="course_id")
+    instructor = models.ForeignKey(Instructor, on_delete=models.CASCADE, db_column="instructor_id", to_field="instructor_id")
+    rating_count = models.IntegerField(default=0)
+    overall_sum = models.IntegerField(default=0)
+    avg_overall = models.FloatField(default=0)
+
+    class Meta:
+        db_table = "course_instructor_stats"
+        managed = True
+        unique_together = (("course", "instructor"),)
+
+
+class UserHelpfulStats(models.Model):
+    """Reactions received on all of a user's ratings, kept in step with `rating_reaction` by core.reactions."""
+
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, db_column="user_id", related_name="helpful_stats")
+    helpful_count = models.IntegerField(default=0)
+    not_helpful_count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = "user_helpful_stats"
+        managed = True
+
+
+class RankingSnapshot(models.Model):
+    """Materialized leaderboards of one rankings filter, written by core.rankings.refresh_snapshots."""
+
+    # "<school_id>:<category_id>", either part empty when not filtered on
+    scope = models.CharField(max_length=50, primary_key=True)
+    school_id = models.IntegerField(null=True, blank=True)
+    category_id = models.IntegerField(null=True, blank=True)
+    # board name -> rows of ids and numbers; objects are looked up when served
+    boards = models.JSONField()
+    # site-wide score means the boards were scored against (core.scoring)
+    priors = models.JSONField(default=dict)
+    generated_at = models.DateTimeField()
+
+    class Meta:
+        db_table = "ranking_snapshot"
+        managed = True
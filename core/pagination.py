@@ -0,0 +1,124 @@
+"""Keyset (cursor) pagination: every page is one indexed range scan, however deep."""
+
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import Q
+
+PAGE_SIZE = 20
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def parse_cursor(raw):
+    try:
+        return int(raw) if raw not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def keyset_page(qs, field, after=None, before=None, size=PAGE_SIZE):
+    """Return one page of `qs` ordered by the unique column `field`.
+
+    `after` continues forward from a cursor, `before` walks back from one. The
+    result is a dict with the page items and the cursors of the neighbouring
+    pages (None when there is no such page).
+    """
+    if before is not None:
+        rows = list(qs.filter(**{f"{field}__lt": before}).order_by(f"-{field}")[: size + 1])
+        has_prev = len(rows) > size
+        rows = rows[:size]
+        rows.reverse()
+        has_next = True
+    else:
+        if after is not None:
+            qs = qs.filter(**{f"{field}__gt": after})
+        rows = list(qs.order_by(field)[: size + 1])
+        has_next = len(rows) > size
+        rows = rows[:size]
+        has_prev = after is not None
+    return {
+        "items": rows,
+        "next_cursor": getattr(rows[-1], field) if rows and has_next else None,
+        "prev_cursor": getattr(rows[0], field) if rows and has_prev else None,
+    }
+
+
+def page_query(params, **cursor):
+    """Query string for a neighbouring page, keeping the current filters."""
+    params = params.copy()
+    for name in ("after", "before"):
+        params.pop(name, None)
+    for name, value in cursor.items():
+        params[name] = value
+    return params.urlencode()
+
+
+def list_page(ids, after=None, before=None, size=PAGE_SIZE):
+    """Same contract as keyset_page, over an already ordered list of ids (e.g. search results)."""
+    position = {value: i for i, value in enumerate(ids)}
+    if before is not None and before in position:
+        end = position[before]
+        start = max(0, end - size)
+    else:
+        start = position[after] + 1 if after in position else 0
+        end = start + size
+    chunk = ids[start:end]
+    return {
+        "items": chunk,
+        "next_cursor": chunk[-1] if chunk and end < len(ids) else None,
+        "prev_cursor": chunk[0] if chunk and start > 0 else None,
+    }
+
+
+def time_cursor(obj, field="created_at"):
+    """Cursor for newest_page: the row's timestamp in epoch microseconds (or "n" if unset) and its pk."""
+    value = getattr(obj, field)
+    micros = "n" if value is None else (value - _EPOCH) // timedelta(microseconds=1)
+    return f"{micros}-{obj.pk}"
+
+
+def parse_time_cursor(raw):
+    try:
+        micros, pk = str(raw).split("-")
+        return (None if micros == "n" else _EPOCH + timedelta(microseconds=int(micros))), int(pk)
+    except (TypeError, ValueError):
+        return None
+
+
+def _older(field, t, pk):
+    if t is None:
+        return Q(**{f"{field}__isnull": True, "pk__lt": pk})
+    # the redundant __lte bound lets SQLite seek into the (..., field) index
+    return Q(**{f"{field}__lte": t}) & (Q(**{f"{field}__lt": t}) | Q(pk__lt=pk))
+
+
+def _newer(field, t, pk):
+    if t is None:
+        return Q(**{f"{field}__isnull": False}) | Q(**{f"{field}__isnull": True, "pk__gt": pk})
+    return Q(**{f"{field}__gte": t}) & (Q(**{f"{field}__gt": t}) | Q(pk__gt=pk))
+
+
+def newest_page(qs, after=None, before=None, size=PAGE_SIZE, field="created_at"):
+    """Same contract as keyset_page, newest first by the non-unique `field`, pk breaking ties.
+
+    Cursors come from time_cursor; pass them through parse_time_cursor first.
+    NULL timestamps sort last, as SQLite orders them in a descending scan.
+    """
+    if before is not None:
+        rows = list(qs.filter(_newer(field, *before)).order_by(field, "pk")[: size + 1])
+        has_prev = len(rows) > size
+        rows = rows[:size]
+        rows.reverse()
+        has_next = True
+    else:
+        rows = list((qs.filter(_older(field, *after)) if after is not None else qs).order_by(f"-{field}", "-pk")[: size + 1])
+        if len(rows) <= size and after is not None and after[0] is not None:
+            # past the dated rows: continue into the undated tail
+            rows += qs.filter(**{f"{field}__isnull": True}).order_by("-pk")[: size + 1 - len(rows)]
+        has_next = len(rows) > size
+        rows = rows[:size]
+        has_prev = after is not None
+    return {
+        "items": rows,
+        "next_cursor": time_cursor(rows[-1], field) if rows and has_next else None,
+        "prev_cursor": time_cursor(rows[0], field) if rows and has_prev else None,
+    }
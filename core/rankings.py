@@ -0,0 +1,258 @@
+"""Set-based leaderboards: every board is one query over the stats tables, whatever the catalogue size.
+
+Boards rank by the confidence-weighted scores of core.scoring, not raw averages.
+
+`manage.py refresh_rankings` materializes the boards of every filter into
+RankingSnapshot rows; get_rankings() serves a snapshot younger than
+RANKING_SNAPSHOT_MAX_AGE seconds and builds the boards on demand otherwise.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import F, FloatField, Sum
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from . import caching, scoring
+from .models import Course, CourseInstructorStats, CourseStats, Instructor, Rating, RankingSnapshot
+
+TOP_N = 10
+SNAPSHOT_MAX_AGE = getattr(settings, "RANKING_SNAPSHOT_MAX_AGE", 900)
+
+
+def approved_courses(school_id=None, category_id=None):
+    course_qs = Course.objects.filter(status="approved")
+    if school_id:
+        course_qs = course_qs.filter(school_id=school_id)
+    if category_id:
+        course_qs = course_qs.filter(category_id=category_id)
+    return course_qs
+
+
+def _attach(rows, model, key, attr):
+    """Replace the grouped foreign key in each row with its object, fetched in one query."""
+    objs = model.objects.in_bulk([row[key] for row in rows])
+    out = []
+    for row in rows:
+        obj = objs.get(row.pop(key))
+        if obj is not None:
+            row[attr] = obj
+            out.append(row)
+    return out
+
+
+def course_boards(course_qs, limit=TOP_N, means=None):
+    means = means or current_priors()
+    stats = (
+        CourseStats.objects.filter(course__in=course_qs, rating_count__gt=0)
+        .select_related("course")
+        .annotate(**{
+            f"score_{prefix}": scoring.bayesian_average(f"{prefix}_sum", "rating_count", mean)
+            for prefix, mean in means.items()
+        })
+    )
+    # board -> (score, descending)
+    orderings = {
+        "top_overall": ("overall", True),
+        "top_easiest": ("difficulty", False),
+        "top_useful": ("usefulness", True),
+        "top_low_workload": ("workload", False),
+    }
+    return {
+        name: [
+            {
+                "course": st.course,
+                "avg_overall": st.avg_overall,
+                "avg_difficulty": st.avg_difficulty,
+                "avg_usefulness": st.avg_usefulness,
+                "avg_workload": st.avg_workload,
+                "rating_count": st.rating_count,
+                "score": getattr(st, f"score_{prefix}"),
+            }
+            for st in stats.order_by(f"{'-' if descending else ''}score_{prefix}", "-rating_count", "course_id")[:limit]
+        ]
+        for name, (prefix, descending) in orderings.items()
+    }
+
+
+def instructor_board(course_qs, limit=TOP_N, means=None):
+    means = means or current_priors()
+    # only instructors teaching one of the filtered courses count, as before
+    taught = Instructor.objects.filter(courseinstructor__course__in=course_qs).values("instructor_id")
+    # annotation names may not shadow the stats columns, so rename afterwards
+    grouped = (
+        CourseInstructorStats.objects.filter(course__in=course_qs, instructor_id__in=taught, rating_count__gt=0)
+        .values("instructor_id")
+        .annotate(
+            count=Sum("rating_count"),
+            avg=Cast(Sum("overall_sum"), FloatField()) / Sum("rating_count"),
+            score=scoring.bayesian_average(Sum("overall_sum"), Sum("rating_count"), means["overall"]),
+        )
+        .order_by("-score", "-count", "instructor_id")[:limit]
+    )
+    rows = [
+        {"instructor_id": row["instructor_id"], "avg_overall": row["avg"], "rating_count": row["count"], "score": row["score"]}
+        for row in grouped
+    ]
+    return _attach(rows, Instructor, "instructor_id", "instructor")
+
+
+def _users(ids):
+    """id -> {"id", "username"}; boards are cached and stored, and a User row carries its password hash."""
+    return {row["id"]: row for row in get_user_model().objects.filter(pk__in=ids).values("id", "username")}
+
+
+def helpful_user_boards(course_qs, limit=TOP_N):
+    # the reaction counters on each rating replace a join over rating_reaction
+    authors = (
+        Rating.objects.filter(course__in=course_qs)
+        .values("user_id")
+        .annotate(helpful=Sum("helpful_count"), not_helpful=Sum("not_helpful_count"))
+        .annotate(net=F("helpful") - F("not_helpful"), score=scoring.wilson_lower_bound("helpful", "not_helpful"))
+    )
+    boards = {
+        "top_helpful_users": list(authors.order_by("-helpful", "-net", "user_id")[:limit]),
+        "top_helpful_ratio_users": list(authors.filter(helpful__gt=0).order_by("-score", "-helpful", "user_id")[:limit]),
+    }
+    users = _users({row["user_id"] for rows in boards.values() for row in rows})
+    return {
+        name: [
+            {
+                "user": users[row["user_id"]],
+                "helpful": row["helpful"],
+                "not_helpful": row["not_helpful"],
+                "net": row["net"],
+                "score": row["score"],
+            }
+            for row in rows
+            if row["user_id"] in users
+        ]
+        for name, rows in boards.items()
+    }
+
+
+def build_rankings(school_id=None, category_id=None, limit=TOP_N, means=None):
+    course_qs = approved_courses(school_id, category_id)
+    means = means or current_priors()
+    boards = course_boards(course_qs, limit, means)
+    boards["top_instructors"] = instructor_board(course_qs, limit, means)
+    boards.update(helpful_user_boards(course_qs, limit))
+    return boards
+
+
+def scope_key(school_id=None, category_id=None):
+    school_id = int(school_id) if school_id else ""
+    category_id = int(category_id) if category_id else ""
+    return f"{school_id}:{category_id}"
+
+
+def current_priors():
+    """The score means stored by the last refresh, read by primary key; the scale midpoint before any refresh."""
+    priors = RankingSnapshot.objects.filter(scope=scope_key()).values_list("priors", flat=True).first()
+    return priors or dict(scoring.MIDPOINT_PRIORS)
+
+
+def snapshot_scopes():
+    """(school_id, category_id) of every filter that selects approved courses, the unfiltered one first."""
+    pairs = set(approved_courses().values_list("school_id", "category_id").distinct())
+    scopes = {(None, None)}
+    for school_id, category_id in pairs:
+        scopes |= {(school_id, None), (None, category_id), (school_id, category_id)}
+    return sorted(scopes, key=lambda scope: (scope != (None, None), str(scope)))
+
+
+def _object_loaders():
+    # row key -> function loading the objects the row carries, by primary key
+    return {"course": Course.objects.in_bulk, "instructor": Instructor.objects.in_bulk, "user": _users}
+
+
+def _pk(obj):
+    return obj["id"] if isinstance(obj, dict) else obj.pk
+
+
+def _pack(boards):
+    """Boards with every object replaced by its primary key, for JSON storage."""
+    loaders = _object_loaders()
+    packed = {}
+    for name, rows in boards.items():
+        packed[name] = []
+        for row in rows:
+            row = dict(row)
+            for attr in loaders.keys() & row.keys():
+                row[f"{attr}_id"] = _pk(row.pop(attr))
+            packed[name].append(row)
+    return packed
+
+
+def _unpack(boards):
+    """Inverse of _pack: one query per object type; rows whose object is gone are dropped."""
+    loaders = _object_loaders()
+    wanted = {attr: set() for attr in loaders}
+    for rows in boards.values():
+        for row in rows:
+            for attr in loaders:
+                if f"{attr}_id" in row:
+                    wanted[attr].add(row[f"{attr}_id"])
+    objs = {attr: loaders[attr](ids) for attr, ids in wanted.items() if ids}
+    out = {}
+    for name, rows in boards.items():
+        out[name] = []
+        for row in rows:
+            row = dict(row)
+            for attr in loaders:
+                if f"{attr}_id" in row:
+                    row[attr] = objs[attr].get(row.pop(f"{attr}_id"))
+            if all(row.get(attr, True) is not None for attr in loaders):
+                out[name].append(row)
+    return out
+
+
+def refresh_snapshots(scopes=None, log=None):
+    """Rebuild and store the boards of `scopes` (default: all of them); returns the scope keys written.
+
+    Each snapshot is written on its own, so readers and rating writes are
+    never held behind a transaction spanning the whole refresh. With the
+    default scopes, snapshots of filters that no longer select any course are
+    deleted.
+    """
+    log = log or (lambda message: None)
+    prune = scopes is None
+    scopes = snapshot_scopes() if scopes is None else scopes
+    # one pass over course_stats per refresh, shared by every scope
+    means = scoring.compute_priors()
+    written = []
+    for school_id, category_id in scopes:
+        key = scope_key(school_id, category_id)
+        RankingSnapshot.objects.update_or_create(
+            scope=key,
+            defaults={
+                "school_id": school_id or None,
+                "category_id": category_id or None,
+                "boards": _pack(build_rankings(school_id, category_id, means=means)),
+                "priors": means,
+                "generated_at": timezone.now(),
+            },
+        )
+        written.append(key)
+        log(key)
+    if prune:
+        RankingSnapshot.objects.exclude(scope__in=written).delete()
+    caching.invalidate_rankings(scopes)
+    return written
+
+
+def get_rankings(school_id=None, category_id=None, max_age=None):
+    """The boards of one filter, from a fresh enough snapshot or else computed now, plus when they were generated."""
+    max_age = SNAPSHOT_MAX_AGE if max_age is None else max_age
+    snapshot = (
+        RankingSnapshot.objects.filter(
+            scope=scope_key(school_id, category_id), generated_at__gte=timezone.now() - timedelta(seconds=max_age)
+        )
+        .values("boards", "generated_at")
+        .first()
+    )
+    if snapshot is None:
+        return {**build_rankings(school_id, category_id), "generated_at": timezone.now()}
+    return {**_unpack(snapshot["boards"]), "generated_at": snapshot["generated_at"]}
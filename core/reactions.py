@@ -0,0 +1,130 @@
+"""Reaction writes and the helpful/not-helpful counters derived from them.
+
+Each reaction is counted on its rating (Rating.helpful_count / not_helpful_count)
+and on the rating's author (UserHelpfulStats). Counters move by F() deltas in
+the transaction of the reaction write; model saves and deletes go through the
+signals in core.signals, set_reaction's upsert applies its own. Bulk writes bypass
+both; run `manage.py rebuild_course_stats` after them.
+"""
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import caching, live
+from .models import Rating, RatingReaction, UserHelpfulStats
+
+# reaction_type -> counter column, on Rating and on UserHelpfulStats alike
+COUNTER_FIELDS = {
+    "helpful": "helpful_count",
+    "not_helpful": "not_helpful_count",
+}
+
+
+def apply_reaction(rating_id, reaction_type, sign):
+    """Add (sign=1) or remove (sign=-1) one reaction from the rating and author counters."""
+    field = COUNTER_FIELDS.get(reaction_type)
+    if field is None:
+        return
+    author_id = Rating.objects.filter(pk=rating_id).values_list("user_id", flat=True).first()
+    if author_id is None:
+        return
+    Rating.objects.filter(pk=rating_id).update(**{field: F(field) + sign})
+    if sign > 0:
+        UserHelpfulStats.objects.bulk_create([UserHelpfulStats(user_id=author_id)], ignore_conflicts=True)
+    # as in stats._apply, a removal never creates the row: deleting the author cascades here
+    UserHelpfulStats.objects.filter(user_id=author_id).update(**{field: F(field) + sign})
+
+
+def set_reaction(user_id, rating_id, reaction_type):
+    """Record `user_id`'s reaction to a rating; returns "added", "changed" or "unchanged".
+
+    One upsert against the (user, rating) unique constraint writes the
+    reaction, whatever was there before, so two concurrent clicks leave one
+    row. Only then are the rating's counters compared with a recount of its
+    reactions; the upsert already holds the write lock, so the difference is
+    exactly what this call changed. That difference moves the rating and
+    author counters. No signal fires for the upsert, so the cached pages and
+    the live stream are notified here.
+    """
+    fields = list(COUNTER_FIELDS.values())
+    recount = {f"recount_{field}": _counted(rating_id=OuterRef("pk"), reaction_type=t) for t, field in COUNTER_FIELDS.items()}
+    with transaction.atomic():
+        RatingReaction.objects.bulk_create(
+            [RatingReaction(user_id=user_id, rating_id=rating_id, reaction_type=reaction_type, created_at=timezone.now())],
+            update_conflicts=True,
+            unique_fields=["user", "rating"],
+            update_fields=["reaction_type"],
+        )
+        row = Rating.objects.filter(pk=rating_id).annotate(**recount).values("user_id", "course_id", *fields, *recount).first()
+        if row is None:
+            return "unchanged"
+        deltas = {field: row[f"recount_{field}"] - row[field] for field in fields}
+        if not any(deltas.values()):
+            return "unchanged"
+        Rating.objects.filter(pk=rating_id).update(**{field: F(field) + delta for field, delta in deltas.items()})
+        UserHelpfulStats.objects.bulk_create([UserHelpfulStats(user_id=row["user_id"])], ignore_conflicts=True)
+        UserHelpfulStats.objects.filter(user_id=row["user_id"]).update(**{field: F(field) + delta for field, delta in deltas.items()})
+        caching.invalidate_course_ids([row["course_id"]])
+        live.reaction_changed(rating_id)
+    return "added" if sum(deltas.values()) > 0 else "changed"
+
+
+def _counted(**lookup):
+    return Coalesce(
+        Subquery(
+            RatingReaction.objects.filter(**lookup)
+            .values("rating_id")
+            .annotate(n=Count("id"))
+            .values("n")[:1],
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def expected_author_counts():
+    """Author totals recomputed from `rating_reaction`, keyed by user_id."""
+    out = {}
+    for row in (
+        RatingReaction.objects.filter(reaction_type__in=COUNTER_FIELDS)
+        .values("rating__user_id", "reaction_type")
+        .annotate(n=Count("id"))
+    ):
+        counts = out.setdefault(row["rating__user_id"], {field: 0 for field in COUNTER_FIELDS.values()})
+        counts[COUNTER_FIELDS[row["reaction_type"]]] = row["n"]
+    return out
+
+
+def check_reactions():
+    """List every rating or author whose counters differ from a recount of `rating_reaction`."""
+    fields = list(COUNTER_FIELDS.values())
+    problems = []
+    annotations = {f"expected_{field}": _counted(rating_id=OuterRef("pk"), reaction_type=t) for t, field in COUNTER_FIELDS.items()}
+    for row in Rating.objects.annotate(**annotations).values("rating_id", *fields, *annotations):
+        for field in fields:
+            if row[field] != row[f"expected_{field}"]:
+                problems.append(f"rating {row['rating_id']}: {field} expected {row[f'expected_{field}']}, found {row[field]}")
+
+    expected = expected_author_counts()
+    actual = {row.pop("user_id"): row for row in UserHelpfulStats.objects.values("user_id", *fields)}
+    for user_id in sorted(set(expected) | set(actual)):
+        want = expected.get(user_id, {field: 0 for field in fields})
+        have = actual.get(user_id, {field: 0 for field in fields})
+        if want != have:
+            problems.append(f"author {user_id}: expected {want}, found {have}")
+    return problems
+
+
+def rebuild_reactions(batch_size=1000):
+    """Recount every rating and author counter from `rating_reaction`."""
+    with transaction.atomic():
+        Rating.objects.update(**{
+            field: _counted(rating_id=OuterRef("pk"), reaction_type=t) for t, field in COUNTER_FIELDS.items()
+        })
+        UserHelpfulStats.objects.all().delete()
+        UserHelpfulStats.objects.bulk_create(
+            (UserHelpfulStats(user_id=user_id, **counts) for user_id, counts in expected_author_counts().items()),
+            batch_size=batch_size,
+        )
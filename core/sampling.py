@@ -0,0 +1,153 @@
+"""Constant-time random pick of a course's rating/comment text.
+
+Each course has a cached pool of the ids of its non-empty rating texts and
+comments, rebuilt only after a write to that course (see core.caching). A pick
+is then one random index plus one primary-key fetch, however many comments the
+course has.
+"""
+
+import random
+
+from . import caching
+from .models import Comment, Course, Rating
+
+
+def _build_pool(course_id):
+    if not Course.objects.filter(pk=course_id).exists():
+        return {"exists": False, "ratings": [], "comments": []}
+    ratings = Rating.objects.filter(course_id=course_id).exclude(comment_text__isnull=True).exclude(comment_text__exact="")
+    comments = Comment.objects.filter(rating__course_id=course_id).exclude(text__isnull=True).exclude(text__exact="")
+    return {
+        "exists": True,
+        "ratings": list(ratings.values_list("rating_id", flat=True)),
+        "comments": list(comments.values_list("comment_id", flat=True)),
+    }
+
+
+def _build_pools(course_ids):
+    """_build_pool for many courses, in three queries."""
+    existing = set(Course.objects.filter(pk__in=course_ids).values_list("course_id", flat=True))
+    pools = {cid: {"exists": cid in existing, "ratings": [], "comments": []} for cid in course_ids}
+    ratings = (
+        Rating.objects.filter(course_id__in=existing)
+        .exclude(comment_text__isnull=True).exclude(comment_text__exact="")
+        .order_by("rating_id")
+        .values_list("course_id", "rating_id")
+    )
+    for course_id, rating_id in ratings:
+        pools[course_id]["ratings"].append(rating_id)
+    comments = (
+        Comment.objects.filter(rating__course_id__in=existing)
+        .exclude(text__isnull=True).exclude(text__exact="")
+        .order_by("comment_id")
+        .values_list("rating__course_id", "comment_id")
+    )
+    for course_id, comment_id in comments:
+        pools[course_id]["comments"].append(comment_id)
+    return pools
+
+
+def comment_pool(course_id):
+    return caching.get_or_build(caching.comment_pool_key(course_id), lambda: _build_pool(course_id))
+
+
+def comment_pools(course_ids):
+    """{course_id: pool} for many courses: one cache round trip, misses built together."""
+    keys = {caching.comment_pool_key(cid): cid for cid in course_ids}
+    found = caching.get_many_or_build(keys, _build_pools)
+    return {cid: found[key] for key, cid in keys.items()}
+
+
+def _pick(pool, exclude_kind=None, exclude_id=None):
+    """Uniform choice over the pool minus the excluded entry, as ("rating"|"comment", id) or None."""
+    entries = len(pool["ratings"]) + len(pool["comments"])
+    skip = None
+    if exclude_id and exclude_kind in ("rating", "comment"):
+        ids = pool["ratings"] if exclude_kind == "rating" else pool["comments"]
+        try:
+            skip = ids.index(exclude_id) + (0 if exclude_kind == "rating" else len(pool["ratings"]))
+        except ValueError:
+            skip = None
+    available = entries - (skip is not None)
+    if available <= 0:
+        return None
+    i = random.randrange(available)
+    if skip is not None and i >= skip:
+        i += 1
+    if i < len(pool["ratings"]):
+        return "rating", pool["ratings"][i]
+    return "comment", pool["comments"][i - len(pool["ratings"])]
+
+
+def _as_json(kind, obj):
+    if kind == "rating":
+        try:
+            username = "匿名" if obj.anonymous_flag else obj.user.username
+        except Exception:
+            username = None
+        text, obj_id = obj.comment_text, obj.rating_id
+    else:
+        try:
+            username = obj.user.username
+        except Exception:
+            username = None
+        text, obj_id = obj.text, obj.comment_id
+    return {
+        "text": text,
+        "user": username,
+        "created_at": obj.created_at.isoformat() if obj.created_at else None,
+        "kind": kind,
+        "id": obj_id,
+    }
+
+
+def random_snippet(course_id, exclude_kind=None, exclude_id=None):
+    """The JSON payload of random_course_comment, or None if the course does not exist."""
+    pool = comment_pool(course_id)
+    if not pool["exists"]:
+        return None
+    for _attempt in range(2):
+        picked = _pick(pool, exclude_kind, exclude_id)
+        if picked is None:
+            return {"text": None}
+        kind, obj_id = picked
+        model = Rating if kind == "rating" else Comment
+        obj = model.objects.select_related("user").filter(pk=obj_id).first()
+        if obj is not None:
+            return _as_json(kind, obj)
+        # deleted since the pool was built: rebuild it and pick again
+        caching.invalidate_course_ids([course_id])
+        pool = comment_pool(course_id)
+    return {"text": None}
+
+
+def random_snippets(wanted):
+    """random_snippet for many courses at once.
+
+    `wanted` maps course_id -> (exclude_kind, exclude_id). The picked ratings
+    and comments are fetched with one query per kind; returns course_id ->
+    payload, or None for courses that do not exist.
+    """
+    pools = comment_pools(list(wanted))
+    picks, out = {}, {}
+    for course_id, (exclude_kind, exclude_id) in wanted.items():
+        pool = pools[course_id]
+        if not pool["exists"]:
+            out[course_id] = None
+            continue
+        picked = _pick(pool, exclude_kind, exclude_id)
+        if picked is None:
+            out[course_id] = {"text": None}
+        else:
+            picks[course_id] = picked
+
+    objects = {}
+    for kind, model in (("rating", Rating), ("comment", Comment)):
+        ids = [obj_id for k, obj_id in picks.values() if k == kind]
+        if ids:
+            objects[kind] = model.objects.select_related("user").in_bulk(ids)
+    for course_id, (kind, obj_id) in picks.items():
+        obj = objects.get(kind, {}).get(obj_id)
+        # deleted since the pool was built: random_snippet rebuilds the pool and picks again
+        out[course_id] = _as_json(kind, obj) if obj is not None else random_snippet(course_id, *wanted[course_id])
+    return out
@@ -0,0 +1,64 @@
+"""Confidence-weighted ranking scores, as SQL expressions for the leaderboards.
+
+A raw average ranks one 5-star rating above 500 ratings averaging 4.8. The
+Bayesian average (weight * prior + sum) / (weight + count) instead pulls every
+score towards the site-wide mean by `weight` phantom ratings, so it takes
+RANKING_PRIOR_WEIGHT ratings or so before a course's own average dominates.
+Helpful / not-helpful reactions are ranked by the lower bound of the Wilson
+score interval for the helpful ratio, which prefers 90 of 100 over 1 of 1.
+
+Both are expressions over the counter columns, so the database scores every
+row in the same query that sorts and limits them, and no row is loaded into
+Python to be scored.
+"""
+
+from django.conf import settings
+from django.db.models import F, FloatField, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Sqrt
+
+from .models import CourseStats
+from .stats import SCORE_FIELDS
+
+PRIOR_WEIGHT = getattr(settings, "RANKING_PRIOR_WEIGHT", 10)
+# 95% confidence
+WILSON_Z = 1.96
+# the middle of the 1..5 scale, until the site's own means are known
+MIDPOINT_PRIORS = {prefix: 3.0 for prefix in SCORE_FIELDS}
+
+
+def compute_priors():
+    """Site-wide mean of each score (keyed like stats.SCORE_FIELDS).
+
+    Reads all of course_stats, so it runs once per rankings refresh; requests
+    use the copy stored with the snapshots (rankings.current_priors).
+    """
+    totals = CourseStats.objects.aggregate(
+        count=Sum("rating_count"), **{prefix: Sum(f"{prefix}_sum") for prefix in SCORE_FIELDS}
+    )
+    count = totals.pop("count") or 0
+    if not count:
+        return dict(MIDPOINT_PRIORS)
+    return {prefix: (total or 0) / count for prefix, total in totals.items()}
+
+
+def bayesian_average(total, count, prior, weight=PRIOR_WEIGHT):
+    """(weight * prior + total) / (weight + count); `total` and `count` are field names or expressions."""
+    total = F(total) if isinstance(total, str) else total
+    count = F(count) if isinstance(count, str) else count
+    return (Value(weight * prior) + Cast(total, FloatField())) / (Value(float(weight)) + count)
+
+
+def wilson_lower_bound(positive, negative, z=WILSON_Z):
+    """Lower bound of the Wilson interval for positive / (positive + negative); 0 with no votes.
+
+    Written as (pos + z²/2 - z * sqrt(pos * neg / n + z²/4)) / (n + z²), the
+    usual form multiplied through by n.
+    """
+    positive = Cast(F(positive) if isinstance(positive, str) else positive, FloatField())
+    negative = Cast(F(negative) if isinstance(negative, str) else negative, FloatField())
+    n = positive + negative
+    # n = 0 divides by zero, which SQL turns into NULL
+    return Coalesce(
+        (positive + Value(z * z / 2) - Value(z) * Sqrt(positive * negative / n + Value(z * z / 4))) / (n + Value(z * z)),
+        Value(0.0),
+    )
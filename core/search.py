@@ -0,0 +1,147 @@
+"""Full-text course search on an SQLite FTS5 table.
+
+FTS5's stock tokenizers treat a run of Chinese characters as one token, so text
+is n-gram tokenized here before it reaches the index: every CJK run becomes its
+overlapping bigrams plus its last character, other words are lowercased. A CJK
+query is matched as a phrase of bigrams, which is the same as a substring
+match; other words are prefix matches. A word can't be matched from its
+middle, so a query that looks like a course code ("101", "S10") also runs a
+LIKE over the code column. The index is kept in sync by the signals in
+core.signals.
+"""
+
+import re
+
+from django.db import connection
+
+from .models import Course
+
+TABLE = "course_search"
+COLUMNS = ("title", "code", "description", "school_name")
+# bm25 column weights, same order as COLUMNS
+WEIGHTS = (10.0, 5.0, 1.0, 2.0)
+RESULT_LIMIT = 1000
+_INSERT_SQL = f"INSERT INTO {TABLE} (rowid, {', '.join(COLUMNS)}) VALUES (%s, %s, %s, %s, %s)"
+
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_RUN_RE = re.compile(rf"[{_CJK}]+|[^\W_{_CJK}]+")
+_CJK_RE = re.compile(rf"[{_CJK}]")
+# one ASCII word with no spaces, like the codes courses are listed under
+_CODE_QUERY_RE = re.compile(r"[0-9A-Za-z][0-9A-Za-z./_-]*\Z")
+
+_available = None
+
+
+def _cjk_tokens(run):
+    return [run[i:i + 2] for i in range(len(run) - 1)] + [run[-1]]
+
+
+def tokenize(text):
+    tokens = []
+    for run in _RUN_RE.findall((text or "").lower()):
+        tokens.extend(_cjk_tokens(run) if _CJK_RE.match(run) else [run])
+    return " ".join(tokens)
+
+
+def match_expression(query):
+    """Translate user input into an FTS5 MATCH expression, or None if it has no searchable text."""
+    terms = []
+    for run in _RUN_RE.findall((query or "").lower()):
+        if _CJK_RE.match(run):
+            bigrams = _cjk_tokens(run)[:-1]
+            terms.append('"%s"' % " ".join(bigrams) if bigrams else '"%s"*' % run)
+        else:
+            terms.append('"%s"*' % run)
+    return " AND ".join(terms) or None
+
+
+def create_index(cursor):
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5({', '.join(COLUMNS)}, tokenize='unicode61')"
+    )
+
+
+def index_available():
+    global _available
+    if _available is None:
+        _available = connection.vendor == "sqlite" and TABLE in connection.introspection.table_names()
+    return _available
+
+
+def _rows(courses):
+    for c in courses:
+        yield (
+            c.course_id,
+            tokenize(c.title),
+            tokenize(c.code),
+            tokenize(c.description),
+            tokenize(c.school.name if c.school else ""),
+        )
+
+
+def index_courses(course_ids):
+    """(Re)index the given courses; ids that no longer exist are dropped from the index."""
+    if not index_available():
+        return
+    course_ids = list(course_ids)
+    courses = Course.objects.filter(course_id__in=course_ids).select_related("school")
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {TABLE} WHERE rowid = %s", [(cid,) for cid in course_ids])
+        cursor.executemany(_INSERT_SQL, list(_rows(courses)))
+
+
+def remove_course(course_id):
+    if not index_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [course_id])
+
+
+def rebuild_index(batch_size=1000):
+    if not index_available():
+        return 0
+    total = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+        batch = []
+        for row in _rows(Course.objects.select_related("school").iterator(chunk_size=batch_size)):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                cursor.executemany(_INSERT_SQL, batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(_INSERT_SQL, batch)
+            total += len(batch)
+    return total
+
+
+def ranked_course_ids(query, course_qs, limit=RESULT_LIMIT):
+    """Ids of the courses in `course_qs` matching `query`, best match first.
+
+    The other filters are pushed into the FTS query as a subquery, so filtering
+    and ranking happen in one statement. Courses whose code merely contains a
+    code-like query follow the ranked matches. Returns None when the index is
+    not available and the caller should fall back to a LIKE scan.
+    """
+    if not index_available():
+        return None
+    expr = match_expression(query)
+    if expr is None:
+        return []
+    sql, params = course_qs.values("course_id").query.sql_with_params()
+    weights = ", ".join(str(w) for w in WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s AND rowid IN ({sql}) "
+            f"ORDER BY bm25({TABLE}, {weights}), rowid LIMIT %s",
+            [expr, *params, limit],
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+    query = query.strip()
+    if len(ids) < limit and _CODE_QUERY_RE.match(query):
+        # the index only matches words from their start; "101" must still find CS101
+        found = set(ids)
+        codes = course_qs.filter(code__icontains=query).order_by("course_id").values_list("course_id", flat=True)
+        ids += [cid for cid in codes[:limit] if cid not in found][:limit - len(ids)]
+    return ids
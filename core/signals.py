@@ -0,0 +1,159 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Comment, Course, CourseInstructor, CourseTag, Instructor, Rating, RatingReaction, School, Tag
+from . import caching, instrumentation, live, reactions, search, sqlite_tuning, stats
+
+
+@receiver(pre_save, sender=Rating)
+def remember_rating_before_save(sender, instance, **kwargs):
+    # admin edits may change scores, course or instructor; keep what is being replaced
+    instance._stats_before = None
+    if instance._state.adding or instance.pk is None:
+        return
+    old = Rating.objects.filter(pk=instance.pk).first()
+    if old is not None:
+        instance._stats_before = stats.rating_snapshot(old)
+        # the reaction counters move underneath loaded instances; don't write back stale ones
+        instance.helpful_count = old.helpful_count
+        instance.not_helpful_count = old.not_helpful_count
+
+
+@receiver(post_save, sender=Rating)
+def update_stats_on_rating_save(sender, instance, **kwargs):
+    before = getattr(instance, "_stats_before", None)
+    after = stats.rating_snapshot(instance)
+    if before == after:
+        return
+    if before is not None:
+        stats.apply_rating(before, -1)
+    stats.apply_rating(after, 1)
+
+
+@receiver(post_delete, sender=Rating)
+def update_stats_on_rating_delete(sender, instance, **kwargs):
+    stats.apply_rating(stats.rating_snapshot(instance), -1)
+
+
+@receiver(pre_save, sender=RatingReaction)
+def remember_reaction_before_save(sender, instance, **kwargs):
+    instance._reaction_before = None
+    if not instance._state.adding and instance.pk is not None:
+        instance._reaction_before = RatingReaction.objects.filter(pk=instance.pk).values_list("rating_id", "reaction_type").first()
+
+
+@receiver(post_save, sender=RatingReaction)
+def count_reaction_on_save(sender, instance, created, **kwargs):
+    before = None if created else getattr(instance, "_reaction_before", None)
+    after = (instance.rating_id, instance.reaction_type)
+    if before == after:
+        return
+    if before is not None:
+        reactions.apply_reaction(*before, -1)
+    reactions.apply_reaction(*after, 1)
+
+
+@receiver(post_delete, sender=RatingReaction)
+def count_reaction_on_delete(sender, instance, **kwargs):
+    reactions.apply_reaction(instance.rating_id, instance.reaction_type, -1)
+
+
+@receiver(post_save, sender=Course)
+def index_course_on_save(sender, instance, **kwargs):
+    if instance.pk is not None:
+        search.index_courses([instance.pk])
+
+
+@receiver(post_delete, sender=Course)
+def unindex_course_on_delete(sender, instance, **kwargs):
+    search.remove_course(instance.pk)
+
+
+@receiver(post_save, sender=School)
+def reindex_school_courses(sender, instance, **kwargs):
+    # school_name is part of every course row of this school
+    search.index_courses(Course.objects.filter(school_id=instance.pk).values_list("course_id", flat=True))
+
+
+@receiver(pre_save, sender=Course)
+def remember_course_before_save(sender, instance, **kwargs):
+    # a course moved to another school/category leaves stale rankings behind in the old scope
+    instance._cache_before = None
+    if not instance._state.adding and instance.pk is not None:
+        instance._cache_before = Course.objects.filter(pk=instance.pk).values_list("course_id", "school_id", "category_id").first()
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_course_pages(sender, instance, **kwargs):
+    before = getattr(instance, "_cache_before", None)
+    caching.invalidate_courses([instance] + ([before] if before else []))
+
+
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+def invalidate_pages_on_rating(sender, instance, **kwargs):
+    before = getattr(instance, "_stats_before", None)
+    caching.invalidate_course_ids([instance.course_id, before[0] if before else None])
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=RatingReaction)
+@receiver(post_delete, sender=RatingReaction)
+def invalidate_pages_on_rating_child(sender, instance, **kwargs):
+    caching.invalidate_course_ids(Rating.objects.filter(pk=instance.rating_id).values_list("course_id", flat=True))
+
+
+@receiver(post_save, sender=Rating)
+def publish_rating_saved(sender, instance, created, **kwargs):
+    live.rating_saved(instance, created)
+
+
+@receiver(post_delete, sender=Rating)
+def publish_rating_deleted(sender, instance, **kwargs):
+    live.rating_deleted(instance)
+
+
+@receiver(post_save, sender=Comment)
+def publish_comment_created(sender, instance, created, **kwargs):
+    if created:
+        live.comment_created(instance)
+
+
+@receiver(post_save, sender=RatingReaction)
+@receiver(post_delete, sender=RatingReaction)
+def publish_reaction_changed(sender, instance, **kwargs):
+    live.reaction_changed(instance.rating_id)
+
+
+@receiver(post_save, sender=CourseTag)
+@receiver(post_delete, sender=CourseTag)
+@receiver(post_save, sender=CourseInstructor)
+@receiver(post_delete, sender=CourseInstructor)
+def invalidate_pages_on_course_link(sender, instance, **kwargs):
+    caching.invalidate_course_ids([instance.course_id])
+
+
+@receiver(post_save, sender=Instructor)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=School)
+def invalidate_pages_on_rename(sender, instance, **kwargs):
+    if sender is Instructor:
+        course_ids = CourseInstructor.objects.filter(instructor_id=instance.pk).values_list("course_id", flat=True)
+    elif sender is Tag:
+        course_ids = CourseTag.objects.filter(tag_id=instance.pk).values_list("course_id", flat=True)
+    else:
+        course_ids = Course.objects.filter(school_id=instance.pk).values_list("course_id", flat=True)
+    caching.invalidate_course_ids(course_ids)
+
+
+@receiver(connection_created)
+def record_queries_on_connection(sender, connection, **kwargs):
+    instrumentation.install_query_recorder(connection)
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    sqlite_tuning.apply_pragmas(connection)
@@ -0,0 +1,40 @@
+"""Connection-level SQLite settings, applied by core.signals as each connection opens.
+
+settings.SQLITE_PRAGMAS maps pragma names to values; the production profile
+(DB_PROFILE=production) enables WAL journaling, so readers no longer block
+the writer, with synchronous=NORMAL, which stays durable against application
+crashes and only risks the last transactions on power loss. journal_mode is
+persistent in the database file, the others last for the connection; a
+persistent connection (CONN_MAX_AGE) pays for them once.
+"""
+
+from django.conf import settings
+
+# applied in this order: the journal mode first, it decides how the others behave
+PRAGMA_ORDER = ("journal_mode", "synchronous", "busy_timeout", "mmap_size", "cache_size", "temp_store")
+
+
+def pragma_statements(pragmas):
+    ordered = sorted(pragmas, key=lambda name: PRAGMA_ORDER.index(name) if name in PRAGMA_ORDER else len(PRAGMA_ORDER))
+    return [f"PRAGMA {name} = {pragmas[name]}" for name in ordered]
+
+
+def apply_pragmas(connection):
+    if connection.vendor != "sqlite":
+        return
+    pragmas = getattr(settings, "SQLITE_PRAGMAS", {})
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for statement in pragma_statements(pragmas):
+            cursor.execute(statement)
+
+
+def current_pragmas(connection):
+    """The values the connection actually runs with, for reports."""
+    with connection.cursor() as cursor:
+        out = {}
+        for name in PRAGMA_ORDER:
+            cursor.execute(f"PRAGMA {name}")
+            out[name] = cursor.fetchone()[0]
+        return out
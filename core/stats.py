@@ -0,0 +1,189 @@
+"""Incremental maintenance of CourseStats / CourseInstructorStats.
+
+Every change is applied as a delta with F() expressions, so concurrent writers
+never overwrite each other's counts. Bulk writes (bulk_create, queryset.update)
+bypass the signals; run `manage.py rebuild_course_stats` after them.
+
+CourseStats also counts each score value (the `<prefix>_<score>` columns), so
+a course's histograms, median and spread come from its one stats row.
+"""
+
+import itertools
+import math
+
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Q, Sum
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+from .models import CourseInstructorStats, CourseStats, Rating
+
+# stats prefix -> Rating column
+SCORE_FIELDS = {
+    "overall": "overall_score",
+    "difficulty": "difficulty",
+    "usefulness": "usefulness",
+    "workload": "workload",
+}
+# score values with a histogram column; others count towards sums and averages only
+SCORES = range(1, 6)
+
+
+def histogram_fields():
+    return [f"{prefix}_{score}" for prefix in SCORE_FIELDS for score in SCORES]
+
+
+def rating_snapshot(rating):
+    """The parts of a rating the stats depend on, as a plain tuple."""
+    return (
+        rating.course_id,
+        rating.instructor_id,
+        {prefix: getattr(rating, field) or 0 for prefix, field in SCORE_FIELDS.items()},
+    )
+
+
+def _avg(sum_field, sum_delta, count_delta):
+    return Coalesce(
+        Cast(F(sum_field) + sum_delta, FloatField()) / NullIf(F("rating_count") + count_delta, 0),
+        0.0,
+    )
+
+
+def _apply(model, lookup, prefixes, scores, sign, histogram=False):
+    if sign > 0:
+        model.objects.bulk_create([model(**lookup)], ignore_conflicts=True)
+    # a removal never creates the row: during a cascade delete the course may already be gone,
+    # and the update below then simply matches nothing
+    updates = {"rating_count": F("rating_count") + sign}
+    for prefix in prefixes:
+        delta = sign * scores[prefix]
+        updates[f"{prefix}_sum"] = F(f"{prefix}_sum") + delta
+        updates[f"avg_{prefix}"] = _avg(f"{prefix}_sum", delta, sign)
+        if histogram and scores[prefix] in SCORES:
+            bucket = f"{prefix}_{scores[prefix]}"
+            updates[bucket] = F(bucket) + sign
+    model.objects.filter(**lookup).update(**updates)
+
+
+def apply_rating(snapshot, sign):
+    """Add (sign=1) or remove (sign=-1) one rating from the course and instructor stats."""
+    course_id, instructor_id, scores = snapshot
+    if course_id is None:
+        return
+    _apply(CourseStats, {"course_id": course_id}, SCORE_FIELDS, scores, sign, histogram=True)
+    if instructor_id is not None:
+        _apply(CourseInstructorStats, {"course_id": course_id, "instructor_id": instructor_id}, ("overall",), scores, sign)
+
+
+def _median(counts):
+    """Median of the values 1..5 given how often each occurs."""
+    cumulative = list(itertools.accumulate(counts))
+
+    def nth(k):
+        # the k-th smallest value, counting from 0
+        return next(score for score, seen in zip(SCORES, cumulative) if k < seen)
+
+    n = cumulative[-1]
+    return (nth((n - 1) // 2) + nth(n // 2)) / 2
+
+
+def distributions(course_stats):
+    """{prefix: {"counts": [n1..n5], "total", "mean", "median", "stddev"}} from a CourseStats row.
+
+    Computed from the histogram columns alone, so ratings with a score outside
+    1..5 are left out. An empty histogram gives None for the statistics.
+    """
+    out = {}
+    for prefix in SCORE_FIELDS:
+        counts = [getattr(course_stats, f"{prefix}_{score}") or 0 for score in SCORES]
+        n = sum(counts)
+        entry = {"counts": counts, "total": n, "mean": None, "median": None, "stddev": None}
+        if n:
+            mean = sum(score * c for score, c in zip(SCORES, counts)) / n
+            entry["mean"] = mean
+            entry["median"] = _median(counts)
+            # population standard deviation: the ratings are the whole population here
+            entry["stddev"] = math.sqrt(sum(c * (score - mean) ** 2 for score, c in zip(SCORES, counts)) / n)
+        out[prefix] = entry
+    return out
+
+
+def expected_course_stats():
+    """Course stats recomputed from `rating`, keyed by course_id."""
+    rows = Rating.objects.values("course_id").annotate(
+        rating_count=Count("rating_id"),
+        **{f"{prefix}_sum": Sum(field) for prefix, field in SCORE_FIELDS.items()},
+        **{
+            f"{prefix}_{score}": Count("rating_id", filter=Q(**{field: score}))
+            for prefix, field in SCORE_FIELDS.items()
+            for score in SCORES
+        },
+    )
+    out = {}
+    for row in rows:
+        course_id = row.pop("course_id")
+        for prefix in SCORE_FIELDS:
+            row[f"avg_{prefix}"] = row[f"{prefix}_sum"] / row["rating_count"]
+        out[course_id] = row
+    return out
+
+
+def expected_instructor_stats():
+    """Per-instructor stats recomputed from `rating`, keyed by (course_id, instructor_id)."""
+    rows = (
+        Rating.objects.filter(instructor_id__isnull=False)
+        .values("course_id", "instructor_id")
+        .annotate(rating_count=Count("rating_id"), overall_sum=Sum("overall_score"))
+    )
+    out = {}
+    for row in rows:
+        key = (row.pop("course_id"), row.pop("instructor_id"))
+        row["avg_overall"] = row["overall_sum"] / row["rating_count"]
+        out[key] = row
+    return out
+
+
+def _drift(expected, actual, label):
+    problems = []
+    for key in sorted(set(expected) | set(actual), key=str):
+        want = expected.get(key)
+        have = actual.get(key)
+        # rows emptied by deletions may linger with zero counts
+        if want is None and have is not None and have["rating_count"] == 0:
+            continue
+        if want is None or have is None:
+            problems.append(f"{label} {key}: expected {want}, found {have}")
+            continue
+        for name, value in want.items():
+            if abs((have.get(name) or 0) - value) > 1e-9:
+                problems.append(f"{label} {key}: {name} expected {value}, found {have.get(name)}")
+    return problems
+
+
+def check_stats():
+    """List every difference between the stats tables and a from-scratch recomputation."""
+    fields = ["rating_count"] + [f"{p}_sum" for p in SCORE_FIELDS] + [f"avg_{p}" for p in SCORE_FIELDS] + histogram_fields()
+    actual_courses = {row.pop("course_id"): row for row in CourseStats.objects.values("course_id", *fields)}
+    actual_instructors = {}
+    for row in CourseInstructorStats.objects.values("course_id", "instructor_id", "rating_count", "overall_sum", "avg_overall"):
+        actual_instructors[(row.pop("course_id"), row.pop("instructor_id"))] = row
+    return _drift(expected_course_stats(), actual_courses, "course") + _drift(
+        expected_instructor_stats(), actual_instructors, "course/instructor"
+    )
+
+
+def rebuild_stats(batch_size=1000):
+    """Replace both stats tables with a from-scratch recomputation."""
+    with transaction.atomic():
+        CourseStats.objects.all().delete()
+        CourseInstructorStats.objects.all().delete()
+        CourseStats.objects.bulk_create(
+            (CourseStats(course_id=course_id, **row) for course_id, row in expected_course_stats().items()),
+            batch_size=batch_size,
+        )
+        CourseInstructorStats.objects.bulk_create(
+            (
+                CourseInstructorStats(course_id=course_id, instructor_id=instructor_id, **row)
+                for (course_id, instructor_id), row in expected_instructor_stats().items()
+            ),
+            batch_size=batch_size,
+        )
@@ -0,0 +1,192 @@
+"""Reproducible synthetic data at production shape for `manage.py seed_synthetic`.
+
+Course popularity follows a Zipf law: the course of popularity rank r draws
+ratings, favorites and tags with weight 1 / r**s, so with the default s=1.1 a
+few courses collect thousands of ratings while most get a handful. Ranks are
+shuffled across schools. Comments and reactions pick ratings uniformly, so
+they follow the same skew. Every choice comes from one random.Random(seed):
+the same arguments on an empty database give the same data.
+
+Rows are written with bulk_create in batches inside one transaction; only
+primary keys are kept in memory. Bulk writes bypass the signals, so course
+stats, reaction counters and the search index are rebuilt at the end.
+"""
+
+import itertools
+import random
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from . import search, stats
+from .models import (
+    Category, Comment, Course, CourseInstructor, CourseTag, Favorite, Instructor, Rating, RatingReaction, School, Tag,
+)
+from .reactions import rebuild_reactions
+
+BATCH_SIZE = 5000
+WORDS = [
+    "数据结构", "操作系统", "线性代数", "社会学", "微积分", "编译原理", "数据库", "机器学习", "经济学", "心理学",
+    "概率论", "计算机网络", "有机化学", "宏观经济", "中国近代史", "大学物理", "离散数学", "软件工程", "统计学", "法学导论",
+]
+TAGS = ["给分高", "作业多", "干货多", "点名", "考试难", "推荐", "水课", "有趣", "实用", "硬核", "讲得清楚", "项目制"]
+COMMENTS = ["同意", "说得很对", "我觉得还好", "期末难度确实大", "老师人很好", "作业量因人而异", "补充一点：记得交实验报告"]
+SEMESTERS = ["春季", "秋季"]
+
+
+def zipf_weights(n, s):
+    """Cumulative weights 1 / r**s for ranks 1..n, for random.choices(cum_weights=...)."""
+    return list(itertools.accumulate(1 / r ** s for r in range(1, n + 1)))
+
+
+def _bulk(model, objs, batch_size=BATCH_SIZE):
+    """bulk_create `objs` (any iterable) batch by batch; returns the new primary keys."""
+    pks = []
+    objs = iter(objs)
+    while batch := list(itertools.islice(objs, batch_size)):
+        pks.extend(o.pk for o in model.objects.bulk_create(batch))
+    return pks
+
+
+def _allocate(rng, total, cum_weights, cap):
+    """Split `total` draws over len(cum_weights) slots by weight, each slot capped at `cap`."""
+    counts = [0] * len(cum_weights)
+    for slot in rng.choices(range(len(cum_weights)), cum_weights=cum_weights, k=total):
+        counts[slot] += 1
+    # overflow from capped slots goes to the next slots down the popularity order
+    overflow = 0
+    for i, n in enumerate(counts):
+        n += overflow
+        counts[i], overflow = min(n, cap), max(0, n - cap)
+    return counts
+
+
+def generate(
+    schools=20, courses_per_school=50, instructors_per_school=30, users=5000, ratings=100_000,
+    comments=20_000, reactions=50_000, favorites=10_000, tags_per_course=3, skew=1.1, days=730,
+    seed=0, prefix="synth", batch_size=BATCH_SIZE, log=None,
+):
+    """Write one synthetic data set and return the number of rows created per table."""
+    rng = random.Random(seed)
+    log = log or (lambda message: None)
+    now = timezone.now()
+    User = get_user_model()
+
+    def when():
+        return now - timedelta(seconds=rng.randrange(days * 86400))
+
+    def bulk(model, objs):
+        return _bulk(model, objs, batch_size)
+
+    with transaction.atomic():
+        log("users")
+        password = make_password(None)
+        user_ids = bulk(User, (User(username=f"{prefix}_user_{i}", password=password, date_joined=now) for i in range(users)))
+
+        log("schools, courses, instructors")
+        categories = list(Category.objects.values_list("category_id", flat=True)) or bulk(
+            Category, (Category(name=name) for name in ["计算机", "人文社科", "理学", "工学", "经管", "艺术"])
+        )
+        school_ids = bulk(School, (
+            School(name=f"{prefix}大学{i}", school_type="university", country="中国", city=f"城市{i % 30}")
+            for i in range(schools)
+        ))
+        course_school = [school_ids[i // courses_per_school] for i in range(schools * courses_per_school)]
+        course_ids = bulk(Course, (
+            Course(
+                code=f"{prefix.upper()[:2]}{i:06d}",
+                title=f"{rng.choice(WORDS)}{'ⅠⅡⅢ'[i % 3]}",
+                description=f"{rng.choice(WORDS)}与{rng.choice(WORDS)}的课程介绍。",
+                school_id=school_id,
+                category_id=rng.choice(categories),
+                status="approved",
+                created_at=when(),
+            )
+            for i, school_id in enumerate(course_school)
+        ))
+        instructor_ids = bulk(Instructor, (
+            Instructor(name=f"{prefix}教师{i}", school_id=school_ids[i // instructors_per_school])
+            for i in range(schools * instructors_per_school)
+        ))
+        # one to three instructors per course, from the course's own school
+        teaching = {}
+        for i, course_id in enumerate(course_ids):
+            first = i // courses_per_school * instructors_per_school
+            pool = instructor_ids[first:first + instructors_per_school]
+            teaching[course_id] = rng.sample(pool, min(len(pool), rng.randint(1, 3)))
+        bulk(CourseInstructor, (
+            CourseInstructor(course_id=c, instructor_id=i, semester=rng.choice(SEMESTERS), year=now.year - rng.randrange(4))
+            for c, ids in teaching.items()
+            for i in ids
+        ))
+
+        # popularity rank -> course
+        by_popularity = course_ids[:]
+        rng.shuffle(by_popularity)
+        weights = zipf_weights(len(by_popularity), skew)
+
+        log("ratings")
+        per_course = _allocate(rng, min(ratings, users * len(course_ids)), weights, users)
+
+        def rating_objs():
+            for course_id, n in zip(by_popularity, per_course):
+                # one rating per (user, course), as rate_course enforces
+                for user_id in rng.sample(user_ids, n):
+                    overall = rng.choices((1, 2, 3, 4, 5), weights=(1, 2, 4, 6, 4))[0]
+                    yield Rating(
+                        user_id=user_id,
+                        course_id=course_id,
+                        instructor_id=rng.choice(teaching[course_id]),
+                        overall_score=overall,
+                        difficulty=rng.randint(1, 5),
+                        usefulness=max(1, min(5, overall + rng.randint(-1, 1))),
+                        workload=rng.randint(1, 5),
+                        comment_text=f"{rng.choice(WORDS)}：{rng.choice(TAGS)}" if rng.random() < 0.7 else None,
+                        anonymous_flag=rng.random() < 0.2,
+                        created_at=when(),
+                    )
+
+        rating_ids = bulk(Rating, rating_objs())
+
+        counts = {"users": len(user_ids), "schools": len(school_ids), "courses": len(course_ids),
+                  "instructors": len(instructor_ids), "ratings": len(rating_ids)}
+        if rating_ids:
+            log("comments")
+            counts["comments"] = len(bulk(Comment, (
+                Comment(rating_id=rng.choice(rating_ids), user_id=rng.choice(user_ids), text=rng.choice(COMMENTS), created_at=when())
+                for _ in range(comments)
+            )))
+
+            log("reactions")
+            pairs = set()
+            target = min(reactions, len(user_ids) * len(rating_ids))
+            while len(pairs) < target:
+                pairs.add((rng.choice(user_ids), rng.choice(rating_ids)))
+            counts["reactions"] = len(bulk(RatingReaction, (
+                RatingReaction(user_id=u, rating_id=r, reaction_type="helpful" if rng.random() < 0.75 else "not_helpful", created_at=when())
+                for u, r in sorted(pairs)
+            )))
+
+        log("favorites, tags")
+        per_course = _allocate(rng, min(favorites, users * len(course_ids)), weights, users)
+        counts["favorites"] = len(bulk(Favorite, (
+            Favorite(user_id=u, course_id=c, created_at=when())
+            for c, n in zip(by_popularity, per_course)
+            for u in rng.sample(user_ids, n)
+        )))
+        Tag.objects.bulk_create([Tag(name=name) for name in TAGS], ignore_conflicts=True)
+        tag_ids = list(Tag.objects.filter(name__in=TAGS).values_list("tag_id", flat=True))
+        counts["course_tags"] = len(bulk(CourseTag, (
+            CourseTag(course_id=c, tag_id=t, user_id=rng.choice(user_ids), created_at=when())
+            for c in course_ids
+            for t in rng.sample(tag_ids, min(len(tag_ids), rng.randint(0, tags_per_course)))
+        ))) if user_ids else 0
+
+        log("course stats, reaction counters, search index")
+        stats.rebuild_stats()
+        rebuild_reactions()
+        search.rebuild_index()
+    return counts
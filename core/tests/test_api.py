@@ -0,0 +1,194 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import api
+from core.models import Comment, Course, Favorite, Rating, School
+
+
+class RandomCommentsBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create(username="alice")
+        school = School.objects.create(name="测试大学")
+        cls.courses = [
+            Course.objects.create(code=f"C{i:02d}", title=f"课程{i}", school=school, status="approved") for i in range(40)
+        ]
+        cls.ratings = {
+            c.pk: Rating.objects.create(
+                user=user, course=c, overall_score=4, difficulty=3, usefulness=4, workload=2, comment_text=f"评价{c.pk}"
+            )
+            for c in cls.courses
+        }
+        cls.comment = Comment.objects.create(rating=cls.ratings[cls.courses[0].pk], user=user, text="同意")
+        cls.empty = Course.objects.create(code="EMPTY", title="无人评价", school=school, status="approved")
+        deleted = Course.objects.create(code="GONE", title="已删除", school=school, status="approved")
+        cls.deleted_id = deleted.pk
+        deleted.delete()
+
+    def setUp(self):
+        cache.clear()
+
+    def fetch(self, *entries):
+        response = self.client.get(reverse("api_random_comments"), {"courses": ",".join(map(str, entries))})
+        return response.status_code, response.json()
+
+    def test_one_snippet_per_course(self):
+        status, body = self.fetch(*(c.pk for c in self.courses))
+        self.assertEqual(status, 200)
+        snippets = body["snippets"]
+        self.assertEqual(set(snippets), {str(c.pk) for c in self.courses})
+        for course in self.courses[1:]:
+            self.assertEqual(snippets[str(course.pk)]["text"], f"评价{course.pk}")
+        self.assertIn(snippets[str(self.courses[0].pk)]["text"], {f"评价{self.courses[0].pk}", "同意"})
+
+    def test_unknown_deleted_and_empty_courses(self):
+        status, body = self.fetch(self.courses[1].pk, self.deleted_id, 999999, self.empty.pk, "bad", "")
+        self.assertEqual(status, 200)
+        self.assertEqual(body["snippets"], {
+            str(self.courses[1].pk): body["snippets"][str(self.courses[1].pk)],
+            str(self.deleted_id): None,
+            "999999": None,
+            str(self.empty.pk): {"text": None},
+        })
+        self.assertEqual(body["snippets"][str(self.courses[1].pk)]["kind"], "rating")
+
+    def test_shown_entry_is_skipped(self):
+        course = self.courses[0]
+        rating = self.ratings[course.pk]
+        for _ in range(5):
+            _, body = self.fetch(f"{course.pk}:rating:{rating.pk}")
+            self.assertEqual(body["snippets"][str(course.pk)]["id"], self.comment.pk)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.fetch("bad")[0], 400)
+        self.assertEqual(self.fetch(*range(1, api.MAX_BATCH + 2))[0], 400)
+
+    def test_query_budget_holds_for_a_full_batch(self):
+        budget = settings.QUERY_BUDGETS["api_random_comments"]
+        for _ in ("cold cache", "warm cache"):
+            with CaptureQueriesContext(connection) as captured:
+                self.assertEqual(self.fetch(*(c.pk for c in self.courses))[0], 200)
+            self.assertTrue(captured)
+            self.assertLessEqual(len(captured), budget)
+
+
+class AsyncEndpointTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create(username="alice")
+        cls.author = User.objects.create(username="bob")
+        cls.staff = User.objects.create(username="staff", is_staff=True)
+        school = School.objects.create(name="测试大学")
+        cls.course = Course.objects.create(code="CS101", title="数据结构", school=school, status="approved")
+        cls.pending = Course.objects.create(code="CS102", title="算法", school=school)
+        cls.rating = Rating.objects.create(
+            user=cls.author, course=cls.course, overall_score=4, difficulty=3, usefulness=4, workload=2, comment_text="很好"
+        )
+        cls.pending_rating = Rating.objects.create(
+            user=cls.author, course=cls.pending, overall_score=4, difficulty=3, usefulness=4, workload=2, comment_text="待审"
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    async def login(self, user):
+        # Django 4.2 has no AsyncClient.aforce_login
+        await sync_to_async(self.async_client.force_login)(user)
+
+    async def test_favorite_toggles(self):
+        url = reverse("api_toggle_favorite", args=[self.course.pk])
+        self.assertEqual((await self.async_client.post(url)).status_code, 401)
+        await self.login(self.user)
+        bodies = [(await self.async_client.post(url)).json() for _ in range(2)]
+        self.assertEqual(bodies, [
+            {"status": "success", "course_id": self.course.pk, "favorited": True},
+            {"status": "success", "course_id": self.course.pk, "favorited": False},
+        ])
+        self.assertFalse(await Favorite.objects.filter(user=self.user).aexists())
+        self.assertEqual((await self.async_client.get(url)).status_code, 405)
+
+    async def test_react_returns_the_new_counts(self):
+        url = reverse("api_react", args=[self.rating.pk])
+        await self.login(self.user)
+        response = await self.async_client.post(url, {"reaction_type": "helpful"})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(
+            {k: body[k] for k in ("status", "rating_id", "reaction", "helpful_count", "not_helpful_count")},
+            {"status": "success", "rating_id": self.rating.pk, "reaction": "helpful", "helpful_count": 1, "not_helpful_count": 0},
+        )
+        self.assertEqual((await self.async_client.post(url, {"reaction_type": "love"})).status_code, 400)
+
+    async def test_random_comment_shape(self):
+        body = (await self.async_client.get(reverse("api_random_comment", args=[self.course.pk]))).json()
+        self.assertEqual(
+            {k: body[k] for k in ("text", "user", "kind", "id")},
+            {"text": "很好", "user": "bob", "kind": "rating", "id": self.rating.pk},
+        )
+        self.assertIn("created_at", body)
+
+    async def test_missing_and_pending_courses_are_404(self):
+        await self.login(self.user)
+        for course_id, rating_id in ((999999, 999999), (self.pending.pk, self.pending_rating.pk)):
+            responses = [
+                await self.async_client.post(reverse("api_toggle_favorite", args=[course_id])),
+                await self.async_client.post(reverse("api_react", args=[rating_id]), {"reaction_type": "helpful"}),
+                await self.async_client.get(reverse("api_random_comment", args=[course_id])),
+            ]
+            self.assertEqual([r.status_code for r in responses], [404, 404, 404], course_id)
+        self.assertFalse(await Favorite.objects.filter(course=self.pending).aexists())
+
+    async def test_staff_see_pending_courses(self):
+        await self.login(self.staff)
+        response = await self.async_client.get(reverse("api_random_comment", args=[self.pending.pk]))
+        self.assertEqual(response.json()["text"], "待审")
+        response = await self.async_client.post(reverse("api_toggle_favorite", args=[self.pending.pk]))
+        self.assertTrue(response.json()["favorited"])
+
+
+class DistributionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        users = [User.objects.create(username=f"user{i}") for i in range(4)]
+        cls.staff = User.objects.create(username="staff", is_staff=True)
+        school = School.objects.create(name="测试大学")
+        cls.course = Course.objects.create(code="CS101", title="数据结构", school=school, status="approved")
+        cls.unrated = Course.objects.create(code="CS102", title="算法", school=school, status="approved")
+        cls.pending = Course.objects.create(code="CS103", title="编译", school=school)
+        for user, overall, difficulty in zip(users, (1, 4, 4, 5), (2, 2, 3, 3)):
+            Rating.objects.create(user=user, course=cls.course, overall_score=overall, difficulty=difficulty, usefulness=3, workload=3)
+
+    async def fetch(self, course):
+        response = await self.async_client.get(reverse("api_course_distribution", args=[getattr(course, "pk", course)]))
+        return response.status_code, response.json()
+
+    async def test_histogram_of_known_ratings(self):
+        status, body = await self.fetch(self.course)
+        self.assertEqual(status, 200)
+        self.assertEqual((body["course_id"], body["rating_count"]), (self.course.pk, 4))
+        self.assertEqual(set(body["distributions"]), {"overall", "difficulty", "usefulness", "workload"})
+        overall = body["distributions"]["overall"]
+        self.assertEqual((overall["counts"], overall["total"], overall["mean"], overall["median"]), ([1, 0, 0, 2, 1], 4, 3.5, 4))
+        self.assertAlmostEqual(overall["stddev"], ((2.5 ** 2 + 0.5 ** 2 * 2 + 1.5 ** 2) / 4) ** 0.5)
+        difficulty = body["distributions"]["difficulty"]
+        self.assertEqual((difficulty["counts"], difficulty["median"], difficulty["stddev"]), ([0, 2, 2, 0, 0], 2.5, 0.5))
+        self.assertEqual(body["distributions"]["workload"]["counts"], [0, 0, 4, 0, 0])
+
+    async def test_course_without_ratings(self):
+        status, body = await self.fetch(self.unrated)
+        self.assertEqual((status, body["rating_count"]), (200, 0))
+        self.assertEqual(body["distributions"]["overall"], {"counts": [0] * 5, "total": 0, "mean": None, "median": None, "stddev": None})
+
+    async def test_missing_and_pending_courses_are_404(self):
+        self.assertEqual((await self.fetch(999999))[0], 404)
+        self.assertEqual((await self.fetch(self.pending))[0], 404)
+        await sync_to_async(self.async_client.force_login)(self.staff)
+        self.assertEqual((await self.fetch(self.pending))[0], 200)
@@ -0,0 +1,18 @@
+from django.test import TestCase
+
+from core import benchmarking, reactions, stats
+from core.models import Course, Rating, School
+
+
+class SeedTests(TestCase):
+    def test_seed_writes_the_requested_sizes_with_consistent_counters(self):
+        counts = benchmarking.seed(courses=60, ratings=300, comments=50, reactions=200, users=20, writers=3)
+        self.assertEqual(Course.objects.count(), 60)
+        self.assertEqual(School.objects.count(), 2)
+        self.assertEqual(Rating.objects.count(), 300)
+        self.assertEqual({k: counts[k] for k in ("courses", "ratings", "comments", "reactions")},
+                         {"courses": 60, "ratings": 300, "comments": 50, "reactions": 200})
+        self.assertEqual(len(benchmarking.writer_users()), 3)
+        self.assertFalse(Rating.objects.filter(user__in=benchmarking.writer_users()).exists())
+        self.assertEqual(stats.check_stats(), [])
+        self.assertEqual(reactions.check_reactions(), [])
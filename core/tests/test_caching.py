@@ -0,0 +1,95 @@
+import pickle
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from core import caching
+from core.models import Comment, Course, Rating, RatingReaction, School
+
+STALE = "stale"
+
+
+class InvalidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.author = User.objects.create_user(username="alice", password="s3cret-pass")
+        cls.reader = User.objects.create_user(username="bob", password="s3cret-pass")
+        cls.school = School.objects.create(name="测试大学")
+        cls.course = Course.objects.create(code="CS101", title="数据结构", school=cls.school, status="approved")
+        cls.rating = Rating.objects.create(
+            user=cls.author, course=cls.course, overall_score=4, difficulty=3, usefulness=4, workload=2
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def page_keys(self, course):
+        return [
+            caching.course_detail_key(course.pk),
+            caching.index_key(),
+            caching.rankings_key(),
+            caching.rankings_key(course.school_id),
+        ]
+
+    def fill(self, keys):
+        for key in keys:
+            caching.get_or_build(key, lambda: STALE)
+
+    def cached(self, keys):
+        return [key for key in keys if caching.get_or_build(key, lambda: None) == STALE]
+
+    def assertWriteInvalidates(self, write, course=None):
+        keys = self.page_keys(course or self.course)
+        self.fill(keys)
+        with self.captureOnCommitCallbacks(execute=True):
+            write()
+            self.assertEqual(self.cached(keys), [])
+            # a reader that raced the write caches what it saw before the commit
+            self.fill(keys)
+        self.assertEqual(self.cached(keys), [])
+
+    def test_rating(self):
+        self.assertWriteInvalidates(lambda: Rating.objects.create(
+            user=self.reader, course=self.course, overall_score=2, difficulty=3, usefulness=2, workload=4
+        ))
+
+    def test_comment(self):
+        self.assertWriteInvalidates(lambda: Comment.objects.create(rating=self.rating, user=self.reader, text="同意"))
+
+    def test_reaction(self):
+        self.assertWriteInvalidates(lambda: RatingReaction.objects.create(
+            rating=self.rating, user=self.reader, reaction_type="helpful"
+        ))
+
+    def test_approval(self):
+        pending = Course.objects.create(code="CS102", title="算法", school=self.school)
+
+        def approve():
+            # what approve_course does
+            pending.status = "approved"
+            pending.save()
+
+        self.assertWriteInvalidates(approve, pending)
+
+    def test_cached_page_shows_the_write(self):
+        url = reverse("course_detail", args=[self.course.pk])
+        self.assertEqual(self.client.get(url).context["rating_count"], 1)
+        Rating.objects.create(user=self.reader, course=self.course, overall_score=2, difficulty=3, usefulness=2, workload=4)
+        self.assertEqual(self.client.get(url).context["rating_count"], 2)
+
+    def test_cached_pages_hold_no_user_rows(self):
+        RatingReaction.objects.create(rating=self.rating, user=self.reader, reaction_type="helpful")
+        self.client.get(reverse("course_detail", args=[self.course.pk]))
+        self.client.get(reverse("rankings"))
+        self.client.get(reverse("index"))
+        for key in (caching.course_detail_key(self.course.pk), caching.rankings_key(), caching.index_key()):
+            value = caching.get_or_build(key, lambda: None)
+            self.assertIsNotNone(value, key)
+            pickled = pickle.dumps(value)
+            self.assertNotIn(self.author.password.encode(), pickled, key)
+            self.assertNotIn(b"pbkdf2", pickled, key)
+        boards = caching.get_or_build(caching.rankings_key(), lambda: None)
+        self.assertEqual(boards["top_helpful_users"][0]["user"], {"id": self.author.pk, "username": "alice"})
@@ -0,0 +1,100 @@
+import tempfile
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core import db_router
+from core.models import Course, Rating, School
+
+REPLICA = "replica1"
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaStickinessTests(TransactionTestCase):
+    """A real second SQLite file stands in for a replica that lags behind the primary."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # added after the test case has guarded the configured connections, and
+        # only here: the test runner must not create or mirror this database
+        cls.directory = tempfile.TemporaryDirectory()
+        connections.settings[REPLICA] = {**connections.settings["default"], "NAME": str(Path(cls.directory.name) / "replica.sqlite3")}
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.writer = User.objects.create(username="writer")
+        school = School.objects.create(name="测试大学")
+        self.course = Course.objects.create(code="CS101", title="数据结构", school=school, status="approved")
+        for i in range(3):
+            Rating.objects.create(
+                user=User.objects.create(username=f"reader{i}"), course=self.course,
+                overall_score=4, difficulty=3, usefulness=4, workload=2,
+            )
+        self.sync_replica()
+
+    def sync_replica(self):
+        connections[REPLICA].close()
+        connections["default"].ensure_connection()
+        target = connections[REPLICA]
+        target.ensure_connection()
+        connections["default"].connection.backup(target.connection)
+
+    def rating_count(self, client):
+        return client.get(reverse("course_detail", args=[self.course.pk])).context["rating_count"]
+
+    def test_writer_reads_its_write_past_a_page_cached_from_the_replica(self):
+        writer = self.client
+        writer.force_login(self.writer)
+        response = writer.post(
+            reverse("rate_course", args=[self.course.pk]),
+            {"overall_score": "5", "difficulty": "3", "usefulness": "5", "workload": "2"},
+        )
+        self.assertIn(db_router.STICKY_COOKIE, response.cookies)
+        self.assertEqual(Rating.objects.filter(course=self.course).count(), 4)
+
+        # another visitor reads the lagging replica and caches what it saw
+        visitor = self.client_class()
+        self.assertEqual(self.rating_count(visitor), 3)
+        self.assertEqual(self.rating_count(visitor), 3)
+        self.assertEqual(self.rating_count(writer), 4)
+
+        # once the replica catches up and the page is invalidated, everyone agrees
+        self.sync_replica()
+        Rating.objects.create(
+            user=get_user_model().objects.create(username="late"), course=self.course,
+            overall_score=3, difficulty=3, usefulness=3, workload=3,
+        )
+        self.sync_replica()
+        self.assertEqual(self.rating_count(visitor), 5)
+
+    def test_read_source_follows_the_request(self):
+        self.assertEqual(db_router.read_source(), "default")
+        seen = {}
+        with self.modify_settings(MIDDLEWARE={"append": "core.tests.test_db_router.record_source"}):
+            self.client.get(reverse("index"))
+            seen["reader"] = record_source.last
+            self.client.cookies[db_router.STICKY_COOKIE] = "9999999999"
+            self.client.get(reverse("index"))
+            seen["sticky"] = record_source.last
+        self.assertEqual(seen, {"reader": REPLICA, "sticky": "default"})
+
+
+def record_source(get_response):
+    def middleware(request):
+        record_source.last = db_router.read_source()
+        return get_response(request)
+    return middleware
@@ -0,0 +1,61 @@
+import csv
+import io
+import json
+from io import StringIO
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from core import exporting
+from core.models import Course, Rating, School
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.users = [User.objects.create(username=f"user{i}") for i in range(5)]
+        cls.staff = User.objects.create(username="staff", is_staff=True)
+        school = School.objects.create(name="测试大学")
+        cls.course = Course.objects.create(code="CS101", title="数据结构", school=school, status="approved")
+        cls.ratings = [
+            Rating.objects.create(
+                user=u, course=cls.course, overall_score=i + 1, difficulty=3, usefulness=3, workload=3,
+                comment_text="逗号, 和\n换行",
+            )
+            for i, u in enumerate(cls.users)
+        ]
+
+    def test_csv_pages_through_every_row_once(self):
+        out = StringIO()
+        call_command("export_data", "ratings", "--chunk-size", "2", stdout=out)
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        self.assertEqual([int(r["rating_id"]) for r in rows], [r.pk for r in self.ratings])
+        self.assertEqual(rows[0]["course_school_name"], "测试大学")
+        self.assertEqual(rows[0]["comment_text"], "逗号, 和\n换行")
+
+    def test_jsonl_has_one_object_per_row(self):
+        text = "".join(exporting.export_lines("course_stats", "jsonl", chunk_size=1))
+        rows = [json.loads(line) for line in text.splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["stats_rating_count"], 5)
+        self.assertAlmostEqual(rows[0]["stats_avg_overall"], 3.0)
+
+    def test_async_export_matches_sync_export(self):
+        async def collect():
+            return [text async for text in exporting.aexport_lines("ratings", "csv", chunk_size=2)]
+
+        self.assertEqual("".join(async_to_sync(collect)()), "".join(exporting.export_lines("ratings", "csv", chunk_size=2)))
+
+    def test_view_is_staff_only(self):
+        url = reverse("export_data", args=["ratings"])
+        self.client.force_login(self.users[0])
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.staff)
+        response = self.client.get(url, {"format": "jsonl"})
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="ratings.jsonl"')
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), len(self.ratings))
+        self.assertEqual(self.client.get(reverse("export_data", args=["users"])).status_code, 404)
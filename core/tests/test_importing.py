@@ -0,0 +1,87 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from core import stats
+from core.models import Course, Rating, School
+
+
+class ImportCatalogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name="测试大学")
+        cls.course = Course.objects.create(code="CS101", title="数据结构", school=cls.school, status="approved")
+        cls.alice = get_user_model().objects.create(username="alice")
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def run_import(self, kind, name, text, *args):
+        path = self.directory / name
+        path.write_text(text, encoding="utf-8")
+        out, err = StringIO(), StringIO()
+        call_command("import_catalog", kind, str(path), *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_errors_name_the_file_line(self):
+        _, err = self.run_import(
+            "courses", "courses.csv",
+            "school,code,title\n测试大学,CS102,算法\n测试大学,CS103,\n测试大学,CS104,编译原理\n",
+            "--batch-size", "2",
+        )
+        self.assertEqual(err.strip(), "line 3: missing title")
+        self.assertEqual(set(Course.objects.values_list("code", flat=True)), {"CS101", "CS102", "CS104"})
+
+    def test_jsonl_line_numbers_count_blank_lines(self):
+        _, err = self.run_import(
+            "courses", "courses.jsonl",
+            '{"school": "测试大学", "code": "CS102", "title": "算法"}\n\n{"school": "无名大学", "code": "X1", "title": "X"}\n',
+        )
+        self.assertEqual(err.strip(), "line 3: unknown school '无名大学'")
+
+    def test_broken_json_names_the_line(self):
+        with self.assertRaisesMessage(CommandError, "line 2:"):
+            self.run_import("courses", "courses.jsonl", '{"school": "测试大学", "code": "CS102", "title": "算法"}\n{"school"\n')
+        # the line breaks the first batch while it is being read, so nothing was written
+        self.assertFalse(Course.objects.filter(code="CS102").exists())
+
+    def test_ratings_keep_existing_and_create_missing(self):
+        scores = {"overall_score": 2, "difficulty": 2, "usefulness": 2, "workload": 2}
+        kept = Rating.objects.create(user=self.alice, course=self.course, **scores)
+        other = Course.objects.create(code="CS102", title="算法", school=self.school, status="approved")
+        out, _ = self.run_import(
+            "ratings", "ratings.csv",
+            "username,school,course_code,overall_score,difficulty,usefulness,workload\n"
+            "alice,测试大学,CS101,5,5,5,5\n"
+            "alice,测试大学,CS102,4,3,4,2\n"
+            "bob,测试大学,CS101,3,3,3,3\n",
+            "--create-users",
+        )
+        self.assertIn("3 read, 2 created, 0 updated, 1 skipped, 0 errors", out)
+        self.assertEqual(Rating.objects.get(pk=kept.pk).overall_score, 2)
+        self.assertEqual(Rating.objects.filter(course=other).get().user, self.alice)
+        self.assertEqual(Rating.objects.filter(course=self.course, user__username="bob").count(), 1)
+        self.assertEqual(stats.check_stats(), [])
+
+    def test_reimport_skips_ratings_already_imported(self):
+        text = "username,school,course_code,overall_score,difficulty,usefulness,workload\nalice,测试大学,CS101,5,5,5,5\n"
+        self.run_import("ratings", "ratings.csv", text)
+        out, _ = self.run_import("ratings", "ratings.csv", text)
+        self.assertIn("1 read, 0 created, 0 updated, 1 skipped", out)
+        self.assertEqual(Rating.objects.count(), 1)
+
+    def test_out_of_range_date_skips_the_row(self):
+        _, err = self.run_import(
+            "ratings", "ratings.csv",
+            "username,school,course_code,overall_score,difficulty,usefulness,workload,created_at\n"
+            "alice,测试大学,CS101,5,5,5,5,2024-13-01 00:00\n"
+            "alice,测试大学,CS101,4,4,4,4,2024-12-01 00:00\n",
+        )
+        self.assertEqual(err.strip(), "line 2: bad created_at: '2024-13-01 00:00'")
+        self.assertEqual(Rating.objects.get().overall_score, 4)
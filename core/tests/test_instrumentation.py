@@ -0,0 +1,86 @@
+import re
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import instrumentation
+from core.instrumentation import QueryBudgetExceeded
+from core.models import Comment, Course, Rating, RatingReaction, School
+
+SERVER_TIMING = re.compile(r'^db;dur=[\d.]+;desc="(\d+) queries", tpl;dur=[\d.]+, total;dur=[\d.]+$')
+
+
+class InstrumentationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.users = [User.objects.create(username=f"user{i}") for i in range(6)]
+        school = School.objects.create(name="测试大学")
+        cls.courses = [
+            Course.objects.create(code=f"CS10{i}", title=f"课程{i}", school=school, status="approved") for i in range(3)
+        ]
+        for course in cls.courses:
+            for i, user in enumerate(cls.users):
+                rating = Rating.objects.create(
+                    user=user, course=course, overall_score=i % 5 + 1, difficulty=3, usefulness=4, workload=2,
+                    comment_text=f"评价{i}",
+                )
+                Comment.objects.create(rating=rating, user=cls.users[-1 - i], text="同意")
+                RatingReaction.objects.create(rating=rating, user=cls.users[-1 - i], reaction_type="helpful")
+
+    def setUp(self):
+        cache.clear()
+        instrumentation.reset()
+
+    def queries_reported(self, response):
+        match = SERVER_TIMING.match(response["Server-Timing"])
+        self.assertIsNotNone(match, response["Server-Timing"])
+        return int(match.group(1))
+
+    def test_server_timing_counts_the_queries(self):
+        with self.assertNumQueries(self.queries_reported(self.client.get(reverse("index")))):
+            cache.clear()
+            self.client.get(reverse("index"))
+        # the page cache saves the queries the second time
+        self.assertLess(self.queries_reported(self.client.get(reverse("index"))), 3)
+
+    async def test_async_views_are_timed(self):
+        response = await self.async_client.get(reverse("api_course_distribution", args=[self.courses[0].pk]))
+        self.assertEqual(self.queries_reported(response), 1)
+
+    @override_settings(QUERY_BUDGETS={"index": 0})
+    def test_over_budget_request_logs_a_warning(self):
+        with self.assertLogs("core.instrumentation", "WARNING") as logs:
+            self.client.get(reverse("index"))
+        self.assertIn("index ran", logs.output[0])
+        self.assertIn("over its budget of 0 (GET /)", logs.output[0])
+        row = instrumentation.snapshot()["index"]
+        self.assertEqual((row["requests"], row["over_budget"], row["budget"]), (1, 1, 0))
+
+    @override_settings(QUERY_BUDGETS={"index": 0}, QUERY_BUDGET_RAISE=True)
+    def test_over_budget_request_raises_when_asked(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, "over its budget of 0"):
+            self.client.get(reverse("index"))
+
+    @override_settings(QUERY_BUDGET_RAISE=True)
+    def test_views_stay_within_their_budgets(self):
+        self.client.force_login(self.users[0])
+        course = self.courses[0]
+        rating = Rating.objects.filter(course=course).first()
+        requests = {
+            "index": reverse("index"),
+            "courses": reverse("courses"),
+            "rankings": reverse("rankings"),
+            "course_detail": reverse("course_detail", args=[course.pk]),
+            "random_course_comment": reverse("random_course_comment", args=[course.pk]),
+            "api_random_comments": reverse("api_random_comments") + "?courses=" + ",".join(str(c.pk) for c in self.courses),
+            "rating_comments": reverse("rating_comments", args=[rating.pk]),
+        }
+        self.assertLessEqual(set(settings.QUERY_BUDGETS), set(requests))
+        for name, url in requests.items():
+            cache.clear()
+            self.assertEqual(self.client.get(url).status_code, 200, name)
+        self.assertEqual({name: row["over_budget"] for name, row in instrumentation.snapshot().items()}, dict.fromkeys(requests, 0))
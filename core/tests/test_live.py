@@ -0,0 +1,61 @@
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TestCase
+
+from core import api, live
+from core.models import Course, Rating, School
+
+
+class CourseEventsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create(username="author")
+        school = School.objects.create(name="测试大学")
+        cls.course = Course.objects.create(code="CS101", title="数据结构", school=school, status="approved")
+        cls.pending = Course.objects.create(code="CS102", title="编译原理", school=school, status="pending")
+
+    def rate(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Rating.objects.create(user=self.user, course=self.course, overall_score=5, difficulty=2, usefulness=4, workload=3)
+
+    @mock.patch.object(api, "HEARTBEAT_SECONDS", 0.05)
+    @mock.patch.object(api, "STREAM_SECONDS", 0.2)
+    async def test_stream_ends_and_unsubscribes(self):
+        response = await AsyncClient().get(f"/api/course/{self.course.pk}/events/")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        frames = [frame async for frame in response.streaming_content]
+        self.assertEqual(frames[0], f"retry: {api.RETRY_MS}\n\n".encode())
+        self.assertIn(b": ping\n\n", frames)
+        self.assertEqual(live.subscriber_count(self.course.pk), 0)
+
+    async def test_committed_rating_reaches_subscribers(self):
+        queue = live.subscribe(self.course.pk)
+        try:
+            await sync_to_async(self.rate)()
+            event, data = await queue.get()
+        finally:
+            live.unsubscribe(self.course.pk, queue)
+        self.assertEqual(event, "rating")
+        self.assertEqual((data["rating"]["overall_score"], data["stats"]["rating_count"]), (5, 1))
+
+    def test_no_event_is_built_without_subscribers(self):
+        with mock.patch.object(live, "_stats") as stats:
+            self.rate()
+        stats.assert_not_called()
+
+    def test_wsgi_requests_get_no_stream(self):
+        self.assertEqual(self.client.get(f"/api/course/{self.course.pk}/events/").status_code, 204)
+
+    async def test_pending_course_is_not_streamed(self):
+        client = AsyncClient()
+        response = await client.get(f"/api/course/{self.pending.pk}/events/")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(live.subscriber_count(self.pending.pk), 0)
+        staff = await get_user_model().objects.acreate(username="staff", is_staff=True)
+        await sync_to_async(client.force_login)(staff)
+        with mock.patch.object(api, "STREAM_SECONDS", 0):
+            response = await client.get(f"/api/course/{self.pending.pk}/events/")
+            self.assertEqual(response["Content-Type"], "text/event-stream")
+            self.assertEqual([frame async for frame in response.streaming_content], [f"retry: {api.RETRY_MS}\n\n".encode()])
@@ -0,0 +1,59 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from core import reactions, stats
+from core.models import Course, Rating, RatingReaction, School, UserDisclaimer, UserHelpfulStats
+
+
+class MigrateAppUserTests(TestCase):
+    """Legacy user ids 1 and 2 belong to the auth accounts with the other id, so the relink swaps them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.alice = User.objects.create(username="alice")
+        cls.bob = User.objects.create(username="bob")
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE TABLE "user" (user_id integer PRIMARY KEY, username varchar(150), email varchar(254))')
+            cursor.executemany(
+                'INSERT INTO "user" (user_id, username, email) VALUES (%s, %s, %s)',
+                [(cls.alice.pk, "bob", ""), (cls.bob.pk, "alice", "")],
+            )
+        school = School.objects.create(name="测试大学")
+        course = Course.objects.create(code="CS101", title="数据结构", school=school, status="approved")
+        scores = {"overall_score": 4, "difficulty": 3, "usefulness": 4, "workload": 2}
+        # written under legacy ids: this rating is bob's, the reaction on it alice's, and the other way round
+        cls.bobs_rating = Rating.objects.create(user_id=cls.alice.pk, course=course, **scores)
+        cls.alices_rating = Rating.objects.create(user_id=cls.bob.pk, course=course, **scores)
+        RatingReaction.objects.create(rating=cls.bobs_rating, user_id=cls.bob.pk, reaction_type="helpful")
+        RatingReaction.objects.create(rating=cls.alices_rating, user_id=cls.alice.pk, reaction_type="helpful")
+        UserDisclaimer.objects.create(user_id=cls.alice.pk, accepted_at=timezone.now())
+
+    def relink(self, **options):
+        call_command("migrate_appuser_to_auth", stdout=StringIO(), chunk_size=1, **options)
+
+    def test_relink_swaps_ids_and_keeps_counters_consistent(self):
+        self.relink()
+        self.assertEqual(Rating.objects.get(pk=self.bobs_rating.pk).user, self.bob)
+        self.assertEqual(Rating.objects.get(pk=self.alices_rating.pk).user, self.alice)
+        self.assertEqual(RatingReaction.objects.get(rating=self.bobs_rating).user, self.alice)
+        self.assertEqual(UserDisclaimer.objects.get().user, self.bob)
+        self.assertEqual(UserHelpfulStats.objects.get(user=self.bob).helpful_count, 1)
+        self.assertEqual(reactions.check_reactions(), [])
+        self.assertEqual(stats.check_stats(), [])
+
+    def test_dry_run_writes_nothing(self):
+        self.relink(dry_run=True)
+        self.assertEqual(Rating.objects.get(pk=self.bobs_rating.pk).user, self.alice)
+        self.assertNotIn("legacy_user_map", connection.introspection.table_names())
+
+    def test_second_run_changes_nothing(self):
+        self.relink()
+        self.relink()
+        self.assertEqual(Rating.objects.get(pk=self.bobs_rating.pk).user, self.bob)
+        self.assertEqual(reactions.check_reactions(), [])
@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Course, Rating, School
+from core.pagination import keyset_page, list_page, newest_page, parse_time_cursor
+
+
+def walk(fetch, size):
+    """Every page forward from the start, then every page back from the last one."""
+    forward = [fetch(size=size)]
+    while forward[-1]["next_cursor"] is not None:
+        forward.append(fetch(after=forward[-1]["next_cursor"], size=size))
+    backward = [forward[-1]]
+    while backward[-1]["prev_cursor"] is not None:
+        backward.append(fetch(before=backward[-1]["prev_cursor"], size=size))
+    return [page["items"] for page in forward], [page["items"] for page in reversed(backward)]
+
+
+class PaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        school = School.objects.create(name="测试大学")
+        cls.courses = [
+            Course.objects.create(code=f"C{i:02d}", title=f"课程{i}", school=school, status="approved" if i % 5 else "pending")
+            for i in range(45)
+        ]
+        user = get_user_model().objects.create(username="alice")
+        now = timezone.now()
+        # ties on created_at and undated rows, which newest_page lists last
+        times = [now - timedelta(minutes=i // 3) for i in range(10)] + [None] * 3
+        cls.ratings = [
+            Rating.objects.create(
+                user=user, course=cls.courses[1], overall_score=3, difficulty=3, usefulness=3, workload=3, created_at=t
+            )
+            for t in times
+        ]
+
+    def test_keyset_page_walks_forward_and_back(self):
+        qs = Course.objects.all()
+        forward, backward = walk(lambda **kw: keyset_page(qs, "course_id", **kw), 20)
+        self.assertEqual([c for page in forward for c in page], sorted(self.courses, key=lambda c: c.pk))
+        self.assertEqual([len(page) for page in forward], [20, 20, 5])
+        self.assertEqual(backward, forward)
+
+    def test_list_page_keeps_the_given_order(self):
+        ids = list(range(30, 0, -3))
+        forward, backward = walk(lambda **kw: list_page(ids, **kw), 4)
+        self.assertEqual(forward, [ids[0:4], ids[4:8], ids[8:10]])
+        self.assertEqual(backward, forward)
+
+    def test_newest_page_orders_by_time_then_pk_with_undated_rows_last(self):
+        qs = Rating.objects.all()
+
+        def fetch(size, after=None, before=None):
+            return newest_page(qs, after and parse_time_cursor(after), before and parse_time_cursor(before), size)
+
+        forward, backward = walk(fetch, 4)
+        dated = sorted((r for r in self.ratings if r.created_at), key=lambda r: (r.created_at, r.pk), reverse=True)
+        undated = sorted((r for r in self.ratings if r.created_at is None), key=lambda r: r.pk, reverse=True)
+        self.assertEqual([r for page in forward for r in page], dated + undated)
+        self.assertEqual(backward, forward)
+
+    def test_courses_page_links_cover_every_approved_course_once(self):
+        seen, url = [], reverse("courses")
+        while url:
+            context = self.client.get(url).context
+            seen += [c.pk for c in context["courses"]]
+            url = reverse("courses") + "?" + context["next_query"] if context["next_query"] else None
+        approved = [c.pk for c in self.courses if c.status == "approved"]
+        self.assertEqual(seen, approved)
+        self.assertGreater(len(approved), 20)
@@ -0,0 +1,33 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.management.commands.check_query_plans import SMALL_TABLES, Command
+from core.models import Comment, Course, Rating, School
+
+
+class CheckQueryPlansTests(TestCase):
+    def scans(self, sql):
+        return Command()._full_scans(sql, SMALL_TABLES)[1]
+
+    def test_filtered_limit_query_is_a_scan(self):
+        self.assertEqual(self.scans('SELECT * FROM "rating" WHERE "rating"."comment_text" = \'x\' LIMIT 1'), ["SCAN rating"])
+
+    def test_unfiltered_page_in_key_order_stops_at_the_limit(self):
+        self.assertEqual(self.scans('SELECT * FROM "rating" ORDER BY "rating"."rating_id" ASC LIMIT 21'), [])
+        # sorting first reads every row
+        self.assertEqual(self.scans('SELECT * FROM "rating" ORDER BY "rating"."comment_text" ASC LIMIT 21'), ["SCAN rating"])
+
+    def test_every_driven_view_uses_an_index(self):
+        user = get_user_model().objects.create(username="alice")
+        school = School.objects.create(name="测试大学")
+        course = Course.objects.create(code="CS101", title="数据结构", school=school, status="approved")
+        rating = Rating.objects.create(user=user, course=course, overall_score=4, difficulty=3, usefulness=4, workload=2)
+        Comment.objects.create(rating=rating, user=user, text="同意")
+        out = StringIO()
+        call_command("check_query_plans", stdout=out)
+        self.assertIn(f"GET /rating/{rating.pk}/comments/", out.getvalue())
+        self.assertIn("/api/courses/random_comments/", out.getvalue())
+        self.assertIn("Every statement uses an index.", out.getvalue())
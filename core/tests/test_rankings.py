@@ -0,0 +1,104 @@
+import math
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core import rankings, scoring
+from core.models import Course, RankingSnapshot, Rating, RatingReaction, School
+
+
+def wilson(positive, negative, z=scoring.WILSON_Z):
+    n = positive + negative
+    p = positive / n
+    return (p + z * z / (2 * n) - z * math.sqrt((p * (1 - p) + z * z / (4 * n)) / n)) / (1 + z * z / n)
+
+
+class ScoringTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.users = [User.objects.create(username=f"user{i}") for i in range(12)]
+        school = School.objects.create(name="测试大学")
+        cls.lucky = Course.objects.create(code="ONE", title="一条满分", school=school, status="approved")
+        cls.solid = Course.objects.create(code="MANY", title="口碑稳定", school=school, status="approved")
+        cls.plain = Course.objects.create(code="AVG", title="中规中矩", school=school, status="approved")
+        cls.rate(cls.lucky, cls.users[:1], [5])
+        cls.rate(cls.solid, cls.users[:10], [5] * 8 + [4] * 2)
+        cls.rate(cls.plain, cls.users[:10], [3] * 10)
+
+    @classmethod
+    def rate(cls, course, users, scores):
+        return [
+            Rating.objects.create(user=u, course=course, overall_score=s, difficulty=3, usefulness=3, workload=3)
+            for u, s in zip(users, scores)
+        ]
+
+    def test_many_good_ratings_beat_one_perfect_rating(self):
+        rankings.refresh_snapshots()
+        board = rankings.get_rankings()["top_overall"]
+        self.assertEqual([row["course"] for row in board], [self.solid, self.lucky, self.plain])
+        means = rankings.current_priors()
+        self.assertAlmostEqual(means["overall"], (5 + 8 * 5 + 2 * 4 + 10 * 3) / 21)
+        weight = scoring.PRIOR_WEIGHT
+        self.assertAlmostEqual(board[0]["score"], (weight * means["overall"] + 48) / (weight + 10))
+
+    def test_priors_are_read_from_the_snapshot(self):
+        self.assertEqual(rankings.current_priors(), scoring.MIDPOINT_PRIORS)
+        rankings.refresh_snapshots()
+        with CaptureQueriesContext(connection) as captured:
+            rankings.build_rankings()
+        # no per-request pass over all of course_stats
+        self.assertFalse([q["sql"] for q in captured if 'SUM("course_stats"' in q["sql"]])
+
+    def test_helpful_ratio_uses_wilson_lower_bound(self):
+        author_ratings = self.rate(self.solid, self.users[10:12], [4, 4])
+        one_of_one, nine_of_ten = author_ratings
+        RatingReaction.objects.create(rating=one_of_one, user=self.users[0], reaction_type="helpful")
+        for i, user in enumerate(self.users[:10]):
+            RatingReaction.objects.create(rating=nine_of_ten, user=user, reaction_type="helpful" if i else "not_helpful")
+        board = rankings.build_rankings()["top_helpful_ratio_users"]
+        self.assertEqual([row["user"]["id"] for row in board], [self.users[11].pk, self.users[10].pk])
+        self.assertAlmostEqual(board[0]["score"], wilson(9, 1))
+        self.assertAlmostEqual(board[1]["score"], wilson(1, 0))
+
+
+class SnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create(username="alice")
+        cls.school = School.objects.create(name="测试大学")
+        cls.other_school = School.objects.create(name="另一所大学")
+        cls.course = Course.objects.create(code="CS101", title="数据结构", school=cls.school, status="approved")
+        cls.other = Course.objects.create(code="CS102", title="算法", school=cls.other_school, status="approved")
+        for course in (cls.course, cls.other):
+            Rating.objects.create(user=cls.user, course=course, overall_score=4, difficulty=3, usefulness=4, workload=2)
+
+    def board_courses(self, school_id=None, **kwargs):
+        return [row["course"] for row in rankings.get_rankings(school_id, **kwargs)["top_overall"]]
+
+    def test_refresh_writes_every_scope_and_prunes_empty_ones(self):
+        written = rankings.refresh_snapshots()
+        self.assertEqual(written[0], rankings.scope_key())
+        self.assertIn(rankings.scope_key(self.other_school.pk), written)
+        self.assertEqual(set(RankingSnapshot.objects.values_list("scope", flat=True)), set(written))
+        self.other.delete()
+        rankings.refresh_snapshots()
+        self.assertFalse(RankingSnapshot.objects.filter(scope=rankings.scope_key(self.other_school.pk)).exists())
+
+    def test_fresh_snapshot_is_served_and_a_stale_one_is_rebuilt(self):
+        rankings.refresh_snapshots()
+        newer = Course.objects.create(code="CS103", title="编译原理", school=self.school, status="approved")
+        Rating.objects.create(user=self.user, course=newer, overall_score=5, difficulty=3, usefulness=5, workload=2)
+        self.assertNotIn(newer, self.board_courses(self.school.pk))
+        self.assertIn(newer, self.board_courses(self.school.pk, max_age=0))
+        RankingSnapshot.objects.update(generated_at=timezone.now() - timedelta(seconds=rankings.SNAPSHOT_MAX_AGE + 1))
+        self.assertIn(newer, self.board_courses(self.school.pk))
+
+    def test_snapshot_drops_objects_deleted_since(self):
+        rankings.refresh_snapshots()
+        self.other.delete()
+        self.assertEqual(self.board_courses(), [self.course])
@@ -0,0 +1,75 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from core import caching, reactions
+from core.models import Course, Rating, RatingReaction, School, UserHelpfulStats
+
+
+class ReactionCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.author, cls.reader, cls.other = (User.objects.create(username=name) for name in ("author", "reader", "other"))
+        school = School.objects.create(name="测试大学")
+        cls.course = Course.objects.create(code="CS101", title="数据结构", school=school, status="approved")
+        cls.rating = Rating.objects.create(
+            user=cls.author, course=cls.course, overall_score=4, difficulty=3, usefulness=4, workload=2
+        )
+
+    def counts(self):
+        rating = Rating.objects.get(pk=self.rating.pk)
+        author = UserHelpfulStats.objects.filter(user=self.author).values_list("helpful_count", "not_helpful_count").first()
+        return (rating.helpful_count, rating.not_helpful_count), author
+
+    def test_counters_follow_reaction_rows(self):
+        RatingReaction.objects.create(rating=self.rating, user=self.reader, reaction_type="helpful")
+        other = RatingReaction.objects.create(rating=self.rating, user=self.other, reaction_type="not_helpful")
+        self.assertEqual(self.counts(), ((1, 1), (1, 1)))
+        other.reaction_type = "helpful"
+        other.save()
+        self.assertEqual(self.counts(), ((2, 0), (2, 0)))
+        other.delete()
+        self.assertEqual(self.counts(), ((1, 0), (1, 0)))
+        self.assertEqual(reactions.check_reactions(), [])
+
+    def test_deleting_author_with_reacted_ratings(self):
+        RatingReaction.objects.create(rating=self.rating, user=self.reader, reaction_type="helpful")
+        RatingReaction.objects.create(rating=self.rating, user=self.other, reaction_type="not_helpful")
+        self.author.delete()
+        self.assertFalse(UserHelpfulStats.objects.exists())
+        self.assertEqual(reactions.check_reactions(), [])
+
+    def test_deleting_reader(self):
+        RatingReaction.objects.create(rating=self.rating, user=self.reader, reaction_type="helpful")
+        self.reader.delete()
+        self.assertEqual(self.counts(), ((0, 0), (0, 0)))
+        self.assertEqual(reactions.check_reactions(), [])
+
+    def test_set_reaction_adds_switches_and_keeps(self):
+        self.assertEqual(reactions.set_reaction(self.reader.pk, self.rating.pk, "helpful"), "added")
+        self.assertEqual(reactions.set_reaction(self.other.pk, self.rating.pk, "helpful"), "added")
+        self.assertEqual(self.counts(), ((2, 0), (2, 0)))
+        self.assertEqual(reactions.set_reaction(self.other.pk, self.rating.pk, "not_helpful"), "changed")
+        self.assertEqual(self.counts(), ((1, 1), (1, 1)))
+        self.assertEqual(reactions.set_reaction(self.other.pk, self.rating.pk, "not_helpful"), "unchanged")
+        self.assertEqual(self.counts(), ((1, 1), (1, 1)))
+        self.assertEqual(RatingReaction.objects.filter(rating=self.rating).count(), 2)
+        self.assertEqual(reactions.check_reactions(), [])
+
+    def test_set_reaction_invalidates_cached_pages(self):
+        reactions.set_reaction(self.reader.pk, self.rating.pk, "helpful")
+        key = caching.course_detail_key(self.course.pk)
+        caching.get_or_build(key, lambda: "stale page")
+        with self.captureOnCommitCallbacks(execute=True):
+            reactions.set_reaction(self.reader.pk, self.rating.pk, "not_helpful")
+        self.assertEqual(caching.get_or_build(key, lambda: "fresh page"), "fresh page")
+
+    def test_author_total_on_other_courses_is_not_cached(self):
+        other_course = Course.objects.create(code="CS102", title="算法", school=self.course.school, status="approved")
+        Rating.objects.create(user=self.author, course=other_course, overall_score=3, difficulty=3, usefulness=3, workload=3)
+        url = reverse("course_detail", args=[other_course.pk])
+        self.assertNotContains(self.client.get(url), "获赞")
+        with self.captureOnCommitCallbacks(execute=True):
+            reactions.set_reaction(self.reader.pk, self.rating.pk, "helpful")
+        self.assertContains(self.client.get(url), "获赞 1")
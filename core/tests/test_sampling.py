@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from core import sampling
+from core.models import Comment, Course, Rating, School
+
+
+class RandomSnippetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.users = [User.objects.create(username=f"user{i}") for i in range(3)]
+        school = School.objects.create(name="测试大学")
+        cls.course = Course.objects.create(code="CS101", title="数据结构", school=school, status="approved")
+        cls.empty = Course.objects.create(code="CS102", title="算法", school=school, status="approved")
+        cls.rating = Rating.objects.create(
+            user=cls.users[0], course=cls.course, overall_score=4, difficulty=3, usefulness=4, workload=2, comment_text="很好"
+        )
+        # no text: never picked
+        Rating.objects.create(user=cls.users[0], course=cls.empty, overall_score=3, difficulty=3, usefulness=3, workload=3)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pool_refreshes_after_a_new_rating(self):
+        self.assertEqual(sampling.comment_pool(self.course.pk)["ratings"], [self.rating.pk])
+        newer = Rating.objects.create(
+            user=self.users[1], course=self.course, overall_score=2, difficulty=4, usefulness=2, workload=4, comment_text="一般"
+        )
+        self.assertEqual(sorted(sampling.comment_pool(self.course.pk)["ratings"]), [self.rating.pk, newer.pk])
+        self.assertEqual(sampling.random_snippet(self.course.pk, "rating", self.rating.pk)["id"], newer.pk)
+
+    def test_pool_refreshes_after_a_new_comment(self):
+        self.assertEqual(sampling.comment_pool(self.course.pk)["comments"], [])
+        comment = Comment.objects.create(rating=self.rating, user=self.users[1], text="同意")
+        self.assertEqual(sampling.comment_pool(self.course.pk)["comments"], [comment.pk])
+
+    def test_excluded_entry_is_never_picked(self):
+        comment = Comment.objects.create(rating=self.rating, user=self.users[1], text="同意")
+        for _ in range(20):
+            self.assertEqual(sampling.random_snippet(self.course.pk, "rating", self.rating.pk)["id"], comment.pk)
+            self.assertEqual(sampling.random_snippet(self.course.pk, "comment", comment.pk)["id"], self.rating.pk)
+
+    def test_only_entry_excluded_leaves_nothing(self):
+        self.assertEqual(sampling.random_snippet(self.course.pk, "rating", self.rating.pk), {"text": None})
+        # an unknown kind excludes nothing
+        self.assertEqual(sampling.random_snippet(self.course.pk, "review", self.rating.pk)["id"], self.rating.pk)
+
+    def test_empty_pool(self):
+        self.assertEqual(sampling.random_snippet(self.empty.pk), {"text": None})
+        response = self.client.get(reverse("random_course_comment", args=[self.empty.pk]))
+        self.assertEqual((response.status_code, response.json()), (200, {"text": None}))
+
+    def test_missing_course(self):
+        self.assertIsNone(sampling.random_snippet(999999))
+        self.assertEqual(self.client.get(reverse("random_course_comment", args=[999999])).status_code, 404)
+
+    def test_view_honours_exclude_id(self):
+        comment = Comment.objects.create(rating=self.rating, user=self.users[1], text="同意")
+        url = reverse("random_course_comment", args=[self.course.pk])
+        for _ in range(10):
+            body = self.client.get(url, {"exclude_kind": "comment", "exclude_id": comment.pk}).json()
+            self.assertEqual((body["kind"], body["id"], body["text"], body["user"]), ("rating", self.rating.pk, "很好", "user0"))
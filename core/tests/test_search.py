@@ -0,0 +1,40 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from core import search
+from core.models import Course, School
+
+
+class CourseSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        school = School.objects.create(name="测试大学")
+        cls.structures = Course.objects.create(code="CS101", title="数据结构", school=school, status="approved")
+        cls.algorithms = Course.objects.create(code="MA2", title="算法设计 101", school=school, status="approved")
+        cls.pending = Course.objects.create(code="CS102", title="编译原理", school=school, status="pending")
+
+    def setUp(self):
+        if not search.index_available():
+            self.skipTest("SQLite built without FTS5")
+
+    def ranked(self, query):
+        return search.ranked_course_ids(query, Course.objects.filter(status="approved"))
+
+    def test_cjk_query_matches_a_substring(self):
+        self.assertEqual(self.ranked("结构"), [self.structures.pk])
+
+    def test_word_query_matches_a_prefix(self):
+        self.assertEqual(self.ranked("cs"), [self.structures.pk])
+
+    def test_code_query_matches_inside_a_code(self):
+        # the title word ranks first, the code infix follows
+        self.assertEqual(self.ranked("101"), [self.algorithms.pk, self.structures.pk])
+        self.assertEqual(self.ranked("s10"), [self.structures.pk])
+        self.assertEqual(self.ranked("2"), [self.algorithms.pk])
+
+    def test_filters_apply_to_code_matches(self):
+        self.assertEqual(self.ranked("S102"), [])
+
+    def test_courses_page_lists_code_matches(self):
+        response = self.client.get(reverse("courses"), {"search": "s101"})
+        self.assertEqual([c.pk for c in response.context["courses"]], [self.structures.pk])
@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core import stats
+from core.models import Course, CourseInstructor, CourseInstructorStats, CourseStats, Instructor, Rating, School
+
+
+def make_rating(user, course, instructor=None, **scores):
+    values = {"overall_score": 4, "difficulty": 3, "usefulness": 4, "workload": 2, **scores}
+    return Rating.objects.create(user=user, course=course, instructor=instructor, **values)
+
+
+class CourseStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.users = [User.objects.create(username=f"user{i}") for i in range(3)]
+        cls.school = School.objects.create(name="测试大学")
+        cls.course = Course.objects.create(code="CS101", title="数据结构", school=cls.school, status="approved")
+        cls.instructor = Instructor.objects.create(name="张老师", school=cls.school)
+        CourseInstructor.objects.create(course=cls.course, instructor=cls.instructor, semester="春季", year=2026)
+
+    def test_stats_follow_create_update_delete(self):
+        first = make_rating(self.users[0], self.course, self.instructor, overall_score=5)
+        second = make_rating(self.users[1], self.course, overall_score=2, workload=0)
+        course_stats = CourseStats.objects.get(course=self.course)
+        self.assertEqual(course_stats.rating_count, 2)
+        self.assertEqual(course_stats.avg_overall, 3.5)
+        self.assertEqual([course_stats.overall_2, course_stats.overall_5], [1, 1])
+        # a score outside 1..5 is summed but has no histogram bucket
+        self.assertEqual(sum(getattr(course_stats, f"workload_{s}") for s in stats.SCORES), 1)
+
+        first.overall_score = 3
+        first.instructor = None
+        first.save()
+        second.delete()
+        course_stats.refresh_from_db()
+        self.assertEqual((course_stats.rating_count, course_stats.avg_overall, course_stats.overall_3), (1, 3.0, 1))
+        self.assertEqual(stats.check_stats(), [])
+
+    def test_rebuild_matches_incremental(self):
+        for user, overall in zip(self.users, (1, 4, 4)):
+            make_rating(user, self.course, self.instructor, overall_score=overall)
+        before = list(CourseStats.objects.values())
+        stats.rebuild_stats()
+        self.assertEqual(list(CourseStats.objects.values()), before)
+        self.assertEqual(stats.check_stats(), [])
+
+    def test_deleting_course_with_ratings(self):
+        make_rating(self.users[0], self.course, self.instructor)
+        make_rating(self.users[1], self.course)
+        self.course.delete()
+        self.assertFalse(CourseStats.objects.exists())
+        self.assertFalse(CourseInstructorStats.objects.exists())
+        self.assertEqual(stats.check_stats(), [])
+
+    def test_distributions(self):
+        for user, overall in zip(self.users, (1, 4, 5)):
+            make_rating(user, self.course, overall_score=overall)
+        overall = stats.distributions(CourseStats.objects.get(course=self.course))["overall"]
+        self.assertEqual(overall["counts"], [1, 0, 0, 1, 1])
+        self.assertEqual((overall["total"], overall["median"]), (3, 4))
+        self.assertAlmostEqual(overall["stddev"], (((1 - 10 / 3) ** 2 + (4 - 10 / 3) ** 2 + (5 - 10 / 3) ** 2) / 3) ** 0.5)
+        empty = stats.distributions(CourseStats(course_id=self.course.pk))["difficulty"]
+        self.assertEqual((empty["counts"], empty["median"], empty["stddev"]), ([0] * 5, None, None))
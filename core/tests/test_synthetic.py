@@ -0,0 +1,29 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from core import stats
+from core.models import Course, Rating
+
+
+class SeedSyntheticTests(TestCase):
+    def seed(self, *args):
+        call_command(
+            "seed_synthetic", "--schools", "2", "--courses-per-school", "3", "--instructors-per-school", "2",
+            "--users", "10", "--ratings", "30", "--comments", "5", "--reactions", "10", "--favorites", "5",
+            *args, stdout=StringIO(),
+        )
+
+    def test_small_data_set(self):
+        self.seed("--days", "1")
+        self.assertEqual(Course.objects.count(), 6)
+        self.assertEqual(Rating.objects.count(), 30)
+        self.assertEqual(stats.check_stats(), [])
+
+    def test_days_must_be_positive(self):
+        with self.assertRaisesMessage(CommandError, "--days must be at least 1"):
+            self.seed("--days", "0")
+        with self.assertRaises(CommandError):
+            self.seed("--days", "-1")
+        self.assertFalse(Course.objects.exists())
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     path("", views.index, name="index"),
@@ -13,10 +13,19 @@ urlpatterns = [
     path("disclaimer/", views.disclaimer, name="disclaimer"),
     path("course/<int:course_id>/rate/", views.rate_course, name="rate_course"),
     path("rating/<int:rating_id>/comment/", views.add_comment, name="add_comment"),
+    path("rating/<int:rating_id>/comments/", views.rating_comments, name="rating_comments"),
     path("rating/<int:rating_id>/reaction/", views.add_reaction, name="add_reaction"),
     path("course/<int:course_id>/favorite/", views.toggle_favorite, name="toggle_favorite"),
     path("report/", views.report, name="report"),
+    path("api/course/<int:course_id>/favorite/", api.toggle_favorite, name="api_toggle_favorite"),
+    path("api/course/<int:course_id>/distribution/", api.course_distribution, name="api_course_distribution"),
+    path("api/course/<int:course_id>/events/", api.course_events, name="api_course_events"),
+    path("api/course/<int:course_id>/random_comment/", api.random_comment, name="api_random_comment"),
+    path("api/courses/random_comments/", api.random_comments, name="api_random_comments"),
+    path("api/rating/<int:rating_id>/reaction/", api.react, name="api_react"),
     path("admin/pending-courses/", views.pending_courses, name="pending_courses"),
     path("admin/course/<int:course_id>/approve/", views.approve_course, name="approve_course"),
     path("admin/course/<int:course_id>/reject/", views.reject_course, name="reject_course"),
+    path("stats/requests/", views.request_stats, name="request_stats"),
+    path("stats/export/<str:dataset>/", views.export_data, name="export_data"),
 ]
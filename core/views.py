@@ -1,90 +1,44 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login, logout, get_user_model
 from django.contrib import messages
-from django.http import HttpRequest
-from django.db.models import Avg, Count, Q
-from .models import Course, Rating, School, Tag
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from .models import Course, CourseInstructorStats, CourseStats, Rating, School, Tag
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
 from django.http import JsonResponse
 from django.urls import reverse
-from .models import Comment, Favorite, RatingReaction, CourseInstructor, Instructor, CourseTag, Report, UserDisclaimer
-
-from django.contrib.auth import get_user_model
-import random
+from .models import Comment, Favorite, CourseInstructor, Instructor, CourseTag, Report, UserDisclaimer, UserHelpfulStats
+from . import caching, exporting, instrumentation, reactions, scoring, stats
+from .pagination import keyset_page, list_page, newest_page, page_query, parse_cursor, parse_time_cursor
+from .rankings import current_priors, get_rankings
+from .sampling import random_snippet
+from .search import ranked_course_ids
+
+
+def _top_courses():
+    top_stats = (
+        CourseStats.objects.filter(course__status="approved", rating_count__gt=0)
+        .select_related("course__school", "course__category")
+        .annotate(score=scoring.bayesian_average("overall_sum", "rating_count", current_priors()["overall"]))
+        .order_by("-score", "-rating_count")[:10]
+    )
+    return [(st.course, st.avg_overall, st.rating_count) for st in top_stats]
 
 def index(request: HttpRequest):
-    ratings_qs = Rating.objects.filter(course__status="approved")
-    agg = ratings_qs.values("course").annotate(avg_score=Avg("overall_score"), rating_count=Count("rating_id")).order_by("-avg_score")[:10]
-    top_courses = []
-    for row in agg:
-        try:
-            c = Course.objects.get(pk=row["course"])
-            top_courses.append((c, row["avg_score"] or 0, row["rating_count"]))
-        except Course.DoesNotExist:
-            pass
+    top_courses = caching.get_or_build(caching.index_key(), _top_courses)
     return render(request, "index.html", {"top_courses": top_courses})
 
 def rankings(request: HttpRequest):
     school_id = request.GET.get("school_id")
     category_id = request.GET.get("category_id")
 
-    # base course set
-    course_qs = Course.objects.filter(status="approved")
-    if school_id:
-        course_qs = course_qs.filter(school_id=school_id)
-    if category_id:
-        course_qs = course_qs.filter(category_id=category_id)
-
-    # course dimension rankings
-    course_stats = []
-    for c in course_qs:
-        rs = Rating.objects.filter(course=c)
-        if rs.exists():
-            course_stats.append({
-                "course": c,
-                "avg_overall": rs.aggregate(a=Avg("overall_score"))['a'] or 0,
-                "avg_difficulty": rs.aggregate(a=Avg("difficulty"))['a'] or 0,
-                "avg_usefulness": rs.aggregate(a=Avg("usefulness"))['a'] or 0,
-                "avg_workload": rs.aggregate(a=Avg("workload"))['a'] or 0,
-                "rating_count": rs.count(),
-            })
-
-    top_overall = sorted(course_stats, key=lambda x: (-(x["avg_overall"] or 0), -x["rating_count"]),)[:10]
-    top_easiest = sorted(course_stats, key=lambda x: (x["avg_difficulty"] or 0, -x["rating_count"]),)[:10]
-    top_useful = sorted(course_stats, key=lambda x: (-(x["avg_usefulness"] or 0), -x["rating_count"]),)[:10]
-    top_low_workload = sorted(course_stats, key=lambda x: (x["avg_workload"] or 0, -x["rating_count"]),)[:10]
-
-    # instructor popularity (avg overall and count)
-    instr_qs = Instructor.objects.filter(courseinstructor__course__in=course_qs).distinct()
-    instructor_stats = []
-    for ins in instr_qs:
-        rqs = Rating.objects.filter(instructor=ins, course__in=course_qs)
-        if rqs.exists():
-            instructor_stats.append({
-                "instructor": ins,
-                "avg_overall": rqs.aggregate(a=Avg("overall_score"))['a'] or 0,
-                "rating_count": rqs.count(),
-            })
-    top_instructors = sorted(instructor_stats, key=lambda x: (-(x["avg_overall"] or 0), -x["rating_count"]),)[:10]
-
-    # user helpfulness rankings based on reactions to their ratings
-    from django.contrib.auth import get_user_model
-    User = get_user_model()
-    author_ids = list(Rating.objects.filter(course__in=course_qs).values_list("user_id", flat=True).distinct())
-    authors = User.objects.filter(id__in=author_ids)
-    user_stats = []
-    for u in authors:
-        helpful = RatingReaction.objects.filter(reaction_type="helpful", rating__user_id=u.id, rating__course__in=course_qs).count()
-        not_helpful = RatingReaction.objects.filter(reaction_type="not_helpful", rating__user_id=u.id, rating__course__in=course_qs).count()
-        user_stats.append({
-            "user": u,
-            "helpful": helpful,
-            "not_helpful": not_helpful,
-            "net": helpful - not_helpful,
-        })
-    top_helpful_users = sorted(user_stats, key=lambda x: (-(x["helpful"] or 0), -x["net"]),)[:10]
-    top_net_helpful_users = sorted(user_stats, key=lambda x: (-(x["net"] or 0), -x["helpful"]),)[:10]
+    boards = caching.get_or_build(
+        caching.rankings_key(school_id, category_id),
+        lambda: get_rankings(school_id, category_id),
+    )
 
     schools = School.objects.order_by("name")
     from .models import Category
@@ -98,13 +52,7 @@ def rankings(request: HttpRequest):
             "categories": categories,
             "school_id": int(school_id) if school_id else None,
             "category_id": int(category_id) if category_id else None,
-            "top_overall": top_overall,
-            "top_easiest": top_easiest,
-            "top_useful": top_useful,
-            "top_low_workload": top_low_workload,
-            "top_instructors": top_instructors,
-            "top_helpful_users": top_helpful_users,
-            "top_net_helpful_users": top_net_helpful_users,
+            **boards,
         },
     )
 
@@ -116,13 +64,6 @@ def courses(request: HttpRequest):
     tag = request.GET.get("tag", "")
 
     qs = Course.objects.all() if request.user.is_staff else Course.objects.filter(status="approved")
-    if search:
-        qs = qs.filter(
-            Q(title__icontains=search)
-            | Q(code__icontains=search)
-            | Q(description__icontains=search)
-            | Q(school__name__icontains=search)
-        )
     if school_id:
         qs = qs.filter(school_id=school_id)
     if school_type:
@@ -130,22 +71,34 @@ def courses(request: HttpRequest):
     if category_id:
         qs = qs.filter(category_id=category_id)
     if tag:
-        qs = qs.filter(coursetag__tag__name__icontains=tag)
-
-    # annotate average and count via Rating relation
-    # fallback: compute manually if annotation is complex on legacy tables
-    courses_list = []
-    for c in qs:
-        ratings = Rating.objects.filter(course=c)
-        if ratings.exists():
-            avg_score = ratings.aggregate(a=Avg("overall_score"))["a"] or 0
-            rating_count = ratings.count()
-        else:
-            avg_score = 0
-            rating_count = 0
-        setattr(c, "avg_score", avg_score)
-        setattr(c, "rating_count", rating_count)
-        courses_list.append(c)
+        # a subquery rather than a join, so a course with several matching tags is listed once
+        qs = qs.filter(course_id__in=CourseTag.objects.filter(tag__name__icontains=tag).values("course_id"))
+
+    ranked_ids = ranked_course_ids(search, qs) if search else None
+    if search and ranked_ids is None:
+        # no full-text index on this database
+        qs = qs.filter(
+            Q(title__icontains=search)
+            | Q(code__icontains=search)
+            | Q(description__icontains=search)
+            | Q(school__name__icontains=search)
+        )
+
+    # averages come from the denormalized course_stats table; unrated courses have no row
+    qs = qs.select_related("school", "category").annotate(
+        avg_score=Coalesce(F("stats__avg_overall"), Value(0.0)),
+        rating_count=Coalesce(F("stats__rating_count"), Value(0)),
+    )
+    after = parse_cursor(request.GET.get("after"))
+    before = parse_cursor(request.GET.get("before"))
+    if ranked_ids is not None:
+        # search results keep their relevance order; cursors point into the ranked id list
+        page = list_page(ranked_ids, after=after, before=before)
+        found = qs.in_bulk(page["items"])
+        page["items"] = [found[cid] for cid in page["items"] if cid in found]
+    else:
+        page = keyset_page(qs, "course_id", after=after, before=before)
+    courses_list = page["items"]
 
     schools = School.objects.order_by("name")
     from .models import Category
@@ -157,6 +110,8 @@ def courses(request: HttpRequest):
         "courses.html",
         {
             "courses": courses_list,
+            "next_query": page_query(request.GET, after=page["next_cursor"]) if page["next_cursor"] is not None else None,
+            "prev_query": page_query(request.GET, before=page["prev_cursor"]) if page["prev_cursor"] is not None else None,
             "schools": schools,
             "categories": categories,
             "tags": tags,
@@ -169,10 +124,6 @@ def courses(request: HttpRequest):
     )
 
 def random_course_comment(request: HttpRequest, course_id: int):
-    try:
-        Course.objects.get(pk=course_id)
-    except Course.DoesNotExist:
-        return JsonResponse({"text": None}, status=404)
     exclude_kind = request.GET.get("exclude_kind")
     exclude_id_raw = request.GET.get("exclude_id")
     try:
@@ -180,69 +131,20 @@ def random_course_comment(request: HttpRequest, course_id: int):
     except Exception:
         exclude_id = None
 
-    ratings_qs = Rating.objects.filter(course_id=course_id).exclude(comment_text__isnull=True).exclude(comment_text__exact="")
-    comments_qs = Comment.objects.filter(rating__course_id=course_id).exclude(text__isnull=True).exclude(text__exact="")
-
-    if exclude_kind == "rating" and exclude_id:
-        ratings_qs = ratings_qs.exclude(rating_id=exclude_id)
-    if exclude_kind == "comment" and exclude_id:
-        comments_qs = comments_qs.exclude(comment_id=exclude_id)
-    count_r = ratings_qs.count()
-    count_c = comments_qs.count()
-    if count_r + count_c == 0:
-        return JsonResponse({"text": None})
-    pick = random.randint(1, count_r + count_c)
-    if pick <= count_r:
-        r = ratings_qs.order_by("?").first()
-        username = None
-        try:
-            username = ("匿名" if getattr(r, "anonymous_flag", False) else r.user.username)
-        except Exception:
-            username = None
-        return JsonResponse({
-            "text": r.comment_text,
-            "user": username,
-            "created_at": r.created_at.isoformat() if getattr(r, "created_at", None) else None,
-            "kind": "rating",
-            "id": r.rating_id,
-        })
-    else:
-        c = comments_qs.order_by("?").first()
-        username = None
-        try:
-            username = c.user.username
-        except Exception:
-            username = None
-        return JsonResponse({
-            "text": c.text,
-            "user": username,
-            "created_at": c.created_at.isoformat() if getattr(c, "created_at", None) else None,
-            "kind": "comment",
-            "id": c.comment_id,
-        })
-
-def course_detail(request: HttpRequest, course_id: int):
-    try:
-        course = Course.objects.get(pk=course_id)
-    except Course.DoesNotExist:
-        messages.error(request, "课程不存在")
-        return redirect("courses")
-
-    if course.status != "approved":
-        if not request.user.is_authenticated or not request.user.is_staff:
-            messages.info(request, "该课程正在审核中，暂时无法查看。")
-            return redirect("courses")
+    snippet = random_snippet(course_id, exclude_kind, exclude_id)
+    if snippet is None:
+        return JsonResponse({"text": None}, status=404)
+    return JsonResponse(snippet)
 
-    ratings = Rating.objects.filter(course_id=course_id).order_by("-created_at")
-    rating_ids = [r.rating_id for r in ratings]
-    comment_qs = Comment.objects.filter(rating_id__in=rating_ids).order_by("created_at")
+def _comment_roots(comments):
+    """Link `comments` into threads; returns the top-level comments keyed by rating_id."""
     nodes = {}
     roots_by_rating = {}
-    for c in comment_qs:
+    for c in comments:
         setattr(c, "children", [])
         nodes[c.comment_id] = c
         roots_by_rating.setdefault(c.rating_id, [])
-    for c in comment_qs:
+    for c in comments:
         if c.parent_comment_id:
             parent = nodes.get(c.parent_comment_id)
             if parent is not None:
@@ -251,58 +153,134 @@ def course_detail(request: HttpRequest, course_id: int):
                 roots_by_rating.setdefault(c.rating_id, []).append(c)
         else:
             roots_by_rating.setdefault(c.rating_id, []).append(c)
+    return roots_by_rating
+
+def _rating_page(course_id: int, after=None, before=None):
+    """One page of a course's ratings, newest first, with comment counts.
+
+    Comment threads are not loaded here; the page fetches them from rating_comments
+    when a thread is expanded.
+    """
+    # the author's name only: the page is cached, and a User row carries its password hash
+    page = newest_page(Rating.objects.filter(course_id=course_id).annotate(author_name=F("user__username")), after, before)
+    ratings = page["items"]
+    rating_ids = [r.rating_id for r in ratings]
+    comment_counts = dict(
+        Comment.objects.filter(rating_id__in=rating_ids)
+        .values("rating_id")
+        .annotate(n=Count("comment_id"))
+        .values_list("rating_id", "n")
+    )
     for r in ratings:
-        setattr(r, "comments", roots_by_rating.get(r.rating_id, []))
-    if ratings.exists():
-        avg_overall = ratings.aggregate(a=Avg("overall_score"))["a"] or 0
-        avg_difficulty = ratings.aggregate(a=Avg("difficulty"))["a"] or 0
-        avg_usefulness = ratings.aggregate(a=Avg("usefulness"))["a"] or 0
-        avg_workload = ratings.aggregate(a=Avg("workload"))["a"] or 0
-    else:
-        avg_overall = avg_difficulty = avg_usefulness = avg_workload = 0
+        setattr(r, "comment_count", comment_counts.get(r.rating_id, 0))
+    return page
+
+def _attach_author_totals(ratings):
+    """Set each named author's site-wide helpful total, in one query.
+
+    Read per request rather than cached with the course page: reactions on the
+    author's ratings in any other course change it.
+    """
+    user_ids = {r.user_id for r in ratings if not r.anonymous_flag}
+    totals = dict(UserHelpfulStats.objects.filter(user_id__in=user_ids).values_list("user_id", "helpful_count")) if user_ids else {}
+    for r in ratings:
+        r.author_helpful_count = 0 if r.anonymous_flag else totals.get(r.user_id, 0)
+
+def _course_detail_context(course_id: int):
+    """The part of the detail page that is the same for every visitor; cached per course.
+
+    A fixed number of queries however many ratings and comments the course has:
+    course with its stats, instructors with theirs, tags, and the first page of
+    ratings with their comment counts.
+    """
+    course = Course.objects.select_related("school", "category", "stats").filter(pk=course_id).first()
+    if course is None:
+        return None
+    try:
+        course_stats = course.stats
+    except CourseStats.DoesNotExist:
+        course_stats = CourseStats(course_id=course_id)
+
+    # per-instructor aggregates, joined onto the instructor rows
+    ins_stats = CourseInstructorStats.objects.filter(course_id=course_id, instructor_id=OuterRef("instructor_id"))
+    instructors = list(
+        Instructor.objects.filter(courseinstructor__course_id=course_id).annotate(
+            stats_avg=Subquery(ins_stats.values("avg_overall")[:1]),
+            stats_count=Subquery(ins_stats.values("rating_count")[:1]),
+        )
+    )
+    instructor_stats = [
+        {
+            'instructor': ins,
+            'avg_overall': ins.stats_avg or 0,
+            'rating_count': ins.stats_count or 0,
+        }
+        for ins in instructors
+    ]
+    course_tags = list(Tag.objects.filter(coursetag__course_id=course_id))
+
+    return {
+        "course": course,
+        "rating_page": _rating_page(course_id),
+        "rating_count": course_stats.rating_count,
+        "avg_overall": course_stats.avg_overall,
+        "avg_difficulty": course_stats.avg_difficulty,
+        "avg_usefulness": course_stats.avg_usefulness,
+        "avg_workload": course_stats.avg_workload,
+        "distributions": stats.distributions(course_stats),
+        "instructors": instructors,
+        "instructor_stats": instructor_stats,
+        "course_tags": course_tags,
+    }
+
+def course_detail(request: HttpRequest, course_id: int):
+    # a missing course is not cached, so it costs one query per request as before
+    context = caching.get_or_build(caching.course_detail_key(course_id), lambda: _course_detail_context(course_id))
+    if context is None:
+        messages.error(request, "课程不存在")
+        return redirect("courses")
+
+    course = context["course"]
+    if course.status != "approved":
+        if not request.user.is_authenticated or not request.user.is_staff:
+            messages.info(request, "该课程正在审核中，暂时无法查看。")
+            return redirect("courses")
+
+    # only the first page of ratings is cached; deeper pages are one range scan each
+    after = parse_time_cursor(request.GET.get("after"))
+    before = parse_time_cursor(request.GET.get("before"))
+    rating_page = context["rating_page"]
+    if after is not None or before is not None:
+        rating_page = _rating_page(course_id, after, before)
+    _attach_author_totals(rating_page["items"])
 
-    instructors = list(Instructor.objects.filter(courseinstructor__course_id=course_id))
-    course_tags = Tag.objects.filter(coursetag__course_id=course_id)
     available_tags = Tag.objects.order_by("name")[:100]
 
     is_favorite = False
     if request.user.is_authenticated:
         is_favorite = Favorite.objects.filter(user_id=request.user.id, course_id=course_id).exists()
 
-    # per-instructor aggregates
-    instructor_stats = []
-    for ins in instructors:
-        rqs = Rating.objects.filter(course_id=course_id, instructor_id=ins.instructor_id)
-        if rqs.exists():
-            avg_ins = rqs.aggregate(a=Avg("overall_score"))['a'] or 0
-            cnt_ins = rqs.count()
-        else:
-            avg_ins = 0
-            cnt_ins = 0
-        instructor_stats.append({
-            'instructor': ins,
-            'avg_overall': avg_ins,
-            'rating_count': cnt_ins,
-        })
-
     return render(
         request,
         "course_detail.html",
         {
-            "course": course,
-            "ratings": ratings,
-            "avg_overall": avg_overall,
-            "avg_difficulty": avg_difficulty,
-            "avg_usefulness": avg_usefulness,
-            "avg_workload": avg_workload,
-            "instructors": instructors,
-            "instructor_stats": instructor_stats,
-            "course_tags": course_tags,
+            **context,
+            "ratings": rating_page["items"],
+            "next_query": page_query(request.GET, after=rating_page["next_cursor"]) if rating_page["next_cursor"] else None,
+            "prev_query": page_query(request.GET, before=rating_page["prev_cursor"]) if rating_page["prev_cursor"] else None,
             "available_tags": available_tags,
             "is_favorite": is_favorite,
         },
     )
 
+def rating_comments(request: HttpRequest, rating_id: int):
+    """HTML fragment with one rating's comment thread, loaded when the thread is expanded."""
+    rating = Rating.objects.select_related("course").filter(pk=rating_id).first()
+    if rating is None or (rating.course.status != "approved" and not request.user.is_staff):
+        return HttpResponse(status=404)
+    comments = list(Comment.objects.filter(rating_id=rating_id).select_related("user").order_by("created_at"))
+    return render(request, "comment_thread.html", {"comments": _comment_roots(comments).get(rating_id, [])})
+
 def register(request: HttpRequest):
     if request.method == "POST":
         username = request.POST.get("username", "").strip()
@@ -446,12 +424,12 @@ def add_comment(request: HttpRequest, rating_id: int):
 @login_required
 def add_reaction(request: HttpRequest, rating_id: int):
     reaction_type = request.POST.get("reaction_type")
-    existing = RatingReaction.objects.filter(user_id=request.user.id, rating_id=rating_id).first()
-    if existing:
-        existing.reaction_type = reaction_type
-        existing.save()
+    if reaction_type not in reactions.COUNTER_FIELDS:
+        messages.error(request, "无效的操作")
+    elif not Rating.objects.filter(pk=rating_id).exists():
+        messages.error(request, "评价不存在")
     else:
-        RatingReaction.objects.create(user_id=request.user.id, rating_id=rating_id, reaction_type=reaction_type, created_at=timezone.now())
+        reactions.set_reaction(request.user.id, rating_id, reaction_type)
     return redirect(request.META.get("HTTP_REFERER") or "index")
 
 @login_required
@@ -527,3 +505,23 @@ def reject_course(request: HttpRequest, course_id: int):
     course.save()
     messages.success(request, f"课程 \"{course.title}\" 已拒绝。")
     return redirect("pending_courses")
+
+@admin_required
+def request_stats(request: HttpRequest):
+    if request.method == "POST" and request.POST.get("reset"):
+        instrumentation.reset()
+    return JsonResponse(instrumentation.snapshot(), json_dumps_params={"ensure_ascii": False})
+
+@admin_required
+def export_data(request: HttpRequest, dataset: str):
+    fmt = request.GET.get("format", "csv")
+    if dataset not in exporting.DATASETS or fmt not in exporting.FORMATS:
+        return JsonResponse({"status": "error", "message": "未知的导出类型"}, status=404)
+    # ASGI buffers synchronous iterators whole; hand it an async one there
+    lines = (exporting.aexport_lines if isinstance(request, ASGIRequest) else exporting.export_lines)(dataset, fmt)
+    response = StreamingHttpResponse(
+        lines,
+        content_type="text/csv; charset=utf-8" if fmt == "csv" else "application/x-ndjson; charset=utf-8",
+    )
+    response["Content-Disposition"] = f'attachment; filename="{dataset}.{fmt}"'
+    return response
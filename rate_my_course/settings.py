@@ -18,6 +18,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # outermost, so the session/auth queries of the other middleware are counted too
+    "core.instrumentation.QueryInstrumentationMiddleware",
+    # before the session middleware, so session writes count as writes for stickiness
+    "core.db_router.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -31,7 +35,7 @@ ROOT_URLCONF = "rate_my_course.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "core.instrumentation.TimedDjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -48,13 +52,81 @@ TEMPLATES = [
 WSGI_APPLICATION = "rate_my_course.wsgi.application"
 ASGI_APPLICATION = "rate_my_course.asgi.application"
 
+# DB_PROFILE=production tunes SQLite for concurrent use (core.sqlite_tuning): WAL,
+# so page reads don't block rating/reaction writes, a busy timeout instead of
+# immediate "database is locked" errors, and persistent connections.
+DB_PROFILE = os.environ.get("DB_PROFILE", "default")
+PRODUCTION_DB = DB_PROFILE == "production"
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": str(BASE_DIR / "rate_my_course.db"),
+        "CONN_MAX_AGE": int(os.environ.get("CONN_MAX_AGE", "600" if PRODUCTION_DB else "0")),
+        "CONN_HEALTH_CHECKS": PRODUCTION_DB,
+        "OPTIONS": {"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
     }
 }
 
+# Read replicas (core.db_router): DB_REPLICAS is a comma-separated list of database
+# files holding copies of the primary, e.g. made with `manage.py snapshot_replicas`.
+# Only the READ_ONLY_VIEWS read from them; a client that just wrote reads from the
+# primary for REPLICA_STICKY_SECONDS.
+DATABASE_REPLICAS = []
+for _number, _name in enumerate(filter(None, os.environ.get("DB_REPLICAS", "").split(",")), start=1):
+    DATABASES[f"replica{_number}"] = {**DATABASES["default"], "NAME": _name.strip(), "TEST": {"MIRROR": "default"}}
+    DATABASE_REPLICAS.append(f"replica{_number}")
+DATABASE_ROUTERS = ["core.db_router.ReplicaRouter"]
+READ_ONLY_VIEWS = [
+    "index", "courses", "rankings", "course_detail",
+    "random_course_comment", "api_random_comment", "api_random_comments", "api_course_distribution",
+]
+REPLICA_STICKY_SECONDS = int(os.environ.get("REPLICA_STICKY_SECONDS", "10"))
+
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+    "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": -int(os.environ.get("SQLITE_CACHE_KB", "65536")),
+    "temp_store": "MEMORY",
+} if PRODUCTION_DB else {}
+
+# Page/fragment cache (core.caching). locmem needs no external service; set
+# CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache and
+# CACHE_LOCATION=/some/dir to share the cache between worker processes.
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.environ.get("CACHE_LOCATION", "rate-my-course"),
+    }
+}
+PAGE_CACHE_TIMEOUT = int(os.environ.get("PAGE_CACHE_TIMEOUT", "600"))
+
+# Leaderboards are served from snapshots written by `manage.py refresh_rankings`
+# (core.rankings) while younger than this many seconds, and computed per request
+# otherwise. Run the refresher more often than this, e.g. with --interval.
+RANKING_SNAPSHOT_MAX_AGE = int(os.environ.get("RANKING_SNAPSHOT_MAX_AGE", "900"))
+# Phantom ratings at the site-wide mean added to every course and instructor
+# before ranking (core.scoring), so a handful of ratings cannot top the boards.
+RANKING_PRIOR_WEIGHT = int(os.environ.get("RANKING_PRIOR_WEIGHT", "10"))
+
+# Per-request SQL query budgets (core.instrumentation), keyed by URL name and
+# counted with an empty page cache. Over-budget requests log a warning on the
+# "core.instrumentation" logger, or raise when QUERY_BUDGET_RAISE is set.
+QUERY_BUDGETS = {
+    "index": 6,
+    "courses": 10,
+    "rankings": 16,
+    "course_detail": 16,
+    "random_course_comment": 5,
+    # whatever the number of courses: pools in one cache read, picks in one query per kind
+    "api_random_comments": 8,
+}
+QUERY_BUDGET_DEFAULT = 20
+QUERY_BUDGET_RAISE = os.environ.get("QUERY_BUDGET_RAISE", "") == "1"
+
 AUTH_PASSWORD_VALIDATORS = []
 
 LANGUAGE_CODE = "zh-hans"